@@ -0,0 +1,35 @@
+import operator
+from typing import List, Sequence
+
+import msgpack
+from starlette.responses import Response
+
+from .http_cache import quality_values
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack")
+
+
+def wants_msgpack(accept: str) -> bool:
+    """Only when asked for by name: */* and browsers' defaults still get JSON."""
+    accepted = quality_values(accept)
+    msgpack_q = max((accepted.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES), default=0.0)
+    return msgpack_q > 0 and msgpack_q >= accepted.get("application/json", 0.0)
+
+
+class ColumnarResponse(Response):
+    """Rows as MessagePack columns: {"columns": [name, ...], "data": [[value, ...], ...]}.
+
+    ``data[i]`` holds column ``columns[i]`` for every row, so each name is
+    sent once instead of once per row; ``zip(*data)`` gives the rows back.
+    """
+
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def __init__(self, rows: List[dict], columns: Sequence[str], **kwargs):
+        self.columns = tuple(columns)
+        super().__init__(rows, **kwargs)
+
+    def render(self, rows: List[dict]) -> bytes:
+        data = [list(map(operator.itemgetter(name), rows)) for name in self.columns]
+        return msgpack.packb({"columns": self.columns, "data": data})
@@ -0,0 +1,291 @@
+import asyncio
+import base64
+import binascii
+import json
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+from postgrest import AsyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
+
+from .metrics import DB_ERRORS, DB_SECONDS, query_labels
+
+
+# The trucks columns /api/trucks returns, in response order
+TRUCK_COLUMNS = (
+    "id", "terminal", "truck_no", "dock_code", "truck_route",
+    "preparation_start", "preparation_end", "loading_start", "loading_end",
+    "status_preparation", "status_loading", "created_at", "updated_at",
+)
+
+
+@dataclass(frozen=True)
+class TruckFilters:
+    terminal: Optional[str] = None
+    status_preparation: Optional[str] = None
+    status_loading: Optional[str] = None
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    dock_code: Optional[str] = None
+    # Only trucks with a stage not yet Finished, as the live board shows them
+    active: bool = False
+    # Exclusive bound on created_at, a timestamp; date_to takes in its whole day
+    created_before: Optional[str] = None
+
+    def apply(self, query):
+        if self.terminal:
+            query = query.eq("terminal", self.terminal)
+        if self.status_preparation:
+            query = query.eq("status_preparation", self.status_preparation)
+        if self.status_loading:
+            query = query.eq("status_loading", self.status_loading)
+        if self.dock_code:
+            query = query.eq("dock_code", self.dock_code)
+        if self.date_from:
+            query = query.gte("created_at", self.created_from)
+        if self.date_to:
+            query = query.lte("created_at", self.created_to)
+        if self.created_before:
+            query = query.lt("created_at", self.created_before)
+        if self.active:
+            # Spelled exactly as the partial indexes' predicate in schema.sql
+            query.params = query.params.add("or", "(status_preparation.neq.Finished,status_loading.neq.Finished)")
+        return query
+
+    @property
+    def created_from(self) -> Optional[str]:
+        return f"{self.date_from}T00:00:00" if self.date_from else None
+
+    @property
+    def created_to(self) -> Optional[str]:
+        return f"{self.date_to}T23:59:59" if self.date_to else None
+
+
+def is_active(status_preparation: Optional[str], status_loading: Optional[str]) -> bool:
+    """``TruckFilters.active`` in Python, with SQL's NULLs: a missing status is
+    not "not Finished", so a truck whose other stage is Finished doesn't match."""
+    return any(status is not None and status != "Finished" for status in (status_preparation, status_loading))
+
+
+TruckCursor = Tuple[str, str]
+# A timestamptz as PostgREST returns it. Postgres trims trailing zeros from
+# the fraction, which datetime.fromisoformat only accepts from Python 3.11
+TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d{1,6})?(Z|[+-]\d{2}(:?\d{2})?)?")
+
+
+def cursor_of(truck: Dict[str, Any]) -> TruckCursor:
+    return truck["created_at"], truck["id"]
+
+
+def encode_cursor(cursor: TruckCursor) -> str:
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> TruckCursor:
+    """Parse an opaque page cursor, raising ValueError if it is malformed."""
+    try:
+        created_at, truck_id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        # Both end up quoted inside a PostgREST filter, so only accept real values
+        if not isinstance(created_at, str) or not TIMESTAMP.fullmatch(created_at):
+            raise ValueError(created_at)
+        return created_at, str(uuid.UUID(truck_id))
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """AsyncPostgrestClient with an explicitly sized HTTP connection pool."""
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        headers: Dict[str, str],
+        timeout: float,
+        limits: httpx.Limits,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self._limits = limits
+        self._transport = transport
+        super().__init__(base_url, headers=headers, timeout=timeout)
+
+    def create_session(self, base_url, headers, timeout):
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            limits=self._limits,
+            transport=self._transport,
+        )
+
+
+class Database:
+    """Async data-access layer for the Supabase REST API.
+
+    Every query goes through ``execute``, which caps the number of requests in
+    flight so a burst of handlers queues here instead of piling up on the pool,
+    and times each one by table and operation for /metrics. ``transport``
+    replaces the network, e.g. with a stand-in from ``benchmarks``.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        *,
+        max_connections: int = 20,
+        max_concurrency: int = 20,
+        timeout: float = 10.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        headers = {
+            **DEFAULT_POSTGREST_CLIENT_HEADERS,
+            "apiKey": key,
+            "Authorization": f"Bearer {key}",
+        }
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        self.client = PooledPostgrestClient(
+            f"{url}/rest/v1", headers=headers, timeout=timeout, limits=limits, transport=transport
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def table(self, name: str):
+        return self.client.table(name)
+
+    async def execute(self, query):
+        labels = query_labels(query)
+        start = time.perf_counter()
+        try:
+            async with self._semaphore:
+                return await query.execute()
+        except Exception:
+            DB_ERRORS.labels(*labels).inc()
+            raise
+        finally:
+            DB_SECONDS.labels(*labels).observe(time.perf_counter() - start)
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def ping(self):
+        # Cheapest round trip that shows the API and the trucks table answer
+        await self.execute(self.table("trucks").select("id").limit(1))
+
+    # Users
+    async def get_user(self, username: str) -> Optional[Dict[str, Any]]:
+        result = await self.execute(self.table("users").select("*").eq("username", username))
+        return result.data[0] if result.data else None
+
+    # Trucks
+    async def count_trucks(self) -> Optional[int]:
+        result = await self.execute(self.table("trucks").select("count", count="exact"))
+        return result.count
+
+    async def list_trucks(
+        self,
+        filters: TruckFilters,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[TruckCursor] = None,
+    ) -> List[Dict[str, Any]]:
+        # Ordered newest first on (created_at, id); ``after`` continues below
+        # a previous page's last row, an index range scan however deep it is
+        query = filters.apply(self.table("trucks").select(",".join(TRUCK_COLUMNS)))
+        if after:
+            created_at, truck_id = after
+            # PostgREST has no row comparison, and Postgres won't use the index
+            # for the OR alone; the redundant lte gives it a range to scan
+            query = query.lte("created_at", created_at)
+            query.params = query.params.add(
+                "or", f'(created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{truck_id}"))'
+            )
+        # Single raw order param; chaining .order() would send two
+        query.params = query.params.add("order", "created_at.desc,id.desc")
+        query = query.limit(limit)
+        if skip:
+            query = query.offset(skip)
+        result = await self.execute(query)
+        return result.data
+
+    async def iter_trucks(self, filters: TruckFilters, page_size: int = 1000) -> AsyncIterator[List[Dict[str, Any]]]:
+        after = None
+        while True:
+            page = await self.list_trucks(filters, limit=page_size, after=after)
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            after = cursor_of(page[-1])
+
+    async def truck_status_counts(self, filters: TruckFilters) -> List[Dict[str, Any]]:
+        # Grouped in the database by the truck_stats function in schema.sql
+        date_to = filters.created_to
+        if filters.created_before:
+            # p_date_to is inclusive; timestamptz counts whole microseconds,
+            # so the last one before the bound is the same as excluding it
+            before = (datetime.fromisoformat(filters.created_before) - timedelta(microseconds=1)).isoformat()
+            date_to = min(date_to, before) if date_to else before
+        query = self.client.rpc("truck_stats", {
+            "p_terminal": filters.terminal,
+            "p_date_from": filters.created_from,
+            "p_date_to": date_to,
+        })
+        result = await self.execute(query)
+        return result.data
+
+    async def truck_reference(self, page_size: int = 1000) -> List[Dict[str, Any]]:
+        # Distinct (terminal, dock_code, truck_route), from the truck_reference
+        # function in schema.sql. Paged because PostgREST caps rows per
+        # response; the RPC builder has no range(), so limit/offset go in raw
+        rows, start = [], 0
+        while True:
+            query = self.client.rpc("truck_reference", {})
+            query.params = query.params.add("order", "terminal,dock_code,truck_route").add(
+                "limit", str(page_size)).add("offset", str(start))
+            page = (await self.execute(query)).data
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+            start += page_size
+
+    async def list_truck_states(self, created_from: str, page_size: int = 1000) -> List[Dict[str, Any]]:
+        # Paged because PostgREST caps rows per response
+        rows, start = [], 0
+        while True:
+            query = self.table("trucks").select("id, terminal, status_preparation, status_loading, created_at")
+            # postgrest-py's range end is exclusive: this asks for page_size rows
+            query = query.gte("created_at", created_from).order("id").range(start, start + page_size)
+            page = (await self.execute(query)).data
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+            start += page_size
+
+    async def get_truck(self, truck_id: str) -> Optional[Dict[str, Any]]:
+        result = await self.execute(self.table("trucks").select("*").eq("id", truck_id))
+        return result.data[0] if result.data else None
+
+    async def insert_truck(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        result = await self.execute(self.table("trucks").insert(data))
+        return result.data[0] if result.data else None
+
+    async def upsert_trucks(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Relies on the trucks_truck_no_key unique constraint
+        result = await self.execute(self.table("trucks").upsert(rows, on_conflict="truck_no"))
+        return result.data
+
+    async def update_truck(self, truck_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        result = await self.execute(self.table("trucks").update(data).eq("id", truck_id))
+        return result.data[0] if result.data else None
+
+    async def delete_truck(self, truck_id: str) -> Optional[Dict[str, Any]]:
+        result = await self.execute(self.table("trucks").delete().eq("id", truck_id))
+        return result.data[0] if result.data else None
@@ -0,0 +1,251 @@
+import asyncio
+import itertools
+import json
+import logging
+import re
+import sys
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# handler(event, remote): ``remote`` is True for events published by another worker
+Handler = Callable[[dict, bool], Awaitable[None]]
+
+RESYNC_EVENT = {"message": {"type": "resync"}}
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_PAYLOAD_LIMIT = 7900
+
+
+class EventBus:
+    """In-process bus: events reach this worker's clients only.
+
+    Fine for a single uvicorn worker; use a shared backend for more.
+    """
+
+    def __init__(self):
+        self.handler: Optional[Handler] = None
+
+    async def start(self, handler: Handler):
+        self.handler = handler
+
+    async def publish(self, event: dict):
+        await self.handler(event, False)
+
+    async def close(self):
+        pass
+
+
+class SharedEventBus(EventBus, ABC):
+    """Base for buses shared by several workers.
+
+    ``publish`` delivers to this worker's clients straight away, then fans the
+    event out to the other workers. Incoming events carry the publishing
+    worker's id and a sequence number, so a worker skips its own events and
+    any redelivered duplicate. If the connection to the backend drops, the
+    worker treats the gap as a resync once it is back.
+    """
+
+    reconnect_delay = 1.0
+
+    def __init__(self, dedup_size: int = 4096):
+        super().__init__()
+        self.origin = uuid.uuid4().hex
+        self._sequence = itertools.count()
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._dedup_size = dedup_size
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, handler: Handler):
+        await super().start(handler)
+        self._listener = asyncio.create_task(self._listen_forever())
+
+    async def publish(self, event: dict):
+        await self.handler(event, False)
+        envelope = {"origin": self.origin, "id": f"{self.origin}:{next(self._sequence)}", "event": event}
+        try:
+            await self._send(json.dumps(envelope))
+        except Exception as e:
+            logger.warning("Event bus publish failed, other workers will miss an event: %s", e)
+
+    async def close(self):
+        if self._listener:
+            self._listener.cancel()
+
+    async def _receive(self, payload: str):
+        try:
+            envelope = json.loads(payload)
+            origin, event_id, event = envelope["origin"], envelope["id"], envelope["event"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed event bus payload")
+            return
+        if origin == self.origin or event_id in self._seen:
+            return
+        self._seen[event_id] = None
+        if len(self._seen) > self._dedup_size:
+            self._seen.popitem(last=False)
+        await self.handler(event, True)
+
+    async def _listen_forever(self):
+        connected_before = False
+        while True:
+            try:
+                async for _ in self._listen():
+                    # Yielded once subscribed; anything missed while away is unknown
+                    if connected_before:
+                        await self.handler(RESYNC_EVENT, True)
+                    connected_before = True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Event bus listener disconnected: %s", e)
+            await asyncio.sleep(self.reconnect_delay)
+
+    @abstractmethod
+    def _listen(self) -> AsyncIterator[None]:
+        """Subscribe, yield once subscribed, then feed payloads to ``_receive``."""
+
+    @abstractmethod
+    async def _send(self, payload: str):
+        ...
+
+
+class PostgresEventBus(SharedEventBus):
+    """LISTEN/NOTIFY on a direct Postgres connection (needs psycopg)."""
+
+    def __init__(self, dsn: str, channel: str = "truck_events"):
+        super().__init__()
+        if not re.fullmatch(r"[a-z_][a-z0-9_]*", channel):
+            raise ValueError(f"Invalid channel name: {channel}")
+        import psycopg
+
+        self._psycopg = psycopg
+        self.dsn = dsn
+        self.channel = channel
+        self._publisher = None
+        self._publish_lock = asyncio.Lock()
+
+    async def _listen(self):
+        async with await self._psycopg.AsyncConnection.connect(self.dsn, autocommit=True) as conn:
+            await conn.execute(f"LISTEN {self.channel}")
+            yield
+            async for notify in conn.notifies():
+                await self._receive(notify.payload)
+
+    async def _send(self, payload: str):
+        size = len(payload.encode())
+        if size > NOTIFY_PAYLOAD_LIMIT:
+            # Too big for NOTIFY: tell the other workers to refetch instead
+            logger.warning(
+                "%s event of %d bytes is over the NOTIFY limit, sending a resync instead",
+                json.loads(payload)["event"]["message"]["type"], size,
+            )
+            payload = json.dumps({
+                "origin": self.origin, "id": f"{self.origin}:{next(self._sequence)}", "event": RESYNC_EVENT
+            })
+        async with self._publish_lock:
+            if self._publisher is None or self._publisher.closed:
+                self._publisher = await self._psycopg.AsyncConnection.connect(self.dsn, autocommit=True)
+            await self._publisher.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+
+    async def close(self):
+        await super().close()
+        if self._publisher is not None:
+            await self._publisher.close()
+
+
+class RedisEventBus(SharedEventBus):
+    """Redis pub/sub (needs the redis package from requirements-redis.txt)."""
+
+    def __init__(self, url: str, channel: str = "truck_events"):
+        super().__init__()
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self.channel = channel
+
+    async def _listen(self):
+        pubsub = self._redis.pubsub()
+        try:
+            await pubsub.subscribe(self.channel)
+            yield
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    await self._receive(message["data"].decode())
+        finally:
+            await pubsub.close()
+
+    async def _send(self, payload: str):
+        await self._redis.publish(self.channel, payload)
+
+    async def close(self):
+        await super().close()
+        await self._redis.close()
+
+
+class UnixSocketEventBus(SharedEventBus):
+    """Line-delimited JSON over a Unix socket to ``run_broker``, for tests and one host."""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def _listen(self):
+        reader, writer = await asyncio.open_unix_connection(self.path)
+        self._writer = writer
+        try:
+            yield
+            while line := await reader.readline():
+                await self._receive(line.decode())
+        finally:
+            self._writer = None
+            writer.close()
+
+    async def _send(self, payload: str):
+        if self._writer is None:
+            raise ConnectionError("Not connected to the event broker")
+        self._writer.write(payload.encode() + b"\n")
+        await self._writer.drain()
+
+
+async def run_broker(path: str):
+    """Relay every line from one connected worker to all the others."""
+    peers = set()
+
+    async def relay(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peers.add(writer)
+        try:
+            while line := await reader.readline():
+                for peer in list(peers):
+                    if peer is not writer:
+                        peer.write(line)
+        finally:
+            peers.discard(writer)
+            writer.close()
+
+    server = await asyncio.start_unix_server(relay, path)
+    async with server:
+        await server.serve_forever()
+
+
+def create_event_bus(backend: str, url: Optional[str] = None, channel: str = "truck_events") -> EventBus:
+    if backend == "local":
+        return EventBus()
+    if not url:
+        raise ValueError(f"EVENT_BUS={backend} needs EVENT_BUS_URL")
+    if backend == "postgres":
+        return PostgresEventBus(url, channel)
+    if backend == "redis":
+        return RedisEventBus(url, channel)
+    if backend == "unix":
+        return UnixSocketEventBus(url)
+    raise ValueError(f"Unknown event bus backend: {backend}")
+
+
+if __name__ == "__main__":
+    # python -m app.event_bus /tmp/truck-events.sock
+    asyncio.run(run_broker(sys.argv[1]))
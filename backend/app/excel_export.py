@@ -0,0 +1,85 @@
+import csv
+import io
+import tempfile
+from typing import IO, Any, Dict, Iterator, List
+
+EXPORT_COLUMNS = {
+    'terminal': 'Terminal',
+    'truck_no': 'Truck No',
+    'dock_code': 'Dock Code',
+    'truck_route': 'Route',
+    'preparation_start': 'Prep Start',
+    'preparation_end': 'Prep End',
+    'loading_start': 'Load Start',
+    'loading_end': 'Load End',
+    'status_preparation': 'Status Prep',
+    'status_loading': 'Status Load',
+    'created_at': 'Created Date',
+    'updated_at': 'Last Updated'
+}
+
+XLSX_MEDIA_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CHUNK_SIZE = 64 * 1024
+
+
+def _cell(value: Any) -> Any:
+    return '' if value is None else value
+
+
+class XlsxExport:
+    """Trucks workbook written page by page in xlsxwriter's constant_memory mode.
+
+    Rows are flushed to a temporary file as they are written, so memory stays
+    flat regardless of the row count; ``stream`` then sends the finished file.
+    """
+
+    def __init__(self):
+        # Imported on first export (called on a worker thread), not at app start
+        import xlsxwriter
+
+        self.file = tempfile.TemporaryFile()
+        self.workbook = xlsxwriter.Workbook(self.file, {'constant_memory': True})
+        self.worksheet = self.workbook.add_worksheet('Trucks')
+        header_format = self.workbook.add_format({
+            'bold': True,
+            'bg_color': '#4CAF50',
+            'font_color': 'white',
+            'border': 1
+        })
+        self.headers = list(EXPORT_COLUMNS.values())
+        self.worksheet.write_row(0, 0, self.headers, header_format)
+        self.widths = [len(header) for header in self.headers]
+        self.row = 1
+
+    def write_page(self, trucks: List[Dict[str, Any]]):
+        for truck in trucks:
+            values = [_cell(truck.get(column)) for column in EXPORT_COLUMNS]
+            self.worksheet.write_row(self.row, 0, values)
+            self.widths = [max(width, len(str(value))) for width, value in zip(self.widths, values)]
+            self.row += 1
+
+    def close(self) -> IO[bytes]:
+        for index, width in enumerate(self.widths):
+            self.worksheet.set_column(index, index, width + 2)
+        self.workbook.close()
+        self.file.seek(0)
+        return self.file
+
+    def stream(self) -> Iterator[bytes]:
+        with self.file:
+            while chunk := self.file.read(CHUNK_SIZE):
+                yield chunk
+
+
+def csv_header() -> str:
+    # The BOM lets Excel detect UTF-8 (Thai route names)
+    return '﻿' + csv_page([], header=True)
+
+
+def csv_page(trucks: List[Dict[str, Any]], header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS.values())
+    writer.writerows([_cell(truck.get(column)) for column in EXPORT_COLUMNS] for truck in trucks)
+    return buffer.getvalue()
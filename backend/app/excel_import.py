@@ -0,0 +1,177 @@
+from datetime import datetime
+from typing import IO, Any, Dict, List, Tuple
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from openpyxl.cell.cell import ERROR_CODES
+
+REQUIRED_COLUMNS = {
+    'Terminal': 'terminal',
+    'Truck No': 'truck_no',
+    'Dock Code': 'dock_code',
+    'Route': 'truck_route'
+}
+
+OPTIONAL_COLUMNS = {
+    'Prep Start': 'preparation_start',
+    'Prep End': 'preparation_end',
+    'Load Start': 'loading_start',
+    'Load End': 'loading_end',
+    'Status Prep': 'status_preparation',
+    'Status Load': 'status_loading'
+}
+
+VALID_STATUSES = ['On Process', 'Delay', 'Finished']
+
+# pandas' default ``na_values`` for read_excel
+NA_VALUES = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a',
+    'nan', 'null',
+}
+
+
+def _convert_cell(value):
+    # Same cell conversions as pandas' openpyxl reader plus its default NA strings
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and (value in NA_VALUES or value in ERROR_CODES):
+        return None
+    return value
+
+
+def _column_names(header: List[Any], width: int) -> List[Any]:
+    columns, seen = [], {}
+    for index in range(width):
+        name = header[index] if index < len(header) and header[index] is not None else f"Unnamed: {index}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def read_workbook(fileobj: IO[bytes]) -> pd.DataFrame:
+    """Read the first sheet with openpyxl's read-only (streaming) reader.
+
+    Produces the same frame as ``pd.read_excel`` for import sheets (header
+    row, trailing blank rows trimmed, NA strings as missing), so row numbers
+    and messages in validation errors are unchanged.
+    """
+    workbook = openpyxl.load_workbook(fileobj, read_only=True, data_only=True, keep_links=False)
+    try:
+        worksheet = workbook.worksheets[0]
+        worksheet.reset_dimensions()
+        rows = worksheet.iter_rows(values_only=True)
+        header = [_convert_cell(value) for value in next(rows, ())]
+        while header and header[-1] is None:
+            header.pop()
+
+        # Accumulate column-wise so no per-row objects outlive the loop
+        columns = [[] for _ in header]
+        row_count, last_row_with_data = 0, -1
+        for row in rows:
+            values = [_convert_cell(value) for value in row]
+            while values and values[-1] is None:
+                values.pop()
+            while len(values) > len(columns):
+                columns.append([None] * row_count)
+            values.extend([None] * (len(columns) - len(values)))
+            for column, value in zip(columns, values):
+                column.append(value)
+            row_count += 1
+            if any(value is not None for value in values):
+                last_row_with_data = row_count - 1
+    finally:
+        workbook.close()
+
+    names = _column_names(header, len(columns))
+    for column in columns:
+        del column[last_row_with_data + 1:]
+    return pd.DataFrame(
+        {name: pd.Series(column) for name, column in zip(names, columns)},
+        columns=names,
+        copy=False
+    )
+
+
+def _as_text(series: pd.Series) -> pd.Series:
+    if pd.api.types.infer_dtype(series, skipna=True) != 'string':
+        series = series.astype(str)
+    return series.str.strip()
+
+
+# Every HH:MM label once, so formatted times share string objects
+TIME_LABELS = np.array([f"{hour:02d}:{minute:02d}" for hour in range(24) for minute in range(60)], dtype=object)
+
+
+def _format_times(series: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        minutes = (series.dt.hour * 60 + series.dt.minute).to_numpy()
+        return pd.Series(TIME_LABELS[minutes], index=series.index)
+
+    formatted = {}
+
+    def format_time(value):
+        if value not in formatted:
+            if isinstance(value, datetime):
+                formatted[value] = TIME_LABELS[value.hour * 60 + value.minute]
+            else:
+                formatted[value] = str(value)
+        return formatted[value]
+
+    return series.map(format_time)
+
+
+def validate_trucks(df: pd.DataFrame) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Column-wise conversion of an import sheet into truck dicts and errors."""
+    row_numbers = np.arange(len(df)) + 2
+    output = {}
+    missing_masks = {}
+    errors = []
+
+    for order, (excel_col, db_col) in enumerate(REQUIRED_COLUMNS.items()):
+        series = df[excel_col]
+        text = _as_text(series)
+        missing = series.isna().to_numpy() | (text == '').to_numpy()
+        missing_masks[db_col] = missing
+        output[db_col] = text.astype(object).where(~missing, None)
+        errors.extend((row, order, f"Row {row}: {excel_col} is required") for row in row_numbers[missing])
+
+    for excel_col, db_col in OPTIONAL_COLUMNS.items():
+        if excel_col not in df.columns:
+            continue
+        series = df[excel_col]
+        present = series.notna()
+        if 'start' in db_col or 'end' in db_col:
+            values = _format_times(series[present])
+        else:
+            values = series[present].astype(str)
+        output[db_col] = values.astype(object).reindex(series.index)
+        output[db_col] = output[db_col].where(present, None)
+
+    for db_col in ('status_preparation', 'status_loading'):
+        status = output.get(db_col)
+        if status is None:
+            output[db_col] = pd.Series('On Process', index=df.index, dtype=object)
+        else:
+            output[db_col] = status.where(status.isin(VALID_STATUSES), 'On Process')
+
+    names = list(output)
+    trucks = [dict(zip(names, values)) for values in zip(*(output[name].tolist() for name in names))]
+
+    # Rows with a missing required field keep the other fields, as before
+    for db_col, missing in missing_masks.items():
+        for position in np.flatnonzero(missing):
+            del trucks[position][db_col]
+
+    errors.sort(key=lambda error: (error[0], error[1]))
+    return trucks, [message for _, _, message in errors]
+
+
+def sample_records(df: pd.DataFrame, count: int = 5) -> List[Dict[str, Any]]:
+    head = df.head(count)
+    return head.astype(object).where(head.notna(), None).to_dict('records')
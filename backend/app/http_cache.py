@@ -0,0 +1,67 @@
+import time
+import uuid
+from email.utils import formatdate
+from typing import Dict, Optional
+
+
+class DataVersion:
+    """Version of the truck data as this worker knows it, for ETags.
+
+    ``bump`` on every mutation the worker applies or hears about on the event
+    bus. Tags carry a per-process epoch, so a tag from another worker or an
+    earlier run never matches, and roll over every ``ttl`` seconds, so edits
+    made straight in the database are picked up within that long. Only sound
+    when every worker hears every write, i.e. one worker or a shared bus.
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self.epoch = uuid.uuid4().hex[:8]
+        self.value = 0
+        self.modified = time.time()
+
+    def bump(self):
+        self.value += 1
+        self.modified = time.time()
+
+    def etag(self, variant: str = "") -> str:
+        """``variant`` names a representation other than JSON, e.g. "msgpack"."""
+        period = int(time.time() // self.ttl) if self.ttl > 0 else 0
+        suffix = f"-{variant}" if variant else ""
+        return f'"{self.epoch}-{self.value}-{period}{suffix}"'
+
+    def headers(self, etag: str, cache_control: str) -> Dict[str, str]:
+        return {
+            "ETag": etag,
+            "Last-Modified": formatdate(self.modified, usegmt=True),
+            "Cache-Control": cache_control,
+            # Responses depend on who is asking
+            "Vary": "Authorization",
+        }
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def quality_values(header: str) -> Dict[str, float]:
+    """Accept or Accept-Encoding as {value: q}, e.g. {"br": 1.0, "gzip": 0.5}."""
+    values = {}
+    for part in header.split(","):
+        value, *params = part.split(";")
+        q = 1.0
+        for param in params:
+            name, _, number = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(number)
+                except ValueError:
+                    q = 0.0
+        if value.strip():
+            values[value.strip().lower()] = q
+    return values
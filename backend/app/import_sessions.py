@@ -0,0 +1,211 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+Trucks = List[Dict[str, Any]]
+
+
+@dataclass
+class ImportSession:
+    user_id: str
+    trucks: Trucks
+    size: int
+
+
+def encode_trucks(trucks: Trucks) -> bytes:
+    # Preview rows repeat the same keys and values, so even level 1 shrinks them a lot
+    return zlib.compress(json.dumps(trucks, separators=(",", ":")).encode(), 1)
+
+
+def decode_trucks(payload: bytes) -> Trucks:
+    return json.loads(zlib.decompress(payload))
+
+
+class ImportSessionStore(ABC):
+    """Parsed import previews waiting to be confirmed.
+
+    Sessions are stored compressed, and ``size`` is what one takes up. A
+    session expires ``ttl`` seconds after the preview. Adding one evicts the
+    oldest sessions until at most ``max_sessions`` remain and together they
+    fit in ``max_bytes``; a single preview bigger than that is rejected.
+    """
+
+    def __init__(self, ttl: float = 1800.0, max_sessions: int = 100, max_bytes: int = 256 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+
+    async def put(self, user_id: str, trucks: Trucks) -> str:
+        payload = await asyncio.to_thread(encode_trucks, trucks)
+        if len(payload) > self.max_bytes:
+            raise ValueError("Import is too large to preview")
+        session_id = str(uuid.uuid4())
+        await self._put(session_id, str(user_id), payload)
+        return session_id
+
+    async def get(self, session_id: str) -> Optional[ImportSession]:
+        entry = await self._get(session_id)
+        if entry is None:
+            return None
+        user_id, payload = entry
+        return ImportSession(user_id, await asyncio.to_thread(decode_trucks, payload), len(payload))
+
+    @abstractmethod
+    async def discard(self, session_id: str):
+        ...
+
+    @abstractmethod
+    async def usage(self) -> Tuple[int, int]:
+        """(live sessions, bytes they take up)"""
+
+    @abstractmethod
+    async def _put(self, session_id: str, user_id: str, payload: bytes):
+        ...
+
+    @abstractmethod
+    async def _get(self, session_id: str) -> Optional[Tuple[str, bytes]]:
+        ...
+
+
+class MemorySessionStore(ImportSessionStore):
+    """Sessions in this process's heap; confirm must reach the worker that previewed."""
+
+    def __init__(self, **limits):
+        super().__init__(**limits)
+        # session id -> (expires, user id, payload), oldest first
+        self._sessions: "OrderedDict[str, Tuple[float, str, bytes]]" = OrderedDict()
+        self._bytes = 0
+
+    async def _put(self, session_id: str, user_id: str, payload: bytes):
+        self._purge()
+        self._sessions[session_id] = (time.time() + self.ttl, user_id, payload)
+        self._bytes += len(payload)
+        while len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes:
+            self._pop(next(iter(self._sessions)))
+
+    async def _get(self, session_id: str) -> Optional[Tuple[str, bytes]]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        expires, user_id, payload = entry
+        if expires <= time.time():
+            self._pop(session_id)
+            return None
+        return user_id, payload
+
+    async def discard(self, session_id: str):
+        self._pop(session_id)
+
+    async def usage(self) -> Tuple[int, int]:
+        self._purge()
+        return len(self._sessions), self._bytes
+
+    def _purge(self):
+        now = time.time()
+        # Insertion order is expiry order, since every session has the same ttl
+        while self._sessions and next(iter(self._sessions.values()))[0] <= now:
+            self._pop(next(iter(self._sessions)))
+
+    def _pop(self, session_id: str):
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            self._bytes -= len(entry[2])
+
+
+class SqliteSessionStore(ImportSessionStore):
+    """Sessions spilled to a SQLite file, off the heap and shared by every
+    worker on one host.
+
+    The file must be on a local disk: WAL locking is not safe over a network
+    or shared volume, so replicas on other hosts cannot share it.
+    """
+
+    def __init__(self, path: str, **limits):
+        super().__init__(**limits)
+        self.path = path
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS import_sessions (
+                    id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    expires REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    payload BLOB NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_import_sessions_expires ON import_sessions(expires)")
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection per call: calls run on whichever thread is free
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    async def _put(self, session_id: str, user_id: str, payload: bytes):
+        await asyncio.to_thread(self._put_sync, session_id, user_id, payload)
+
+    def _put_sync(self, session_id: str, user_id: str, payload: bytes):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM import_sessions WHERE expires <= ?", (time.time(),))
+            conn.execute(
+                "INSERT INTO import_sessions (id, user_id, expires, size, payload) VALUES (?, ?, ?, ?, ?)",
+                (session_id, user_id, time.time() + self.ttl, len(payload), payload),
+            )
+            # Keep the newest sessions that fit; evict the rest
+            rows = conn.execute("SELECT id, size FROM import_sessions ORDER BY expires DESC").fetchall()
+            evict, total = [], 0
+            for count, (old_id, size) in enumerate(rows, 1):
+                total += size
+                if count > self.max_sessions or total > self.max_bytes:
+                    evict.append((old_id,))
+            conn.executemany("DELETE FROM import_sessions WHERE id = ?", evict)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    async def _get(self, session_id: str) -> Optional[Tuple[str, bytes]]:
+        return await asyncio.to_thread(
+            self._query_one,
+            "SELECT user_id, payload FROM import_sessions WHERE id = ? AND expires > ?",
+            (session_id, time.time()),
+        )
+
+    async def discard(self, session_id: str):
+        await asyncio.to_thread(self._query_one, "DELETE FROM import_sessions WHERE id = ?", (session_id,))
+
+    async def usage(self) -> Tuple[int, int]:
+        return await asyncio.to_thread(
+            self._query_one,
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM import_sessions WHERE expires > ?",
+            (time.time(),),
+        )
+
+    def _query_one(self, sql: str, params: tuple):
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchone()
+        finally:
+            conn.close()
+
+
+def create_session_store(backend: str, path: Optional[str] = None, **limits) -> ImportSessionStore:
+    if backend == "memory":
+        return MemorySessionStore(**limits)
+    if backend == "sqlite":
+        if not path:
+            raise ValueError("IMPORT_SESSION_STORE=sqlite needs IMPORT_SESSION_PATH")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        return SqliteSessionStore(path, **limits)
+    raise ValueError(f"Unknown import session store: {backend}")
@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import io
+import logging
+import time
+from datetime import datetime
+from email.utils import formatdate
+from typing import Dict, Iterable, NamedTuple, Optional, Set, Tuple
+
+from .database import Database
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_COLUMNS = (
+    'Terminal', 'Truck No', 'Dock Code', 'Route', 'Prep Start', 'Prep End',
+    'Load Start', 'Load End', 'Status Prep', 'Status Load'
+)
+SAMPLE_ROWS = (
+    ('A', 'TRK001', 'DOCK-A1', 'Bangkok-Chonburi', '08:00', '08:30', '09:00', '10:00', 'Finished', 'Finished'),
+    ('B', 'TRK002', 'DOCK-B1', 'Bangkok-Rayong', '09:00', '09:30', '10:00', '', 'Finished', 'On Process'),
+    ('C', 'TRK003', 'DOCK-C1', 'Bangkok-Pattaya', '10:00', '', '', '', 'On Process', 'On Process'),
+)
+STATUSES = ('On Process', 'Delay', 'Finished')
+# Rows of the Template sheet that get the drop-down lists
+VALIDATED_ROWS = 1000
+# Stamped into every workbook so the same inputs give the same bytes, and so
+# the same ETag, on every worker
+CREATED = datetime(2024, 1, 1)
+
+
+def build_template(terminal: Optional[str] = None, docks: Iterable[str] = (), routes: Iterable[str] = ()) -> bytes:
+    """The import template as xlsx bytes.
+
+    Without a terminal it is the generic template with sample rows. For a
+    terminal, the Template sheet is left empty for that terminal's trucks and
+    a Reference sheet lists its known dock codes and routes, offered as
+    drop-downs (new values are still accepted, with a warning).
+    """
+    # Imported on first build (called on a worker thread), not at app start
+    import xlsxwriter
+
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {'in_memory': True})
+    workbook.set_properties({'created': CREATED})
+    header_format = workbook.add_format({
+        'bold': True,
+        'bg_color': '#2196F3',
+        'font_color': 'white',
+        'border': 1,
+        'align': 'center'
+    })
+
+    worksheet = workbook.add_worksheet('Template')
+    worksheet.write_row(0, 0, TEMPLATE_COLUMNS, header_format)
+    worksheet.set_column('A:C', 12)
+    worksheet.set_column('D:D', 20)
+    worksheet.set_column('E:J', 12)
+    worksheet.data_validation(1, 8, VALIDATED_ROWS, 9, {'validate': 'list', 'source': list(STATUSES)})
+    if terminal is None:
+        for row_num, row in enumerate(SAMPLE_ROWS, start=1):
+            worksheet.write_row(row_num, 0, row)
+    else:
+        docks, routes = sorted(docks), sorted(routes)
+        worksheet.data_validation(1, 0, VALIDATED_ROWS, 0, {'validate': 'list', 'source': [terminal]})
+        reference = workbook.add_worksheet('Reference')
+        reference.write_row(0, 0, ('Dock Code', 'Route'), header_format)
+        reference.write_column(1, 0, docks)
+        reference.write_column(1, 1, routes)
+        reference.set_column('A:A', 12)
+        reference.set_column('B:B', 20)
+        for column, values, letter in ((2, docks, 'A'), (3, routes, 'B')):
+            if values:
+                worksheet.data_validation(1, column, VALIDATED_ROWS, column, {
+                    'validate': 'list',
+                    'source': f'=Reference!${letter}$2:${letter}${len(values) + 1}',
+                    'error_type': 'warning',
+                })
+
+    instructions = workbook.add_worksheet('Instructions')
+    instructions.write('A1', 'Import Instructions:', workbook.add_format({'bold': True, 'size': 14}))
+    instructions.write('A3', '1. Fill in the Template sheet with your truck data')
+    instructions.write('A4', '2. Required fields: Terminal, Truck No, Dock Code, Route')
+    instructions.write('A5', '3. Optional fields: Time fields and Status fields')
+    instructions.write('A6', '4. Valid status values: "On Process", "Delay", "Finished"')
+    instructions.write('A7', '5. Time format: HH:MM (24-hour format)')
+    instructions.write('A8', '6. Save the file and upload through the Management page')
+    if terminal is not None:
+        instructions.write('A9', f'7. Dock codes and routes already used at terminal {terminal} are on the Reference sheet')
+    workbook.close()
+    return output.getvalue()
+
+
+class Template(NamedTuple):
+    content: bytes
+    etag: str
+    last_modified: str
+
+
+# terminal -> (dock codes, routes) in use there
+Reference = Dict[str, Tuple[Set[str], Set[str]]]
+
+
+class TemplateCache:
+    """Import template workbooks, built once and served as immutable bytes.
+
+    The generic template never changes, so it is built on first use and kept.
+    Terminal variants are built from the reference data (dock codes and
+    routes per terminal) that ``refresh`` loads, and dropped when it changes:
+    ``observe`` sees every truck mutation, so a new dock or route invalidates
+    its terminal's variant at once, while ``run`` refreshes periodically to
+    pick up values that fell out of use and rebuilds the variants that were
+    in demand. Concurrent requests for a missing variant share one build.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self._reference: Reference = {}
+        # None is the generic template
+        self._builds: Dict[Optional[str], asyncio.Task] = {}
+        self._requested: Set[Optional[str]] = set()
+        self._wake = asyncio.Event()
+
+    async def get(self, terminal: Optional[str] = None) -> Optional[Template]:
+        """The template for ``terminal``; None if no trucks use that terminal."""
+        if terminal is not None and terminal not in self._reference:
+            return None
+        self._requested.add(terminal)
+        build = self._builds.get(terminal)
+        if build is None or (build.done() and (build.cancelled() or build.exception() is not None)):
+            # Built from the reference as it is now: a refresh may drop the
+            # terminal before the task starts
+            reference = self._reference.get(terminal, ((), ()))
+            build = self._builds[terminal] = asyncio.create_task(self._build(terminal, *reference))
+        # Shielded: a client going away must not cancel a build others wait on
+        return await asyncio.shield(build)
+
+    async def _build(self, terminal: Optional[str], docks: Iterable[str], routes: Iterable[str]) -> Template:
+        if terminal is None:
+            content = await asyncio.to_thread(build_template)
+        else:
+            content = await asyncio.to_thread(build_template, terminal, sorted(docks), sorted(routes))
+        etag = '"' + hashlib.sha256(content).hexdigest()[:32] + '"'
+        return Template(content, etag, formatdate(time.time(), usegmt=True))
+
+    def observe(self, truck: dict):
+        """Note a created or updated truck's dock code and route."""
+        terminal = truck.get("terminal")
+        if not self.ready or terminal is None:
+            return
+        docks, routes = self._reference.setdefault(terminal, (set(), set()))
+        dock, route = truck.get("dock_code"), truck.get("truck_route")
+        if (dock and dock not in docks) or (route and route not in routes):
+            if dock:
+                docks.add(dock)
+            if route:
+                routes.add(route)
+            self._builds.pop(terminal, None)
+
+    async def refresh(self, db: Database):
+        """Reload the reference data, dropping the variants it changed."""
+        reference: Reference = {}
+        for row in await db.truck_reference():
+            docks, routes = reference.setdefault(row["terminal"], (set(), set()))
+            docks.add(row["dock_code"])
+            routes.add(row["truck_route"])
+        for terminal in set(self._reference) | set(reference):
+            if self._reference.get(terminal) != reference.get(terminal):
+                self._builds.pop(terminal, None)
+        self._reference = reference
+        self._requested &= {None, *reference}
+        self.ready = True
+
+    async def warm(self):
+        """Build every variant that has been asked for and isn't built yet."""
+        for terminal in sorted(self._requested - set(self._builds), key=lambda t: t or ""):
+            await self.get(terminal)
+
+    def refresh_soon(self):
+        """Wake ``run`` to refresh now, e.g. after another worker's bulk import."""
+        self._wake.set()
+
+    async def run(self, db: Database, interval: float):
+        while True:
+            self._wake.clear()
+            try:
+                await self.refresh(db)
+                await self.warm()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Import template refresh failed: %s", e)
+            try:
+                await asyncio.wait_for(self._wake.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
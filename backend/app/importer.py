@@ -0,0 +1,129 @@
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+
+from .database import Database
+
+REQUIRED_FIELDS = ("terminal", "truck_no", "dock_code", "truck_route")
+# VARCHAR limits from database/schema.sql
+FIELD_LIMITS = {
+    "terminal": 50,
+    "truck_no": 50,
+    "dock_code": 50,
+    "truck_route": 100,
+    "status_preparation": 20,
+    "status_loading": 20,
+}
+
+# (1-based row number in the import, truck data)
+ImportRow = Tuple[int, Dict[str, Any]]
+
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    saved: List[Dict[str, Any]] = field(default_factory=list)
+    failed: List[Dict[str, Any]] = field(default_factory=list)
+
+    def fail(self, rows: List[ImportRow], error: str):
+        for row_no, truck in rows:
+            self.failed.append({
+                "row": row_no,
+                "truck_no": truck.get("truck_no", "Unknown"),
+                "error": error
+            })
+
+
+def validate_truck(truck: Dict[str, Any]) -> Optional[str]:
+    for name in REQUIRED_FIELDS:
+        if not truck.get(name):
+            return f"{name} is required"
+    for name, limit in FIELD_LIMITS.items():
+        value = truck.get(name)
+        if value is not None and len(str(value)) > limit:
+            return f"{name} is longer than {limit} characters"
+    return None
+
+
+async def bulk_upsert_trucks(
+    db: Database,
+    trucks: List[Dict[str, Any]],
+    *,
+    chunk_size: int = 500,
+    concurrency: int = 4,
+    on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+) -> ImportResult:
+    """Upsert ``trucks`` on truck_no in chunks, collecting per-row failures.
+
+    Rows that fail validation never reach the database. If the database
+    rejects a chunk it is bisected until the offending rows are isolated, so
+    one bad row costs a few extra requests rather than a request per row.
+    When a file repeats a truck_no the last row wins, as it would if the rows
+    were applied in order. ``on_progress(done, total)`` is awaited as rows
+    that passed validation are settled.
+    """
+    result = ImportResult()
+    created_at = datetime.utcnow().isoformat()
+
+    latest: Dict[str, ImportRow] = {}
+    superseded: Dict[str, List[ImportRow]] = {}
+    columns = set()
+    for index, truck in enumerate(trucks):
+        row = (index + 1, truck)
+        error = validate_truck(truck)
+        if error:
+            result.fail([row], error)
+            continue
+        truck_no = truck["truck_no"]
+        if truck_no in latest:
+            superseded.setdefault(truck_no, []).append(latest[truck_no])
+        latest[truck_no] = row
+        columns.update(truck)
+
+    # PostgREST bulk writes need the same keys on every object
+    rows = [
+        (row_no, {**{column: truck.get(column) for column in columns}, "created_at": created_at})
+        for row_no, truck in latest.values()
+    ]
+
+    semaphore = asyncio.Semaphore(concurrency)
+    done = 0
+
+    async def settled(chunk: List[ImportRow]):
+        nonlocal done
+        done += len(chunk)
+        if on_progress is not None:
+            await on_progress(done, len(rows))
+
+    async def upsert(chunk: List[ImportRow]):
+        try:
+            async with semaphore:
+                saved = await db.upsert_trucks([truck for _, truck in chunk])
+        except APIError as e:
+            if len(chunk) == 1:
+                fail(chunk, e.message or str(e))
+                await settled(chunk)
+                return
+            middle = len(chunk) // 2
+            await asyncio.gather(upsert(chunk[:middle]), upsert(chunk[middle:]))
+            return
+        except Exception as e:
+            fail(chunk, str(e))
+            await settled(chunk)
+            return
+        result.saved.extend(saved)
+        result.imported += sum(1 + len(superseded.get(truck["truck_no"], [])) for _, truck in chunk)
+        await settled(chunk)
+
+    def fail(chunk: List[ImportRow], error: str):
+        for row in chunk:
+            result.fail([row] + superseded.get(row[1]["truck_no"], []), error)
+
+    await asyncio.gather(*[
+        upsert(rows[start:start + chunk_size]) for start in range(0, len(rows), chunk_size)
+    ])
+    result.failed.sort(key=lambda failure: failure["row"])
+    return result
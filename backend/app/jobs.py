@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FINISHED = ("succeeded", "failed")
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    user_id: str
+    status: str = "queued"  # queued, running, succeeded, failed
+    done: int = 0
+    total: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    def as_dict(self, summary: bool = False) -> dict:
+        data = asdict(self)
+        if summary and self.result:
+            # Counts and flags only; lists such as failed_details stay on the
+            # worker that ran the job, and ``partial`` says they were left out
+            result = {key: value for key, value in self.result.items() if not isinstance(value, (list, dict))}
+            if len(result) < len(self.result):
+                result["partial"] = True
+            data["result"] = result
+        return data
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobRunner:
+    """Runs long jobs on a pool of asyncio workers instead of in the request.
+
+    ``submit`` queues a job and returns at once; at most ``workers`` jobs run
+    at a time and ``max_queued`` wait. Every state change, and progress at
+    most once per ``progress_interval``, is passed to ``on_update``, which
+    publishes a summary so every worker can answer for the job and clients
+    subscribed to it can follow it over /ws; the full result stays here. Finished jobs are kept for ``keep_finished`` lookups.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_queued: int = 100,
+        keep_finished: int = 500,
+        progress_interval: float = 0.5,
+    ):
+        self.workers = workers
+        self.keep_finished = keep_finished
+        self.progress_interval = progress_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        # Key (e.g. an import session) -> job, so submitting twice runs once
+        self._by_key: Dict[str, Job] = {}
+        self._last_report: Dict[str, float] = {}
+        self._tasks: List[asyncio.Task] = []
+        self.on_update: Optional[Callable[[Job], Awaitable[None]]] = None
+
+    def start(self, on_update: Callable[[Job], Awaitable[None]]):
+        self.on_update = on_update
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+
+    async def submit(
+        self,
+        kind: str,
+        user_id: str,
+        work: Callable[[Job], Awaitable[Dict[str, Any]]],
+        key: Optional[str] = None,
+    ) -> Job:
+        existing = self._by_key.get(key) if key else None
+        if existing is not None and existing.status not in FINISHED:
+            return existing
+        job = Job(id=str(uuid.uuid4()), kind=kind, user_id=str(user_id))
+        try:
+            self._queue.put_nowait((job, work, key))
+        except asyncio.QueueFull:
+            raise JobQueueFull("Too many jobs waiting, try again later")
+        if key:
+            self._by_key[key] = job
+        self._track(job)
+        await self._publish(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def track(self, snapshot: dict):
+        """Mirror a job another worker reported."""
+        job = self._jobs.get(snapshot["id"])
+        if job is None or job.status not in FINISHED:
+            self._track(Job(**snapshot))
+
+    async def report(self, job: Job, done: int, total: int):
+        job.done, job.total = done, total
+        now = time.monotonic()
+        if done >= total or now - self._last_report.get(job.id, 0) >= self.progress_interval:
+            self._last_report[job.id] = now
+            await self._publish(job)
+
+    def _track(self, job: Job):
+        self._jobs[job.id] = job
+        self._jobs.move_to_end(job.id)
+        while len(self._jobs) > self.keep_finished:
+            oldest = next((old for old in self._jobs.values() if old.status in FINISHED), None)
+            if oldest is None:
+                break
+            del self._jobs[oldest.id]
+
+    async def _work(self):
+        while True:
+            job, work, key = await self._queue.get()
+            job.status = "running"
+            await self._publish(job)
+            try:
+                job.result = await work(job)
+                job.status = "succeeded"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Job %s (%s) failed", job.id, job.kind)
+                job.status, job.error = "failed", str(e)
+            job.finished_at = time.time()
+            # The work closure holds the job's input (e.g. every truck of an
+            # import); drop it now rather than when the next job arrives
+            del work
+            self._last_report.pop(job.id, None)
+            if key and self._by_key.get(key) is job:
+                del self._by_key[key]
+            self._track(job)
+            await self._publish(job)
+
+    async def _publish(self, job: Job):
+        if self.on_update is None:
+            return
+        try:
+            await self.on_update(job)
+        except Exception as e:
+            logger.warning("Could not publish job %s update: %s", job.id, e)
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, Hashable, Optional
+
+import bcrypt
+
+
+class VerifierBusy(Exception):
+    pass
+
+
+class PasswordVerifier:
+    """Runs bcrypt checks on a dedicated, bounded thread pool.
+
+    bcrypt releases the GIL, so checks on the pool don't stall the event loop.
+    At most ``max_pending`` checks are queued or running; past that ``verify``
+    raises VerifierBusy at once rather than queue the login.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 16):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.max_pending = max_pending
+        self.pending = 0
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        if self.pending >= self.max_pending:
+            raise VerifierBusy("Too many logins in progress, try again shortly")
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, bcrypt.checkpw, plain_password.encode('utf-8'), hashed_password.encode('utf-8')
+            )
+        finally:
+            self.pending -= 1
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class LoginRateLimiter:
+    """Sliding-window limit on failed login attempts per key.
+
+    Keys are checked before any password work, so a client that is over its
+    limit costs no bcrypt time at all. An attempt is recorded as a failure
+    as soon as it is let through, so attempts still being verified count
+    against the limit too; a successful one is then ``forgive``n.
+    """
+
+    def __init__(self, max_attempts: int = 5, window: float = 300.0, max_keys: int = 10000):
+        self.max_attempts = max_attempts
+        self.window = window
+        self.max_keys = max_keys
+        self._failures: Dict[Hashable, Deque[float]] = {}
+
+    def _recent(self, key: Hashable, now: float) -> Optional[Deque[float]]:
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return None
+        return failures
+
+    def retry_after(self, *keys: Hashable) -> float:
+        """Seconds until every key is under its limit again (0 if allowed now)."""
+        now = time.monotonic()
+        wait = 0.0
+        for key in keys:
+            failures = self._recent(key, now)
+            if failures and len(failures) >= self.max_attempts:
+                wait = max(wait, failures[-self.max_attempts] + self.window - now)
+        return wait
+
+    def record_failure(self, *keys: Hashable) -> float:
+        """Count a failure against every key; returns its stamp for ``forgive``."""
+        now = time.monotonic()
+        if len(self._failures) >= self.max_keys:
+            for key in list(self._failures):
+                self._recent(key, now)
+            if len(self._failures) >= self.max_keys:
+                # Still full of active keys: forget the oldest one
+                del self._failures[next(iter(self._failures))]
+        for key in keys:
+            self._failures.setdefault(key, deque()).append(now)
+        return now
+
+    def forgive(self, stamp: float, *keys: Hashable):
+        """Take back the failure ``record_failure`` counted at ``stamp``."""
+        for key in keys:
+            failures = self._failures.get(key)
+            if failures is None:
+                continue
+            try:
+                failures.remove(stamp)
+            except ValueError:
+                continue
+            if not failures:
+                del self._failures[key]
+
+    def reset(self, *keys: Hashable):
+        for key in keys:
+            self._failures.pop(key, None)
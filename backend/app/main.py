@@ -1,25 +1,57 @@
-
-import pandas as pd
-from fastapi import UploadFile, File, Response, FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect
+from fastapi import UploadFile, File, Query, Request, Response, FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from postgrest.exceptions import APIError
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel
-from typing import List, Optional, Dict
+from typing import List, Optional
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from supabase import create_client, Client
-import bcrypt
 import os
 from dotenv import load_dotenv
-import json
 import uuid
-import io
-import xlsxwriter
+import asyncio
+import tempfile
+import importlib
+import logging
+import secrets
+from contextlib import asynccontextmanager
+from urllib.parse import quote
+
+from .columnar import ColumnarResponse, wants_msgpack
+from .compression import CompressionMiddleware
+from .database import TRUCK_COLUMNS, Database, TruckFilters, cursor_of, decode_cursor, encode_cursor
+from .event_bus import create_event_bus
+from .excel_export import XLSX_MEDIA_TYPE, XlsxExport, csv_header, csv_page
+from .http_cache import DataVersion, etag_matches
+from .import_sessions import create_session_store
+from .import_template import Template, TemplateCache
+from .importer import bulk_upsert_trucks
+from .jobs import Job, JobQueueFull, JobRunner
+from .login_guard import LoginRateLimiter, PasswordVerifier, VerifierBusy
+from .metrics import EXCEL_SECONDS, IMPORT_SESSION_BYTES, IMPORT_SESSIONS, WS_CONNECTIONS, MetricsMiddleware
+from .principal_cache import PrincipalCache
+from .stats_cache import StatsCache, summarize_groups
+from .truck_index import TruckIndex
+from .websocket import FILTER_FIELDS, TRUCK_EVENTS, ConnectionManager, Subscription
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="Truck Management System API - Supabase")
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Both are defined further down, once everything they use exists
+    await start_background_tasks()
+    try:
+        yield
+    finally:
+        await close_database()
+
+app = FastAPI(title="Truck Management System API - Supabase", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -28,6 +60,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Configuration
@@ -36,34 +69,267 @@ SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_EXPIRATION_MINUTES = int(os.getenv("JWT_EXPIRATION_MINUTES", "60"))
-
-# Initialize Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "20"))
+DB_MAX_CONCURRENCY = int(os.getenv("DB_MAX_CONCURRENCY", "20"))
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "10"))
+STATS_CACHE_DAYS = int(os.getenv("STATS_CACHE_DAYS", "7"))
+STATS_RECONCILE_SECONDS = float(os.getenv("STATS_RECONCILE_SECONDS", "300"))
+# Days of trucks /api/trucks can answer from memory; 0 always asks the database
+TRUCK_INDEX_DAYS = int(os.getenv("TRUCK_INDEX_DAYS", "1"))
+TRUCK_INDEX_RECONCILE_SECONDS = float(os.getenv("TRUCK_INDEX_RECONCILE_SECONDS", "300"))
+# Responses carry the user's data, so by default only the browser may keep
+# them, revalidating by ETag; put "public" in here only behind a CDN that
+# keys its cache on the Authorization header
+HTTP_CACHE_CONTROL = os.getenv("HTTP_CACHE_CONTROL", "private, no-cache")
+# ETags roll over this often, bounding how long edits made outside the API go unseen
+HTTP_ETAG_TTL = float(os.getenv("HTTP_ETAG_TTL", "300"))
+# Bodies smaller than this go out uncompressed; 0 turns compression off
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+# 4 compresses better than gzip at about the same speed; 11 is for static files
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# Bearer token Prometheus must send to scrape /metrics. Without one /metrics
+# is not served, unless METRICS_PUBLIC opts in (e.g. on a private network)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "false").lower() == "true"
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+IMPORT_CONCURRENCY = int(os.getenv("IMPORT_CONCURRENCY", "4"))
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+# How often the per-terminal import templates re-read the dock codes and routes in use
+TEMPLATE_REFRESH_SECONDS = float(os.getenv("TEMPLATE_REFRESH_SECONDS", "3600"))
+# sqlite keeps previews off the heap and lets any worker on the host confirm
+# (keep the file on a local disk, not a shared volume); memory only works
+# with a single worker
+IMPORT_SESSION_STORE = os.getenv("IMPORT_SESSION_STORE", "sqlite")
+IMPORT_SESSION_PATH = os.getenv(
+    "IMPORT_SESSION_PATH", os.path.join(tempfile.gettempdir(), "truck_import_sessions.sqlite3")
+)
+IMPORT_SESSION_TTL = float(os.getenv("IMPORT_SESSION_TTL", "1800"))
+IMPORT_SESSION_MAX = int(os.getenv("IMPORT_SESSION_MAX", "100"))
+IMPORT_SESSION_MAX_MB = float(os.getenv("IMPORT_SESSION_MAX_MB", "256"))
+IMPORT_JOB_WORKERS = int(os.getenv("IMPORT_JOB_WORKERS", "2"))
+IMPORT_JOB_QUEUE = int(os.getenv("IMPORT_JOB_QUEUE", "100"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+AUTH_TRUST_TOKEN_ROLE = os.getenv("AUTH_TRUST_TOKEN_ROLE", "false").lower() == "true"
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "64"))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+# 0 sends every truck event at once; e.g. 100 merges bursts into batched patches
+WS_COALESCE_MS = float(os.getenv("WS_COALESCE_MS", "0"))
+# Events kept for clients resuming with ?since=<seq>
+WS_REPLAY_SIZE = int(os.getenv("WS_REPLAY_SIZE", "1000"))
+# local, postgres (psycopg, in requirements.txt), redis (install
+# requirements-redis.txt as well) or unix; all but local need EVENT_BUS_URL
+EVENT_BUS = os.getenv("EVENT_BUS", "local")
+EVENT_BUS_URL = os.getenv("EVENT_BUS_URL")
+EVENT_BUS_CHANNEL = os.getenv("EVENT_BUS_CHANNEL", "truck_events")
+# Worker processes uvicorn starts (it reads this variable itself)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+# The stats cache, truck index and ETags are per worker and only hear about
+# other workers' writes over a shared bus; with several workers on the local
+# bus they would serve stale data, so they are turned off
+LOCAL_CACHES = EVENT_BUS != "local" or WEB_CONCURRENCY <= 1
+LOGIN_HASH_WORKERS = int(os.getenv("LOGIN_HASH_WORKERS", "2"))
+# Password checks queued or running per worker; logins past that get a 503
+LOGIN_MAX_PENDING = int(os.getenv("LOGIN_MAX_PENDING", "16"))
+LOGIN_ATTEMPT_WINDOW = float(os.getenv("LOGIN_ATTEMPT_WINDOW", "300"))
+LOGIN_MAX_ATTEMPTS_PER_USER = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_USER", "5"))
+# Higher, since a whole warehouse floor may share one NAT address
+LOGIN_MAX_ATTEMPTS_PER_IP = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_IP", "50"))
+# Proxies in front of the app that append the caller to X-Forwarded-For; the
+# per-IP limit keys on the address the outermost one saw. 0 uses the socket
+# peer, which behind a proxy is the proxy itself, so every user would share
+# one bucket. The Dockerfiles set 1 for Railway's edge proxy
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+if COMPRESS_MIN_BYTES > 0:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=COMPRESS_MIN_BYTES,
+        gzip_level=COMPRESS_GZIP_LEVEL,
+        brotli_quality=COMPRESS_BROTLI_QUALITY,
+    )
+if METRICS_ENABLED:
+    # Outermost, so the timings include compression
+    app.add_middleware(MetricsMiddleware)
+
+# Async Supabase (PostgREST) data access, created at startup so importing the
+# app stays cheap; benchmarks assign their own before startup
+db: Optional[Database] = None
+# Set once the database has answered; /health reports 503 until then
+database_ready = asyncio.Event()
+
+stats_cache = StatsCache(days=STATS_CACHE_DAYS)
+truck_index = TruckIndex(days=TRUCK_INDEX_DAYS)
+template_cache = TemplateCache()
+data_version = DataVersion(ttl=HTTP_ETAG_TTL)
+principal_cache = PrincipalCache(ttl=AUTH_CACHE_TTL, max_size=AUTH_CACHE_SIZE)
+password_verifier = PasswordVerifier(workers=LOGIN_HASH_WORKERS, max_pending=LOGIN_MAX_PENDING)
+username_limiter = LoginRateLimiter(max_attempts=LOGIN_MAX_ATTEMPTS_PER_USER, window=LOGIN_ATTEMPT_WINDOW)
+ip_limiter = LoginRateLimiter(max_attempts=LOGIN_MAX_ATTEMPTS_PER_IP, window=LOGIN_ATTEMPT_WINDOW)
+# Shared between workers/replicas so every worker's sockets see every change
+event_bus = create_event_bus(EVENT_BUS, EVENT_BUS_URL, EVENT_BUS_CHANNEL)
+job_runner = JobRunner(workers=IMPORT_JOB_WORKERS, max_queued=IMPORT_JOB_QUEUE)
+background_tasks = []
+
+async def start_background_tasks():
+    global db
+    if db is None:
+        db = Database(
+            SUPABASE_URL,
+            SUPABASE_KEY,
+            max_connections=DB_MAX_CONNECTIONS,
+            max_concurrency=DB_MAX_CONCURRENCY,
+            timeout=DB_TIMEOUT,
+        )
+    # Doesn't hold up startup: the worker comes up at once and /health
+    # turns healthy when the database first answers
+    background_tasks.append(asyncio.create_task(wait_for_database()))
+    await event_bus.start(handle_event)
+    job_runner.start(publish_job_update)
+    if not LOCAL_CACHES:
+        logger.warning(
+            "WEB_CONCURRENCY=%d with EVENT_BUS=local: stats cache, truck index and ETags are off; "
+            "set EVENT_BUS to share writes between workers", WEB_CONCURRENCY
+        )
+    else:
+        # Both warm up in the background; until ready, the database answers
+        background_tasks.append(asyncio.create_task(stats_cache.run(db, STATS_RECONCILE_SECONDS)))
+        if TRUCK_INDEX_DAYS > 0:
+            background_tasks.append(asyncio.create_task(truck_index.run(db, TRUCK_INDEX_RECONCILE_SECONDS)))
+    background_tasks.append(asyncio.create_task(template_cache.run(db, TEMPLATE_REFRESH_SECONDS)))
+
+async def wait_for_database():
+    delay = 0.5
+    while True:
+        try:
+            await db.ping()
+            database_ready.set()
+            return
+        except Exception as e:
+            logger.warning("Database not reachable yet, retrying in %gs: %s", delay, e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+async def lazy_import(name: str):
+    # pandas, openpyxl and xlsxwriter take hundreds of ms and tens of MB per
+    # worker, so the spreadsheet endpoints load them on first use, on a
+    # thread so that first request doesn't stall the event loop
+    return await run_in_threadpool(importlib.import_module, name, __package__)
+
+async def close_database():
+    for task in background_tasks:
+        task.cancel()
+    password_verifier.close()
+    await job_runner.close()
+    await event_bus.close()
+    await db.close()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+# Postgres error code PostgREST passes through for a unique constraint
+UNIQUE_VIOLATION = "23505"
 
 # WebSocket Manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-    
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-    
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-    
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(json.dumps(message))
-            except:
-                pass
+manager = ConnectionManager(
+    queue_size=WS_QUEUE_SIZE,
+    send_timeout=WS_SEND_TIMEOUT,
+    coalesce_window=WS_COALESCE_MS / 1000,
+    replay_size=WS_REPLAY_SIZE
+)
+WS_CONNECTIONS.set_function(lambda: len(manager.clients))
+import_sessions = create_session_store(
+    IMPORT_SESSION_STORE,
+    IMPORT_SESSION_PATH,
+    ttl=IMPORT_SESSION_TTL,
+    max_sessions=IMPORT_SESSION_MAX,
+    max_bytes=int(IMPORT_SESSION_MAX_MB * 1024 * 1024)
+)
+
+def apply_truck_change(event_type: str, data: dict):
+    # Keep in-memory views current for every truck mutation
+    data_version.bump()
+    if event_type == "truck_deleted":
+        stats_cache.remove(data["id"])
+        truck_index.remove(data["id"])
+    else:
+        stats_cache.apply(data)
+        truck_index.apply(data)
+        template_cache.observe(data)
+
+async def handle_event(event: dict, remote: bool):
+    # Runs on every worker for every published event, including its own
+    message = event["message"]
+    event_type = message["type"]
+    if event_type == "user_cache_invalidated":
+        if message.get("username"):
+            principal_cache.invalidate(message["username"])
+        else:
+            principal_cache.clear()
+        return
+    if remote:
+        if event_type == "job_updated":
+            job_runner.track(message["data"])
+        elif event_type in TRUCK_EVENTS:
+            apply_truck_change(event_type, message["data"])
+        elif event_type in ("trucks_imported", "resync"):
+            stats_cache.refresh_soon()
+            truck_index.invalidate()
+            template_cache.refresh_soon()
+            data_version.bump()
+    await manager.broadcast(message, event.get("previous"))
+
+async def notify_truck_change(event_type: str, data: dict, previous: Optional[dict] = None):
+    # The prior state routes the event to subscribers of values the truck left
+    if previous is None:
+        previous = stats_cache.state(data["id"])
+    apply_truck_change(event_type, data)
+    await event_bus.publish({
+        "message": {"type": event_type, "data": data},
+        "previous": previous
+    })
+
+async def notify_trucks_imported(trucks: List[dict], summary: dict):
+    # One summary frame per import instead of one per row
+    for truck in trucks:
+        apply_truck_change("truck_created", truck)
+    await event_bus.publish({
+        "message": {"type": "trucks_imported", "data": summary}
+    })
+
+async def publish_job_update(job: Job):
+    # Lets any worker answer GET /api/jobs/{id}, and sockets subscribed with
+    # ?job=<id> follow along. Only the summary travels, so the event stays
+    # well under the Postgres NOTIFY payload limit
+    await event_bus.publish({
+        "message": {"type": "job_updated", "data": job.as_dict(summary=True)}
+    })
 
-manager = ConnectionManager()
-import_sessions = {}
+def not_modified(request: Request, response: Response, variant: Optional[str] = None) -> Optional[Response]:
+    """304 if the client's copy is current; otherwise tag ``response`` and return None.
+
+    Call before reading any data: a change made while the response is built
+    then only costs the client one extra download. Endpoints that negotiate
+    their format by Accept pass the chosen ``variant`` ("" for JSON).
+    """
+    if not LOCAL_CACHES:
+        return None
+    etag = data_version.etag(variant or "")
+    headers = data_version.headers(etag, HTTP_CACHE_CONTROL)
+    if variant is not None:
+        headers["Vary"] += ", Accept"
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+def client_address(request: Request) -> str:
+    # Entries left of the ones our proxies appended are whatever the client sent
+    if TRUSTED_PROXY_HOPS > 0:
+        forwarded = [host.strip() for host in request.headers.get("x-forwarded-for", "").split(",") if host.strip()]
+        if len(forwarded) >= TRUSTED_PROXY_HOPS:
+            return forwarded[-TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else "unknown"
 
 # Pydantic Models
 class Token(BaseModel):
@@ -109,8 +375,8 @@ class User(BaseModel):
     role: str
 
 # Helper functions
-def verify_password(plain_password, hashed_password):
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+async def verify_password(plain_password, hashed_password):
+    return await password_verifier.verify(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -136,12 +402,20 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_exception
     
-    result = supabase.table("users").select("*").eq("username", username).execute()
-    if not result.data:
-        raise credentials_exception
+    # Trusted mode: the role was signed into the token at login, so no I/O;
+    # a role change then takes effect when the user's token expires
+    if AUTH_TRUST_TOKEN_ROLE and payload.get("uid") and payload.get("role"):
+        return User(id=payload["uid"], username=username, role=payload["role"])
+    
+    user = principal_cache.get(username)
+    if user is None:
+        row = await db.get_user(username)
+        if not row:
+            raise credentials_exception
+        user = User(id=row["id"], username=row["username"], role=row["role"])
+        principal_cache.put(username, user)
     
-    user = result.data[0]
-    return User(id=user["id"], username=user["username"], role=user["role"])
+    return user
 
 def check_permission(required_role: str):
     def permission_checker(current_user: User = Depends(get_current_user)):
@@ -167,12 +441,19 @@ def read_root():
 
 @app.get("/health")
 async def health_check():
+    if not database_ready.is_set():
+        # Keeps a new instance out of rotation until it can serve
+        return JSONResponse(status_code=503, content={
+            "status": "starting",
+            "database": "connecting",
+            "timestamp": datetime.utcnow().isoformat()
+        })
     try:
-        result = supabase.table("trucks").select("count", count="exact").execute()
+        truck_count = await db.count_trucks()
         return {
             "status": "healthy",
             "database": "connected",
-            "truck_count": result.count,
+            "truck_count": truck_count,
             "timestamp": datetime.utcnow().isoformat()
         }
     except Exception as e:
@@ -183,29 +464,60 @@ async def health_check():
             "timestamp": datetime.utcnow().isoformat()
         }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    if not METRICS_ENABLED or not (METRICS_TOKEN or METRICS_PUBLIC):
+        raise HTTPException(404, "Not Found")
+    if METRICS_TOKEN and not secrets.compare_digest(
+        request.headers.get("authorization", ""), f"Bearer {METRICS_TOKEN}"
+    ):
+        raise HTTPException(401, "Invalid metrics token")
+    count, size = await import_sessions.usage()
+    IMPORT_SESSIONS.set(count)
+    IMPORT_SESSION_BYTES.set(size)
+    # Per worker: scrape each one, or run a single worker
+    return Response(generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
 @app.post("/api/auth/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    result = supabase.table("users").select("*").eq("username", form_data.username).execute()
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    username_key = form_data.username.lower()
+    client_ip = client_address(request)
     
-    if not result.data:
+    # Rejected before any password work, so brute force can't tie up the bcrypt pool
+    retry_after = max(username_limiter.retry_after(username_key), ip_limiter.retry_after(client_ip))
+    if retry_after > 0:
         raise HTTPException(
-            status_code=401,
-            detail="Incorrect username or password",
-            headers={"WWW-Authenticate": "Bearer"},
+            status_code=429,
+            detail="Too many login attempts, try again later",
+            headers={"Retry-After": str(int(retry_after) + 1)},
         )
+    # Counted as failed until proven otherwise (no await since the check), so
+    # a burst of concurrent attempts can't all slip under the limit
+    username_stamp = username_limiter.record_failure(username_key)
+    ip_stamp = ip_limiter.record_failure(client_ip)
     
-    user = result.data[0]
+    user = await db.get_user(form_data.username)
     
-    if not verify_password(form_data.password, user["password_hash"]):
+    try:
+        verified = bool(user) and await verify_password(form_data.password, user["password_hash"])
+    except VerifierBusy as e:
+        # Turned away unverified: not held against the caller
+        username_limiter.forgive(username_stamp, username_key)
+        ip_limiter.forgive(ip_stamp, client_ip)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    if not verified:
         raise HTTPException(
             status_code=401,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    username_limiter.reset(username_key)
+    ip_limiter.forgive(ip_stamp, client_ip)
+    
     access_token_expires = timedelta(minutes=JWT_EXPIRATION_MINUTES)
     access_token = create_access_token(
-        data={"sub": user["username"], "role": user["role"]},
+        data={"sub": user["username"], "uid": user["id"], "role": user["role"]},
         expires_delta=access_token_expires
     )
     
@@ -219,101 +531,90 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
 async def get_me(current_user: User = Depends(get_current_user)):
     return current_user
 
+@app.delete("/api/auth/cache")
+async def invalidate_user_cache(
+    username: Optional[str] = None,
+    current_user: User = Depends(check_permission("admin"))
+):
+    # Call after changing a user's role in the database
+    await event_bus.publish({
+        "message": {"type": "user_cache_invalidated", "username": username}
+    })
+    return {"message": "User cache invalidated"}
+
 @app.get("/api/trucks", response_model=List[Truck])
 async def get_trucks(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    # PostgREST caps a response at 1000 rows
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
     terminal: Optional[str] = None,
     status_preparation: Optional[str] = None,
     status_loading: Optional[str] = None,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
+    dock_code: Optional[str] = None,
+    active: bool = False,
     current_user: User = Depends(get_current_user)
 ):
-    query = supabase.table("trucks").select("*")
-    
-    if terminal:
-        query = query.eq("terminal", terminal)
-    if status_preparation:
-        query = query.eq("status_preparation", status_preparation)
-    if status_loading:
-        query = query.eq("status_loading", status_loading)
-    if date_from:
-        date_from_dt = f"{date_from}T00:00:00"
-        query = query.gte("created_at", date_from_dt)
-    if date_to:
-        date_to_dt = f"{date_to}T23:59:59"
-        query = query.lte("created_at", date_to_dt)
-    
-    query = query.range(skip, skip + limit - 1).order("created_at", desc=True)
-    result = query.execute()
-    
-    trucks = [{
-        "id": truck["id"],
-        "terminal": truck["terminal"],
-        "truck_no": truck["truck_no"],
-        "dock_code": truck["dock_code"],
-        "truck_route": truck["truck_route"],
-        "preparation_start": truck["preparation_start"],
-        "preparation_end": truck["preparation_end"],
-        "loading_start": truck["loading_start"],
-        "loading_end": truck["loading_end"],
-        "status_preparation": truck["status_preparation"],
-        "status_loading": truck["status_loading"],
-        "created_at": truck["created_at"],
-        "updated_at": truck["updated_at"]
-    } for truck in result.data]
-    
-    return trucks
+    filters = TruckFilters(terminal, status_preparation, status_loading, date_from, date_to, dock_code, active)
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(400, "Invalid cursor")
+        skip = 0
+    
+    columnar = wants_msgpack(request.headers.get("accept", ""))
+    unchanged = not_modified(request, response, "msgpack" if columnar else "")
+    if unchanged:
+        return unchanged
+    
+    # Today's board is served from memory; older pages fall through to the database
+    rows = truck_index.lookup(filters, skip, limit, after)
+    if rows is None:
+        # Plain skip/limit still works; follow X-Next-Cursor for deep pages
+        rows = await db.list_trucks(filters, skip, limit, after)
+    
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(cursor_of(rows[-1]))
+    
+    # Rows already have exactly the Truck columns and come from our own
+    # database, so skip re-copying and re-validating them against
+    # response_model (kept for the API docs) and serialize with orjson
+    if columnar:
+        return ColumnarResponse(rows, TRUCK_COLUMNS, headers=response.headers)
+    return ORJSONResponse(rows, headers=response.headers)
 
 @app.get("/api/stats")
 async def get_stats(
+    request: Request,
+    response: Response,
     terminal: Optional[str] = None,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
-    query = supabase.table("trucks").select("terminal, status_preparation, status_loading")
-    
-    if terminal:
-        query = query.eq("terminal", terminal)
-    if date_from:
-        date_from_dt = f"{date_from}T00:00:00"
-        query = query.gte("created_at", date_from_dt)
-    if date_to:
-        date_to_dt = f"{date_to}T23:59:59"
-        query = query.lte("created_at", date_to_dt)
-    
-    result = query.execute()
-    trucks = result.data
-    
-    # Calculate statistics
-    total_trucks = len(trucks)
-    preparation_stats = {"On Process": 0, "Delay": 0, "Finished": 0}
-    loading_stats = {"On Process": 0, "Delay": 0, "Finished": 0}
-    terminal_stats = {}
-    
-    for truck in trucks:
-        # Preparation stats
-        prep_status = truck.get("status_preparation", "On Process")
-        if prep_status in preparation_stats:
-            preparation_stats[prep_status] += 1
-        
-        # Loading stats
-        load_status = truck.get("status_loading", "On Process")
-        if load_status in loading_stats:
-            loading_stats[load_status] += 1
-        
-        # Terminal stats
-        term = truck.get("terminal", "Unknown")
-        terminal_stats[term] = terminal_stats.get(term, 0) + 1
-    
-    return {
-        "total_trucks": total_trucks,
-        "preparation_stats": preparation_stats,
-        "loading_stats": loading_stats,
-        "terminal_stats": terminal_stats
-    }
+    filters = TruckFilters(terminal=terminal, date_from=date_from, date_to=date_to)
+    
+    unchanged = not_modified(request, response)
+    if unchanged:
+        return unchanged
+    
+    # Recent days and the unfiltered totals are served from the incrementally
+    # maintained cache
+    cached = stats_cache.lookup(filters)
+    if cached is not None:
+        return cached
+    
+    groups = await db.truck_status_counts(filters)
+    return summarize_groups(
+        (group["terminal"], group["status_preparation"], group["status_loading"], group["truck_count"])
+        for group in groups
+    )
 @app.post("/api/trucks", response_model=Truck)
 async def create_truck(
     truck: TruckCreate,
@@ -332,85 +633,58 @@ async def create_truck(
         truck_data['status_loading'] = 'On Process'
 
     try:
-        # Check if truck_no already exists
-       # existing = supabase.table("trucks").select("id").eq("truck_no", truck_data['truck_no']).execute()
-        #if existing.data:
-            #raise HTTPException(status_code=400, detail="Truck number already exists")
-
-        # Insert truck into Supabase
-        result = supabase.table("trucks").insert(truck_data).execute()
+        # Insert truck into Supabase; trucks_truck_no_key rejects a duplicate truck_no
+        created_truck = await db.insert_truck(truck_data)
         
-        if not result.data:
+        if not created_truck:
             raise HTTPException(status_code=500, detail="Failed to create truck")
         
-        created_truck = result.data[0]
         
         # Broadcast update via WebSocket
-        await manager.broadcast({
-            "type": "truck_created",
-            "data": created_truck
-        })
+        await notify_truck_change("truck_created", created_truck)
         
         return created_truck
+    except HTTPException:
+        raise
+    except APIError as e:
+        if e.code == UNIQUE_VIOLATION:
+            raise HTTPException(status_code=409, detail=f"Truck number {truck.truck_no} already exists")
+        raise HTTPException(status_code=500, detail=f"Error creating truck: {e.message or str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating truck: {str(e)}")
     
         
-@app.get("/api/trucks/template")
-async def download_import_template():
-    template_data = {
-        'Terminal': ['A', 'B', 'C'],
-        'Truck No': ['TRK001', 'TRK002', 'TRK003'],
-        'Dock Code': ['DOCK-A1', 'DOCK-B1', 'DOCK-C1'],
-        'Route': ['Bangkok-Chonburi', 'Bangkok-Rayong', 'Bangkok-Pattaya'],
-        'Prep Start': ['08:00', '09:00', '10:00'],
-        'Prep End': ['08:30', '09:30', ''],
-        'Load Start': ['09:00', '10:00', ''],
-        'Load End': ['10:00', '', ''],
-        'Status Prep': ['Finished', 'Finished', 'On Process'],
-        'Status Load': ['Finished', 'On Process', 'On Process']
+def template_response(request: Request, template: Template, filename: str, cache_control: str) -> Response:
+    headers = {
+        "ETag": template.etag,
+        "Last-Modified": template.last_modified,
+        "Cache-Control": cache_control,
     }
-    
-    df = pd.DataFrame(template_data)
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, sheet_name='Template', index=False)
-        workbook = writer.book
-        worksheet = writer.sheets['Template']
-        header_format = workbook.add_format({
-            'bold': True,
-            'bg_color': '#2196F3',
-            'font_color': 'white',
-            'border': 1,
-            'align': 'center'
-        })
-        instructions = workbook.add_worksheet('Instructions')
-        instructions.write('A1', 'Import Instructions:', workbook.add_format({'bold': True, 'size': 14}))
-        instructions.write('A3', '1. Fill in the Template sheet with your truck data')
-        instructions.write('A4', '2. Required fields: Terminal, Truck No, Dock Code, Route')
-        instructions.write('A5', '3. Optional fields: Time fields and Status fields')
-        instructions.write('A6', '4. Valid status values: "On Process", "Delay", "Finished"')
-        instructions.write('A7', '5. Time format: HH:MM (24-hour format)')
-        instructions.write('A8', '6. Save the file and upload through the Management page')
-        for col_num, value in enumerate(df.columns.values):
-            worksheet.write(0, col_num, value, header_format)
-        worksheet.set_column('A:A', 12)
-        worksheet.set_column('B:B', 12)
-        worksheet.set_column('C:C', 12)
-        worksheet.set_column('D:D', 20)
-        worksheet.set_column('E:E', 12)
-        worksheet.set_column('F:F', 12)
-        worksheet.set_column('G:G', 12)
-        worksheet.set_column('H:H', 12)
-        worksheet.set_column('I:I', 12)
-        worksheet.set_column('J:J', 12)
-    
-    output.seek(0)
-    return Response(
-        content=output.getvalue(),
-        media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers={'Content-Disposition': 'attachment; filename=truck_import_template.xlsx'}
-    )
+    if etag_matches(request.headers.get("if-none-match"), template.etag):
+        return Response(status_code=304, headers=headers)
+    # The cached bytes go out as they are, never copied or re-encoded
+    # Percent-encoded, as terminal names need not be ASCII
+    headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(filename)}"
+    return Response(content=template.content, media_type=XLSX_MEDIA_TYPE, headers=headers)
+
+@app.get("/api/trucks/template")
+async def download_import_template(request: Request):
+    # The same for everyone, so shared caches may keep it too
+    template = await template_cache.get()
+    return template_response(request, template, "truck_import_template.xlsx", "public, no-cache")
+
+@app.get("/api/trucks/template/{terminal}")
+async def download_terminal_import_template(
+    terminal: str,
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    if not template_cache.ready:
+        await template_cache.refresh(db)
+    template = await template_cache.get(terminal)
+    if template is None:
+        raise HTTPException(status_code=404, detail="Unknown terminal")
+    return template_response(request, template, f"truck_import_template_{terminal}.xlsx", "private, no-cache")
 
 @app.get("/api/trucks/export")
 async def export_trucks_excel(
@@ -419,76 +693,36 @@ async def export_trucks_excel(
     status_loading: Optional[str] = None,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
+    format: str = "xlsx",
     current_user: User = Depends(get_current_user)
 ):
-    query = supabase.table("trucks").select("*")
-    
-    if terminal:
-        query = query.eq("terminal", terminal)
-    if status_preparation:
-        query = query.eq("status_preparation", status_preparation)
-    if status_loading:
-        query = query.eq("status_loading", status_loading)
-    if date_from:
-        date_from_dt = f"{date_from}T00:00:00"
-        query = query.gte("created_at", date_from_dt)
-    if date_to:
-        date_to_dt = f"{date_to}T23:59:59"
-        query = query.lte("created_at", date_to_dt)
+    if format not in ("xlsx", "csv"):
+        raise HTTPException(400, "Format must be xlsx or csv")
+    
+    filters = TruckFilters(terminal, status_preparation, status_loading, date_from, date_to)
+    filename = f'trucks_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{format}'
+    headers = {'Content-Disposition': f'attachment; filename={filename}'}
+    
+    if format == "csv":
+        async def csv_rows():
+            yield csv_header()
+            async for page in db.iter_trucks(filters, EXPORT_PAGE_SIZE):
+                yield csv_page(page)
         
-    result = query.execute()
-    trucks = result.data
-    df = pd.DataFrame(trucks)
-    
-    column_mapping = {
-        'terminal': 'Terminal',
-        'truck_no': 'Truck No',
-        'dock_code': 'Dock Code',
-        'truck_route': 'Route',
-        'preparation_start': 'Prep Start',
-        'preparation_end': 'Prep End',
-        'loading_start': 'Load Start',
-        'loading_end': 'Load End',
-        'status_preparation': 'Status Prep',
-        'status_loading': 'Status Load',
-        'created_at': 'Created Date',
-        'updated_at': 'Last Updated'
-    }
+        return StreamingResponse(csv_rows(), media_type='text/csv', headers=headers)
     
-    df = df.rename(columns=column_mapping)
-    export_columns = [
-        'Terminal', 'Truck No', 'Dock Code', 'Route',
-        'Prep Start', 'Prep End', 'Load Start', 'Load End',
-        'Status Prep', 'Status Load', 'Created Date', 'Last Updated'
-    ]
-    export_columns = [col for col in export_columns if col in df.columns]
-    df = df[export_columns]
-    
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, sheet_name='Trucks', index=False)
-        workbook = writer.book
-        worksheet = writer.sheets['Trucks']
-        header_format = workbook.add_format({
-            'bold': True,
-            'bg_color': '#4CAF50',
-            'font_color': 'white',
-            'border': 1
-        })
-        for col_num, value in enumerate(df.columns.values):
-            worksheet.write(0, col_num, value, header_format)
-        for i, col in enumerate(df.columns):
-            column_width = max(df[col].astype(str).map(len).max(), len(col)) + 2
-            worksheet.set_column(i, i, column_width)
-    
-    output.seek(0)
-    return Response(
-        content=output.getvalue(),
-        media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers={
-            'Content-Disposition': f'attachment; filename=trucks_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-        }
-    )
+    # xlsx needs its zip directory written last, so rows are spooled to a
+    # temp file one page at a time and the finished file is streamed
+    export = await run_in_threadpool(XlsxExport)
+    try:
+        async for page in db.iter_trucks(filters, EXPORT_PAGE_SIZE):
+            await run_in_threadpool(export.write_page, page)
+        await run_in_threadpool(export.close)
+    except Exception:
+        export.file.close()
+        raise
+    
+    return StreamingResponse(export.stream(), media_type=XLSX_MEDIA_TYPE, headers=headers)
 
 @app.post("/api/trucks/import/preview")
 async def preview_excel_import(
@@ -499,81 +733,26 @@ async def preview_excel_import(
         raise HTTPException(400, "File must be Excel format (.xlsx or .xls)")
     
     try:
-        contents = await file.read()
-        df = pd.read_excel(io.BytesIO(contents))
+        excel_import = await lazy_import(".excel_import")
+        # Parse straight from the spooled upload, off the event loop
+        with EXCEL_SECONDS.labels("parse").time():
+            if file.filename.endswith('.xlsx'):
+                df = await run_in_threadpool(excel_import.read_workbook, file.file)
+            else:
+                pd = await lazy_import("pandas")
+                df = await run_in_threadpool(pd.read_excel, file.file)
         
-        required_columns = {
-            'Terminal': 'terminal',
-            'Truck No': 'truck_no', 
-            'Dock Code': 'dock_code',
-            'Route': 'truck_route'
-        }
-        
-        missing_cols = [col for col in required_columns.keys() if col not in df.columns]
+        missing_cols = [col for col in excel_import.REQUIRED_COLUMNS.keys() if col not in df.columns]
         if missing_cols:
             raise HTTPException(400, f"Missing required columns: {', '.join(missing_cols)}")
         
-        optional_columns = {
-            'Prep Start': 'preparation_start',
-            'Prep End': 'preparation_end',
-            'Load Start': 'loading_start',
-            'Load End': 'loading_end',
-            'Status Prep': 'status_preparation',
-            'Status Load': 'status_loading'
-        }
-        
-        trucks_preview = []
-        errors = []
+        with EXCEL_SECONDS.labels("validate").time():
+            trucks_preview, errors = await run_in_threadpool(excel_import.validate_trucks, df)
         
-        for index, row in df.iterrows():
-            try:
-                truck = {}
-                for excel_col, db_col in required_columns.items():
-                    value = row.get(excel_col, '')
-                    if pd.isna(value) or str(value).strip() == '':
-                        errors.append(f"Row {index + 2}: {excel_col} is required")
-                        continue
-                    truck[db_col] = str(value).strip()
-                
-                for excel_col, db_col in optional_columns.items():
-                    if excel_col in df.columns:
-                        value = row.get(excel_col)
-                        if not pd.isna(value):
-                            if 'start' in db_col or 'end' in db_col:
-                                try:
-                                    if isinstance(value, datetime):
-                                        truck[db_col] = value.strftime('%H:%M')
-                                    else:
-                                        truck[db_col] = str(value)
-                                except:
-                                    truck[db_col] = str(value)
-                            else:
-                                truck[db_col] = str(value)
-                        else:
-                            truck[db_col] = None
-                
-                if 'status_preparation' not in truck:
-                    truck['status_preparation'] = 'On Process'
-                if 'status_loading' not in truck:
-                    truck['status_loading'] = 'On Process'
-                
-                valid_statuses = ['On Process', 'Delay', 'Finished']
-                if truck.get('status_preparation') not in valid_statuses:
-                    truck['status_preparation'] = 'On Process'
-                if truck.get('status_loading') not in valid_statuses:
-                    truck['status_loading'] = 'On Process'
-                
-                trucks_preview.append(truck)
-                
-            except Exception as e:
-                errors.append(f"Row {index + 2}: {str(e)}")
-        
-        session_id = str(uuid.uuid4())
-        import_sessions[session_id] = {
-            'trucks': trucks_preview,
-            'user_id': current_user.id,
-            'timestamp': datetime.utcnow()
-        }
+        try:
+            session_id = await import_sessions.put(current_user.id, trucks_preview)
+        except ValueError as e:
+            raise HTTPException(413, str(e))
         
         return {
             "success": True,
@@ -582,78 +761,90 @@ async def preview_excel_import(
             "total_rows": len(trucks_preview),
             "errors": errors,
             "columns_found": list(df.columns),
-            "sample_data": df.head(5).to_dict('records')
+            "sample_data": excel_import.sample_records(df)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(400, f"Error reading Excel file: {str(e)}")
 
-@app.post("/api/trucks/import/confirm")
+@app.post("/api/trucks/import/confirm", status_code=202)
 async def confirm_excel_import(
     data: dict,
     current_user: User = Depends(check_permission("user"))
 ):
     session_id = data.get('session_id')
-    session = import_sessions.get(session_id)
+    session = await import_sessions.get(session_id) if isinstance(session_id, str) else None
     if not session:
         raise HTTPException(400, "Import session not found or expired")
     
-    if session['user_id'] != current_user.id:
+    if session.user_id != str(current_user.id):
         raise HTTPException(403, "Unauthorized")
     
-    trucks_to_import = session['trucks']
-    imported_count = 0
-    failed_imports = []
-    
-    try:
-        for index, truck_data in enumerate(trucks_to_import):
-            try:
-                truck_data['created_at'] = datetime.utcnow().isoformat()
-                existing = supabase.table("trucks").select("id").eq("truck_no", truck_data['truck_no']).execute()
-                
-                if existing.data:
-                    result = supabase.table("trucks").update(truck_data).eq("truck_no", truck_data['truck_no']).execute()
-                else:
-                    result = supabase.table("trucks").insert(truck_data).execute()
-                
-                if result.data:
-                    imported_count += 1
-                    await manager.broadcast({
-                        "type": "truck_created",  # Changed to match frontend
-                        "data": result.data[0]
-                    })
-                    
-            except Exception as e:
-                failed_imports.append({
-                    "row": index + 1,
-                    "truck_no": truck_data.get('truck_no', 'Unknown'),
-                    "error": str(e)
-                })
+    async def run_import(job: Job):
+        result = await bulk_upsert_trucks(
+            db,
+            session.trucks,
+            chunk_size=IMPORT_CHUNK_SIZE,
+            concurrency=IMPORT_CONCURRENCY,
+            on_progress=lambda done, total: job_runner.report(job, done, total),
+        )
         
-        del import_sessions[session_id]
+        await import_sessions.discard(session_id)
+        
+        await notify_trucks_imported(result.saved, {
+            "imported": result.imported,
+            "failed": len(result.failed)
+        })
         
         return {
             "success": True,
-            "imported": imported_count,
-            "failed": len(failed_imports),
-            "failed_details": failed_imports,
-            "message": f"Successfully imported {imported_count} trucks"
+            "imported": result.imported,
+            "failed": len(result.failed),
+            "failed_details": result.failed,
+            "message": f"Successfully imported {result.imported} trucks"
         }
-        
-    except Exception as e:
-        raise HTTPException(500, f"Import failed: {str(e)}")
+    
+    # Runs in the background; poll GET /api/jobs/{id} or subscribe to its job id on /ws
+    try:
+        job = await job_runner.submit("import", current_user.id, run_import, key=session_id)
+    except JobQueueFull as e:
+        raise HTTPException(503, str(e))
+    
+    return job.as_dict()
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    job = job_runner.get(job_id)
+    
+    if not job or (job.user_id != str(current_user.id) and current_user.role != "admin"):
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    # A job another worker ran is known by its summary: result.partial is set
+    # and failed_details are missing
+    return job.as_dict()
 
 @app.get("/api/trucks/{truck_id}", response_model=Truck)
 async def get_truck(
     truck_id: str,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user)
 ):
-    result = supabase.table("trucks").select("*").eq("id", truck_id).execute()
+    unchanged = not_modified(request, response)
+    if unchanged:
+        return unchanged
+    
+    truck = await db.get_truck(truck_id)
     
-    if not result.data:
+    if not truck:
         raise HTTPException(status_code=404, detail="Truck not found")
     
-    return result.data[0]
+    return truck
 
 @app.put("/api/trucks/{truck_id}", response_model=Truck)
 async def update_truck(
@@ -664,16 +855,17 @@ async def update_truck(
     update_data = truck.dict(exclude_unset=True)
     update_data['updated_at'] = datetime.utcnow().isoformat()
     
-    result = supabase.table("trucks").update(update_data).eq("id", truck_id).execute()
+    try:
+        updated_truck = await db.update_truck(truck_id, update_data)
+    except APIError as e:
+        if e.code == UNIQUE_VIOLATION:
+            raise HTTPException(status_code=409, detail=f"Truck number {truck.truck_no} already exists")
+        raise
     
-    if not result.data:
+    if not updated_truck:
         raise HTTPException(status_code=404, detail="Truck not found")
     
-    updated_truck = result.data[0]
-    await manager.broadcast({
-        "type": "truck_updated",
-        "data": updated_truck
-    })
+    await notify_truck_change("truck_updated", updated_truck)
     
     return updated_truck
 
@@ -682,15 +874,12 @@ async def delete_truck(
     truck_id: str,
     current_user: User = Depends(check_permission("admin"))
 ):
-    result = supabase.table("trucks").delete().eq("id", truck_id).execute()
+    deleted_truck = await db.delete_truck(truck_id)
     
-    if not result.data:
+    if not deleted_truck:
         raise HTTPException(status_code=404, detail="Truck not found")
     
-    await manager.broadcast({
-        "type": "truck_deleted",
-        "data": {"id": truck_id}
-    })
+    await notify_truck_change("truck_deleted", {"id": truck_id}, previous=deleted_truck)
     
     return {"message": "Truck deleted successfully"}
 
@@ -710,26 +899,35 @@ async def update_truck_status(
     field = f"status_{status_type}"
     update_data = {field: status, "updated_at": datetime.utcnow().isoformat()}
     
-    result = supabase.table("trucks").update(update_data).eq("id", truck_id).execute()
+    updated_truck = await db.update_truck(truck_id, update_data)
     
-    if not result.data:
+    if not updated_truck:
         raise HTTPException(status_code=404, detail="Truck not found")
     
-    updated_truck = result.data[0]
-    await manager.broadcast({
-        "type": "status_updated",
-        "data": updated_truck
-    })
+    await notify_truck_change("status_updated", updated_truck)
     
     return updated_truck
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+    # /ws?terminal=A&since=<seq>&epoch=<epoch> subscribes and resumes in one step
+    params = websocket.query_params
+    try:
+        subscription = Subscription.from_message(
+            {name: params.getlist(name) for name in FILTER_FIELDS if name in params}
+        )
+        since = int(params["since"]) if "since" in params else None
+    except ValueError:
+        await websocket.close(code=1008)
+        return
+    await manager.connect(websocket, subscription, since, params.get("epoch"))
     try:
         while True:
-            await websocket.receive_text()
-    except WebSocketDisconnect:
+            await manager.handle_message(websocket, await websocket.receive_text())
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the manager already closed a client that fell behind
+        pass
+    finally:
         manager.disconnect(websocket)
 
 if __name__ == "__main__":
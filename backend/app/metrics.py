@@ -0,0 +1,99 @@
+import time
+from typing import Callable, Dict, Optional
+
+from prometheus_client import Counter, Gauge, Histogram, disable_created_metrics
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# The *_created series only double the size of every scrape
+disable_created_metrics()
+
+HTTP_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time from request to the last byte of the response, by route template",
+    ("method", "route", "status"),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "PostgREST queries, including the wait for a concurrency slot",
+    ("table", "operation"),
+    buckets=(0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_ERRORS = Counter("db_query_errors", "PostgREST queries that raised", ("table", "operation"))
+EXCEL_SECONDS = Histogram(
+    "excel_import_duration_seconds",
+    "Import preview work off the event loop",
+    ("stage",),  # parse, validate
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+WS_BROADCASTS = Counter("ws_broadcasts", "Frames broadcast, one per event or coalesced batch")
+WS_FANOUT = Histogram(
+    "ws_broadcast_recipients",
+    "Clients each broadcast frame was queued for",
+    buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+WS_OVERFLOWS = Counter("ws_queue_overflows", "Client send queues collapsed into a resync frame")
+WS_DROPPED = Counter("ws_clients_dropped", "Clients disconnected because a send failed or stalled")
+WS_CONNECTIONS = Gauge("ws_connections", "Open WebSocket clients on this worker")
+IMPORT_SESSIONS = Gauge("import_sessions", "Live import preview sessions")
+IMPORT_SESSION_BYTES = Gauge("import_session_bytes", "Bytes held by live import preview sessions")
+
+# PostgREST verb -> operation label; POST is an upsert when it merges
+# duplicates, and a function call on rpc/
+OPERATIONS = {"GET": "select", "HEAD": "count", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+
+
+def query_labels(query) -> tuple:
+    """(table, operation) of a postgrest request builder."""
+    path = query.path.lstrip("/")
+    if path.startswith("rpc/"):
+        return path, "rpc"
+    operation = OPERATIONS.get(query.http_method, query.http_method.lower())
+    if operation == "insert" and "merge-duplicates" in query.headers.get("prefer", ""):
+        operation = "upsert"
+    return path, operation
+
+
+class MetricsMiddleware:
+    """Observes HTTP_SECONDS for every request.
+
+    Routes are labelled by their template (``/api/trucks/{truck_id}``), not
+    the raw path, so the label set stays as small as the route table;
+    anything unrouted is ``unmatched``. Plain ASGI rather than
+    BaseHTTPMiddleware, which would cost far more than the observation.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._routes: Optional[Dict[Callable, str]] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_observed(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_observed)
+        finally:
+            HTTP_SECONDS.labels(scope["method"], self._route(scope), str(status)).observe(
+                time.perf_counter() - start
+            )
+
+    def _route(self, scope: Scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._routes is None:
+            self._routes = {
+                route.endpoint: route.path
+                for route in scope["app"].routes if hasattr(route, "endpoint")
+            }
+        return self._routes.get(endpoint, "unmatched")
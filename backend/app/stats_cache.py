@@ -0,0 +1,222 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .database import Database, TruckFilters
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ("On Process", "Delay", "Finished")
+
+# (terminal, status_preparation, status_loading)
+GroupKey = Tuple[str, str, str]
+
+
+def summarize_groups(groups: Iterable[Tuple[str, str, str, int]]) -> dict:
+    """Build the /api/stats response from (terminal, prep, load, count) groups."""
+    total_trucks = 0
+    preparation_stats = {status: 0 for status in STATUSES}
+    loading_stats = {status: 0 for status in STATUSES}
+    terminal_stats = {}
+
+    for terminal, prep_status, load_status, count in groups:
+        total_trucks += count
+        prep_status = prep_status or "On Process"
+        if prep_status in preparation_stats:
+            preparation_stats[prep_status] += count
+        load_status = load_status or "On Process"
+        if load_status in loading_stats:
+            loading_stats[load_status] += count
+        terminal = terminal or "Unknown"
+        terminal_stats[terminal] = terminal_stats.get(terminal, 0) + count
+
+    return {
+        "total_trucks": total_trucks,
+        "preparation_stats": preparation_stats,
+        "loading_stats": loading_stats,
+        "terminal_stats": terminal_stats
+    }
+
+
+def _truck_state(truck: dict) -> Tuple[str, GroupKey]:
+    # created_at comes back from PostgREST in UTC, matching the date filters
+    day = (truck.get("created_at") or "")[:10]
+    key = (truck.get("terminal"), truck.get("status_preparation"), truck.get("status_loading"))
+    return day, key
+
+
+class StatsCache:
+    """Status counts per (terminal, day) for the last ``days`` days.
+
+    Seeded from the database, then kept current by ``apply``/``remove`` on every
+    truck mutation so dashboard stats for recent days are answered from memory.
+    Counts for everything older than the window are kept as one total, so the
+    dashboard's unfiltered stats are answered from memory too; a change to a
+    truck outside the window can't be placed, so it wakes ``run``, which
+    reconciles against the database (and periodically anyway, to correct any
+    drift).
+    """
+
+    def __init__(self, days: int = 7):
+        self.days = days
+        self.ready = False
+        self.window_start: Optional[date] = None
+        self._buckets: Dict[str, Counter] = {}
+        # Trucks created before window_start
+        self._history: Counter = Counter()
+        self._trucks: Dict[str, Tuple[str, GroupKey]] = {}
+        self._pending: Optional[List[Tuple[str, dict]]] = None
+        self._wake = asyncio.Event()
+
+    def apply(self, truck: dict):
+        if self._pending is not None:
+            self._pending.append(("apply", truck))
+        self._apply(self._buckets, self._trucks, truck)
+        if self.ready and truck.get("id") not in self._trucks:
+            # Older than the window: its previous state isn't known here
+            self._wake.set()
+
+    def remove(self, truck_id: str):
+        if self._pending is not None:
+            self._pending.append(("remove", {"id": truck_id}))
+        if self.ready and truck_id not in self._trucks:
+            self._wake.set()
+        self._remove(self._buckets, self._trucks, truck_id)
+
+    def state(self, truck_id: str) -> Optional[dict]:
+        """Last known terminal and statuses of a truck in the window, if any."""
+        known = self._trucks.get(truck_id)
+        if known is None:
+            return None
+        terminal, status_preparation, status_loading = known[1]
+        return {
+            "id": truck_id,
+            "terminal": terminal,
+            "status_preparation": status_preparation,
+            "status_loading": status_loading,
+        }
+
+    def _apply(self, buckets, trucks, truck):
+        truck_id = truck.get("id")
+        if truck_id is None:
+            return
+        self._remove(buckets, trucks, truck_id)
+        day, key = _truck_state(truck)
+        if self.window_start and day >= self.window_start.isoformat():
+            buckets.setdefault(day, Counter())[key] += 1
+            trucks[truck_id] = (day, key)
+
+    def _remove(self, buckets, trucks, truck_id):
+        previous = trucks.pop(truck_id, None)
+        if previous:
+            day, key = previous
+            bucket = buckets.get(day)
+            if bucket is not None:
+                bucket[key] -= 1
+                if bucket[key] <= 0:
+                    del bucket[key]
+
+    def _roll_window(self, today: date):
+        window_start = today - timedelta(days=self.days - 1)
+        if self.window_start and window_start > self.window_start:
+            cutoff = window_start.isoformat()
+            for day in [day for day in self._buckets if day < cutoff]:
+                self._history.update(self._buckets.pop(day))
+            self._trucks = {
+                truck_id: state for truck_id, state in self._trucks.items() if state[0] >= cutoff
+            }
+            self.window_start = window_start
+
+    def lookup(self, filters: TruckFilters) -> Optional[dict]:
+        """Return stats for ``filters`` from memory, or None if not cached."""
+        if not self.ready or filters.status_preparation or filters.status_loading:
+            return None
+
+        today = datetime.utcnow().date()
+        self._roll_window(today)
+        if not filters.date_from and not filters.date_to:
+            groups = Counter(self._history)
+            for bucket in self._buckets.values():
+                groups.update(bucket)
+            return self._summarize(groups, filters)
+        if not filters.date_from:
+            return None
+
+        try:
+            first = date.fromisoformat(filters.date_from)
+            last = date.fromisoformat(filters.date_to) if filters.date_to else today
+        except ValueError:
+            return None
+        if first < self.window_start:
+            return None
+
+        groups = Counter()
+        day = first
+        while day <= min(last, today):
+            groups.update(self._buckets.get(day.isoformat(), {}))
+            day += timedelta(days=1)
+
+        return self._summarize(groups, filters)
+
+    @staticmethod
+    def _summarize(groups: Counter, filters: TruckFilters) -> dict:
+        return summarize_groups(
+            (terminal, prep, load, count)
+            for (terminal, prep, load), count in groups.items()
+            if not filters.terminal or terminal == filters.terminal
+        )
+
+    async def reconcile(self, db: Database):
+        """Rebuild the window from the database, replaying mutations seen meanwhile."""
+        today = datetime.utcnow().date()
+        window_start = today - timedelta(days=self.days - 1)
+        self._pending = []
+        try:
+            # Split at the same instant, so every truck lands in exactly one
+            start = f"{window_start.isoformat()}T00:00:00"
+            rows = await db.list_truck_states(start)
+            history = Counter({
+                (group["terminal"], group["status_preparation"], group["status_loading"]): group["truck_count"]
+                for group in await db.truck_status_counts(TruckFilters(created_before=start))
+            })
+        except Exception:
+            self._pending = None
+            raise
+
+        previous_start, self.window_start = self.window_start, window_start
+        buckets: Dict[str, Counter] = {}
+        trucks: Dict[str, Tuple[str, GroupKey]] = {}
+        for row in rows:
+            self._apply(buckets, trucks, row)
+        for op, truck in self._pending:
+            if op == "apply":
+                self._apply(buckets, trucks, truck)
+            else:
+                self._remove(buckets, trucks, truck["id"])
+
+        drift = self.ready and previous_start == window_start and buckets != self._buckets
+        if drift:
+            logger.warning("Stats cache drifted from the database; reconciled")
+        self._buckets, self._trucks, self._history = buckets, trucks, history
+        self._pending = None
+        self.ready = True
+
+    def refresh_soon(self):
+        """Wake ``run`` to reconcile now, e.g. after another worker's bulk import."""
+        self._wake.set()
+
+    async def run(self, db: Database, interval: float):
+        while True:
+            self._wake.clear()
+            try:
+                await self.reconcile(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Stats cache reconcile failed: %s", e)
+            try:
+                await asyncio.wait_for(self._wake.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
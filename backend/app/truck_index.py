@@ -0,0 +1,221 @@
+import asyncio
+import bisect
+import logging
+import operator
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .database import TRUCK_COLUMNS, Database, TruckCursor, TruckFilters, is_active
+
+logger = logging.getLogger(__name__)
+# Few distinct values each, so every record shares the same string objects
+INTERNED_FIELDS = ("terminal", "dock_code", "truck_route", "status_preparation", "status_loading")
+INDEXED_FIELDS = ("terminal", "dock_code", "status_preparation", "status_loading")
+
+# (field, value), e.g. ("terminal", "A")
+IndexKey = Tuple[str, str]
+
+_truck_values = operator.attrgetter(*TRUCK_COLUMNS)
+
+
+class TruckRecord:
+    # ``key`` is the (created_at, id) sort key, one tuple shared by every index
+    __slots__ = TRUCK_COLUMNS + ("key",)
+
+    def __init__(self, row: dict):
+        for name in TRUCK_COLUMNS:
+            value = row.get(name)
+            if name in INTERNED_FIELDS and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(self, name, value)
+        self.key: TruckCursor = (self.created_at, self.id)
+
+    def as_dict(self) -> dict:
+        return dict(zip(TRUCK_COLUMNS, _truck_values(self)))
+
+
+class TruckIndex:
+    """Every truck created in the last ``days`` days, indexed for /api/trucks.
+
+    Loaded from the database, then kept current by ``apply``/``remove`` from
+    the same mutation paths that broadcast. Records are kept in (created_at,
+    id) order with secondary indexes on terminal, dock and both statuses.
+
+    ``lookup`` answers a page from memory only when it can tell the page is
+    complete: the date filter starts inside the window, or the window alone
+    already holds enough matching rows. Otherwise it returns None and the
+    caller asks the database. ``run`` reconciles with the database
+    periodically and logs any drift it corrects.
+    """
+
+    # Below this share of all records, walk the index set instead of the order
+    INDEX_SCAN_RATIO = 0.125
+
+    def __init__(self, days: int = 1):
+        self.days = days
+        self.ready = False
+        self.window_start: Optional[str] = None
+        self._records: Dict[str, TruckRecord] = {}
+        self._order: List[TruckCursor] = []
+        # (field, value) -> keys of the records holding it
+        self._index: Dict[IndexKey, Set[TruckCursor]] = {}
+        self._pending: Optional[List[Tuple[str, dict]]] = None
+        self._invalidations = 0
+        self._wake = asyncio.Event()
+
+    def __len__(self):
+        return len(self._records)
+
+    def apply(self, truck: dict):
+        if self._pending is not None:
+            self._pending.append(("apply", truck))
+        self._apply(truck)
+
+    def remove(self, truck_id: str):
+        if self._pending is not None:
+            self._pending.append(("remove", {"id": truck_id}))
+        self._remove(truck_id)
+
+    def invalidate(self):
+        """Stop answering until reconciled, e.g. after another worker's bulk import."""
+        self.ready = False
+        self._invalidations += 1
+        self._wake.set()
+
+    def _apply(self, truck: dict):
+        truck_id = truck.get("id")
+        if truck_id is None:
+            return
+        self._remove(truck_id)
+        if not self.window_start or not truck.get("created_at") or truck["created_at"] < self.window_start:
+            return
+        record = TruckRecord(truck)
+        self._records[truck_id] = record
+        # New trucks are the newest, so this is nearly always an append
+        bisect.insort(self._order, record.key)
+        for name in INDEXED_FIELDS:
+            self._index.setdefault((name, getattr(record, name)), set()).add(record.key)
+
+    def _remove(self, truck_id: str):
+        record = self._records.pop(truck_id, None)
+        if record is None:
+            return
+        position = bisect.bisect_left(self._order, record.key)
+        del self._order[position]
+        for name in INDEXED_FIELDS:
+            key = (name, getattr(record, name))
+            keys = self._index.get(key)
+            if keys is not None:
+                keys.discard(record.key)
+                if not keys:
+                    del self._index[key]
+
+    def lookup(
+        self,
+        filters: TruckFilters,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[TruckCursor] = None,
+    ) -> Optional[List[dict]]:
+        """Return the page for these arguments from memory, or None if it can't."""
+        if not self.ready or limit <= 0:
+            return None
+        lower, upper = filters.created_from, filters.created_to
+        wanted = skip + limit
+        matches = []
+        for record in self._newest_first(filters, after):
+            if upper and record.created_at > upper:
+                continue
+            if lower and record.created_at < lower:
+                break
+            if filters.status_loading and record.status_loading != filters.status_loading:
+                continue
+            if filters.status_preparation and record.status_preparation != filters.status_preparation:
+                continue
+            if filters.terminal and record.terminal != filters.terminal:
+                continue
+            if filters.dock_code and record.dock_code != filters.dock_code:
+                continue
+            if filters.active and not is_active(record.status_preparation, record.status_loading):
+                continue
+            matches.append(record)
+            if len(matches) == wanted:
+                break
+        # Anything older than the window could still match unless the page is
+        # already full or the date filter stops inside the window
+        if len(matches) < wanted and not (lower and lower >= self.window_start):
+            return None
+        return [record.as_dict() for record in matches[skip:]]
+
+    def _newest_first(self, filters: TruckFilters, after: Optional[TruckCursor]) -> Iterator[TruckRecord]:
+        sets = sorted(
+            (self._index.get((name, getattr(filters, name)), set())
+             for name in INDEXED_FIELDS if getattr(filters, name)),
+            key=len,
+        )
+        candidates = sets[0].intersection(*sets[1:]) if sets else None
+        keys = self._order
+        if candidates is not None and len(candidates) < len(keys) * self.INDEX_SCAN_RATIO:
+            keys = sorted(candidates)
+        end = bisect.bisect_left(keys, after) if after else len(keys)
+        for position in range(end - 1, -1, -1):
+            yield self._records[keys[position][1]]
+
+    async def reconcile(self, db: Database, page_size: int = 1000):
+        """Reload the window from the database, replaying mutations seen meanwhile."""
+        window_start = (datetime.utcnow().date() - timedelta(days=self.days - 1)).isoformat()
+        self._pending = []
+        invalidations = self._invalidations
+        rows = []
+        try:
+            async for page in db.iter_trucks(TruckFilters(date_from=window_start), page_size):
+                rows.extend(page)
+        except Exception:
+            self._pending = None
+            raise
+
+        previous = self._records if self.ready else None
+        self.window_start = f"{window_start}T00:00:00"
+        self._records, self._order, self._index = {}, [], {}
+        self._load(rows)
+        for op, truck in self._pending:
+            if op == "apply":
+                self._apply(truck)
+            else:
+                self._remove(truck["id"])
+        self._pending = None
+
+        if previous is not None:
+            drift = sum(
+                1 for truck_id, record in self._records.items()
+                if truck_id not in previous or previous[truck_id].as_dict() != record.as_dict()
+            ) + sum(1 for truck_id in previous if truck_id not in self._records and
+                    previous[truck_id].created_at >= self.window_start)
+            if drift:
+                logger.warning("Truck index drifted from the database on %d trucks; reconciled", drift)
+        # Invalidated mid-load: the rows may predate the change, so wait for the next pass
+        self.ready = invalidations == self._invalidations
+
+    def _load(self, rows: Iterable[dict]):
+        # Bulk path for reconcile: one sort instead of an insort per row
+        for row in rows:
+            record = TruckRecord(row)
+            self._records[record.id] = record
+            for name in INDEXED_FIELDS:
+                self._index.setdefault((name, getattr(record, name)), set()).add(record.key)
+        self._order = sorted(record.key for record in self._records.values())
+
+    async def run(self, db: Database, interval: float):
+        while True:
+            self._wake.clear()
+            try:
+                await self.reconcile(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Truck index reconcile failed: %s", e)
+            try:
+                await asyncio.wait_for(self._wake.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
@@ -1,26 +1,378 @@
-from typing import List, Dict
-from fastapi import WebSocket
+import asyncio
+import itertools
 import json
+import logging
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Deque, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from fastapi import WebSocket
+
+from .metrics import WS_BROADCASTS, WS_DROPPED, WS_FANOUT, WS_OVERFLOWS
+
+logger = logging.getLogger(__name__)
+
+# Sent in place of a backlog the client fell behind on; it refetches instead
+RESYNC_FRAME = json.dumps({"type": "resync"})
+
+# Events whose data is a truck row; others (imports, resync) are not routed by fields
+TRUCK_EVENTS = {"truck_created", "truck_updated", "status_updated", "truck_deleted"}
+# Only reaches clients subscribed to the job's id
+JOB_EVENT = "job_updated"
+
+FILTER_FIELDS = ("terminal", "dock_code", "status", "event", "job")
+MAX_FILTER_VALUES = 50
+
+# (dimension, value), e.g. ("terminal", "A")
+Topic = Tuple[str, str]
+
+
+def truck_topics(truck: dict) -> List[Topic]:
+    return [
+        ("terminal", truck.get("terminal")),
+        ("dock_code", truck.get("dock_code")),
+        ("status", truck.get("status_preparation")),
+        ("status", truck.get("status_loading")),
+    ]
+
+
+@dataclass(frozen=True)
+class Subscription:
+    """What a client wants to hear about; an empty field matches anything.
+
+    ``status`` matches either the preparation or the loading status. ``job``
+    is the exception: job updates go only to clients that name the job id,
+    and it doesn't narrow any other event.
+    """
+
+    terminal: FrozenSet[str] = frozenset()
+    dock_code: FrozenSet[str] = frozenset()
+    status: FrozenSet[str] = frozenset()
+    event: FrozenSet[str] = frozenset()
+    job: FrozenSet[str] = frozenset()
+
+    @classmethod
+    def from_message(cls, message: dict) -> "Subscription":
+        fields = {}
+        for name in FILTER_FIELDS:
+            value = message.get(name)
+            if value is None:
+                continue
+            values = [value] if isinstance(value, str) else value
+            if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+                raise ValueError(f"{name} must be a string or a list of strings")
+            if len(values) > MAX_FILTER_VALUES:
+                raise ValueError(f"{name} accepts at most {MAX_FILTER_VALUES} values")
+            fields[name] = frozenset(values)
+        return cls(**fields)
+
+    def as_dict(self) -> dict:
+        return {name: sorted(getattr(self, name)) for name in FILTER_FIELDS}
+
+    def index_topics(self) -> List[Topic]:
+        # Indexed under one field only, the most selective one set; the
+        # others are checked per message. No fields: the client hears everything.
+        for name in ("terminal", "dock_code", "status"):
+            values = getattr(self, name)
+            if values:
+                return [(name, value) for value in values]
+        return [("event", value) for value in self.event]
+
+    def matches(self, event_type: str, trucks: Iterable[dict]) -> bool:
+        """Whether the event is wanted; ``trucks`` are its rows (a job's snapshot for job updates)."""
+        if self.event and event_type not in self.event:
+            return False
+        if event_type == JOB_EVENT:
+            return any(job.get("id") in self.job for job in trucks)
+        if event_type not in TRUCK_EVENTS or not (self.terminal or self.dock_code or self.status):
+            return True
+        return any(
+            (not self.terminal or truck.get("terminal") in self.terminal)
+            and (not self.dock_code or truck.get("dock_code") in self.dock_code)
+            and (not self.status or truck.get("status_preparation") in self.status
+                 or truck.get("status_loading") in self.status)
+            for truck in trucks
+        )
+
+
+class ClientConnection:
+    """One socket with its own bounded send queue, drained by a writer task."""
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.writer: Optional[asyncio.Task] = None
+        self.subscription = Subscription()
+
+    def enqueue(self, frame: str):
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            WS_OVERFLOWS.inc()
+            # Collapse the backlog into one resync frame rather than buffer
+            # without bound or stall everyone else
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_FRAME)
+
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-    
-    async def connect(self, websocket: WebSocket):
+    """Fans broadcasts out to WebSocket clients without waiting on any of them.
+
+    ``broadcast`` serializes a message once and only enqueues the frame; each
+    client's writer task sends on its own, so one slow screen delays nobody
+    else. A client whose send stalls past ``send_timeout`` is disconnected.
+
+    Clients narrow what they receive with a ``subscribe`` message. Each
+    subscription is indexed by topic, so a truck event only visits the
+    clients indexed under its terminal, dock, statuses or type, plus those
+    that subscribed to everything.
+
+    With ``coalesce_window`` set, truck events are held for that many
+    seconds and merged per truck id. Updates to a truck the clients already
+    have go out as ``truck_patched`` with only the changed fields, and each
+    client gets everything from the window in one ``batch`` frame.
+
+    Every event gets a ``seq`` number and is kept in a ring buffer of the
+    last ``replay_size`` events. A client that reconnects with the ``since``
+    and ``epoch`` it last saw is sent just the matching events it missed;
+    if they have left the buffer, or the epoch belongs to another worker or
+    an earlier run, it gets a ``resync`` and refetches instead.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 64,
+        send_timeout: float = 10.0,
+        coalesce_window: float = 0.0,
+        patch_cache_size: int = 10000,
+        replay_size: int = 1000,
+    ):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.coalesce_window = coalesce_window
+        self.patch_cache_size = patch_cache_size
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self._everyone: Set[ClientConnection] = set()
+        self._topics: Dict[Topic, Set[ClientConnection]] = {}
+        # Truck id -> event merged within the current window
+        self._pending: "OrderedDict[str, dict]" = OrderedDict()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Truck id -> row as last broadcast, the base for patches
+        self._last_sent: "OrderedDict[str, dict]" = OrderedDict()
+        # Sequence numbers restart with the process; the epoch tells runs apart
+        self.epoch = uuid.uuid4().hex[:12]
+        self.sequence = 0
+        # (seq, message, previous, frame), frames serialized once for all replays
+        self._history: Deque[Tuple[int, dict, Optional[dict], str]] = deque(maxlen=replay_size)
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.clients)
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        subscription: Optional[Subscription] = None,
+        since: Optional[int] = None,
+        epoch: Optional[str] = None,
+    ):
         await websocket.accept()
-        self.active_connections.append(websocket)
-    
+        client = ClientConnection(websocket, self.queue_size)
+        client.subscription = subscription or Subscription()
+        client.enqueue(json.dumps({"type": "hello", "epoch": self.epoch, "last_seq": self.sequence}))
+        if since is not None:
+            # No await between the replay and joining the live stream, so
+            # nothing falls in between or arrives twice
+            self.replay(client, since, epoch)
+        client.writer = asyncio.create_task(self._write(client))
+        self.clients[websocket] = client
+        self._index(client)
+
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-    
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
-    
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
+        client = self.clients.pop(websocket, None)
+        if client is None:
+            return
+        self._unindex(client)
+        if client.writer and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+
+    def subscribe(self, websocket: WebSocket, subscription: Subscription):
+        client = self.clients.get(websocket)
+        if client is None:
+            return
+        self._unindex(client)
+        client.subscription = subscription
+        self._index(client)
+
+    async def handle_message(self, websocket: WebSocket, text: str):
+        client = self.clients.get(websocket)
+        if client is None:
+            return
+        try:
+            message = json.loads(text)
+            if not isinstance(message, dict):
+                raise ValueError("Message must be a JSON object")
+            if message.get("type") != "subscribe":
+                return
+            subscription = Subscription.from_message(message)
+        except ValueError as e:
+            client.enqueue(json.dumps({"type": "error", "detail": str(e)}))
+            return
+        self.subscribe(websocket, subscription)
+        client.enqueue(json.dumps({"type": "subscribed", "filters": subscription.as_dict()}))
+
+    async def broadcast(self, message: dict, previous: Optional[dict] = None):
+        """Send ``message`` to every interested client.
+
+        ``previous`` is the truck as it was before the event (or the deleted
+        row), so clients filtering on a value the truck just left hear about it.
+        """
+        if self.coalesce_window > 0:
+            data = message.get("data") or {}
+            if message.get("type") in TRUCK_EVENTS and data.get("id"):
+                self._coalesce(message["type"], data, previous)
+                return
+            # Keep ordering: anything held back goes out first
+            self.flush()
+
+        message, frame = self._record(message, previous)
+        recipients = self.recipients(message, previous)
+        WS_BROADCASTS.inc()
+        WS_FANOUT.observe(len(recipients))
+        for client in recipients:
+            client.enqueue(frame)
+
+    def _coalesce(self, event_type: str, data: dict, previous: Optional[dict]):
+        pending = self._pending.get(data["id"])
+        if pending is None:
+            self._pending[data["id"]] = {"type": event_type, "data": data, "previous": previous}
+            if self._flush_handle is None:
+                self._flush_handle = asyncio.get_running_loop().call_later(self.coalesce_window, self.flush)
+        elif event_type == "truck_deleted" and pending["type"] == "truck_created":
+            # Created and deleted inside one window: clients never need to know
+            del self._pending[data["id"]]
+        elif event_type == "truck_deleted" or pending["type"] == "status_updated":
+            pending["type"], pending["data"] = event_type, data
+        else:
+            # created + update stays a create; update + status stays an update
+            pending["data"] = data
+
+    def flush(self):
+        """Send everything held in the coalescing window now."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, OrderedDict()
+
+        batches: Dict[ClientConnection, List[str]] = {}
+        for truck_id, event in pending.items():
+            message, full_frame = self._record({"type": event["type"], "data": event["data"]}, event["previous"])
+            patch_frame, base = None, None
+            if event["type"] in ("truck_updated", "status_updated"):
+                # A partial ``previous`` is a fine base too: fields it lacks
+                # simply stay in the patch, including ones cleared to None
+                base = self._last_sent.get(truck_id) or event["previous"]
+            if base is not None:
+                changes = {
+                    key: value for key, value in event["data"].items() if key not in base or base[key] != value
+                }
+                patch_frame = json.dumps({
+                    "type": "truck_patched", "data": {"id": truck_id, **changes}, "seq": message["seq"]
+                })
+
+            for client in self.recipients(message, event["previous"]):
+                # A patch only helps a client that was already shown the truck
+                has_base = patch_frame is not None and client.subscription.matches(event["type"], [base])
+                batches.setdefault(client, []).append(patch_frame if has_base else full_frame)
+            self._remember(truck_id, event)
+
+        if batches:
+            WS_BROADCASTS.inc()
+            WS_FANOUT.observe(len(batches))
+        for client, frames in batches.items():
+            if len(frames) == 1:
+                client.enqueue(frames[0])
+            else:
+                client.enqueue('{"type": "batch", "events": [' + ", ".join(frames) + "]}")
+
+    def _record(self, message: dict, previous: Optional[dict]) -> Tuple[dict, str]:
+        self.sequence += 1
+        message = {**message, "seq": self.sequence}
+        frame = json.dumps(message)
+        self._history.append((self.sequence, message, previous, frame))
+        return message, frame
+
+    def replay(self, client: ClientConnection, since: int, epoch: Optional[str] = None):
+        """Queue the events after ``since`` that match the client's subscription."""
+        oldest = self._history[0][0] if self._history else self.sequence + 1
+        if epoch not in (None, self.epoch) or not oldest - 1 <= since <= self.sequence:
+            client.enqueue(json.dumps({"type": "resync", "seq": self.sequence}))
+            return
+        frames = [
+            frame
+            # Sequence numbers in the buffer are consecutive
+            for _, message, previous, frame in itertools.islice(self._history, since - oldest + 1, None)
+            if client.subscription.matches(
+                message["type"], [truck for truck in (message.get("data"), previous) if truck]
+            )
+        ]
+        if frames:
+            client.enqueue('{"type": "batch", "events": [' + ", ".join(frames) + "]}")
+
+    def _remember(self, truck_id: str, event: dict):
+        if event["type"] == "truck_deleted":
+            self._last_sent.pop(truck_id, None)
+            return
+        self._last_sent[truck_id] = event["data"]
+        self._last_sent.move_to_end(truck_id)
+        while len(self._last_sent) > self.patch_cache_size:
+            self._last_sent.popitem(last=False)
+
+    def recipients(self, message: dict, previous: Optional[dict] = None) -> List[ClientConnection]:
+        event_type = message.get("type")
+        if event_type not in TRUCK_EVENTS:
+            data = [message["data"]] if message.get("data") else []
+            return [client for client in self.clients.values() if client.subscription.matches(event_type, data)]
+
+        trucks = [truck for truck in (message.get("data"), previous) if truck]
+        candidates = set(self._everyone)
+        candidates.update(self._topics.get(("event", event_type), ()))
+        for truck in trucks:
+            for topic in truck_topics(truck):
+                candidates.update(self._topics.get(topic, ()))
+        return [client for client in candidates if client.subscription.matches(event_type, trucks)]
+
+    def _index(self, client: ClientConnection):
+        topics = client.subscription.index_topics()
+        if not topics:
+            self._everyone.add(client)
+        for topic in topics:
+            self._topics.setdefault(topic, set()).add(client)
+
+    def _unindex(self, client: ClientConnection):
+        self._everyone.discard(client)
+        for topic in client.subscription.index_topics():
+            clients = self._topics.get(topic)
+            if clients is not None:
+                clients.discard(client)
+                if not clients:
+                    del self._topics[topic]
+
+    async def _write(self, client: ClientConnection):
+        websocket = client.websocket
+        try:
+            while True:
+                frame = await client.queue.get()
+                await asyncio.wait_for(websocket.send_text(frame), self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info("Dropping WebSocket client: %s", type(e).__name__)
+            WS_DROPPED.inc()
+            self.disconnect(websocket)
             try:
-                await connection.send_text(json.dumps(message))
-            except:
+                await websocket.close(code=1011)
+            except Exception:
                 pass
-
-manager = ConnectionManager()
\ No newline at end of file
@@ -0,0 +1,126 @@
+"""WebSocket fan-out: per-client writer queues vs the old serial broadcast.
+
+Connects ``--clients`` simulated sockets (a few of them on a slow link),
+sends ``--messages`` truck updates ``--interval-ms`` apart, and reports how
+long each broadcast call held the request handler and how long healthy
+clients waited for each frame. Then it times routing one terminal's event as
+other terminals' subscribers are added; the cost should follow the 50
+subscribers of that terminal, not the total connection count.
+
+    python -m benchmarks.broadcast_benchmark --clients 500 --slow 5
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from app.websocket import ConnectionManager, Subscription
+from benchmarks.load_test import percentile
+from benchmarks.seed import generate_trucks
+
+
+class SimulatedSocket:
+    def __init__(self, delay):
+        self.delay = delay
+        self.received = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, frame):
+        await asyncio.sleep(self.delay)
+        self.received.append((time.perf_counter(), frame))
+
+    async def close(self, code=1000):
+        pass
+
+
+class SerialConnectionManager:
+    # The pre-queue implementation
+    def __init__(self):
+        self.active_connections = []
+
+    async def connect(self, websocket):
+        await websocket.accept()
+        self.active_connections.append(websocket)
+
+    async def broadcast(self, message):
+        for connection in self.active_connections:
+            try:
+                await connection.send_text(json.dumps(message))
+            except:  # noqa: E722
+                pass
+
+
+async def run(manager, args):
+    rng = random.Random(1)
+    sockets = [SimulatedSocket(args.slow_delay if i < args.slow else rng.uniform(0.0005, 0.003))
+               for i in range(args.clients)]
+    for websocket in sockets:
+        await manager.connect(websocket)
+
+    trucks = list(generate_trucks(args.messages))
+    sent, hold = {}, []
+    for truck in trucks:
+        message = {"type": "truck_updated", "data": truck}
+        start = time.perf_counter()
+        sent[truck["id"]] = start
+        await manager.broadcast(message)
+        hold.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(args.interval_ms / 1000)
+
+    # Give healthy clients time to drain what is still queued
+    await asyncio.sleep(1)
+    waits = [
+        (received_at - sent[json.loads(frame)["data"]["id"]]) * 1000
+        for websocket in sockets[args.slow:]
+        for received_at, frame in websocket.received
+        if '"hello"' not in frame
+    ]
+    delivered = len(waits) / (args.messages * (args.clients - args.slow))
+    return hold, waits, delivered
+
+
+async def routing(total, interested=50, repeat=200):
+    manager = ConnectionManager()
+    for i in range(total):
+        websocket = SimulatedSocket(0)
+        await manager.connect(websocket)
+        terminal = "A" if i < interested else f"T{i % 40}"
+        manager.subscribe(websocket, Subscription(terminal=frozenset([terminal])))
+    truck = {**next(generate_trucks(1)), "terminal": "A"}
+    start = time.perf_counter()
+    for _ in range(repeat):
+        recipients = manager.recipients({"type": "truck_updated", "data": truck})
+    elapsed = (time.perf_counter() - start) / repeat * 1e6
+    for client in list(manager.clients.values()):
+        client.writer.cancel()
+    return elapsed, len(recipients)
+
+
+async def main(args):
+    print(f"clients={args.clients} slow={args.slow}@{args.slow_delay}s messages={args.messages}")
+    print(f"{'manager':>8} {'hold p50':>9} {'hold max':>9} {'wait p50':>9} {'wait p99':>9} {'delivered':>10}")
+    for name, manager in (("serial", SerialConnectionManager()), ("queued", ConnectionManager())):
+        hold, waits, delivered = await run(manager, args)
+        print(
+            f"{name:>8} {statistics.median(hold):>9.1f} {max(hold):>9.1f} "
+            f"{statistics.median(waits):>9.1f} {percentile(waits, 99):>9.1f} {delivered:>10.0%}"
+        )
+
+    print(f"\n{'clients':>8} {'recipients':>11} {'route us':>9}")
+    for total in (500, 5000, 20000):
+        elapsed, recipients = await routing(total)
+        print(f"{total:>8} {recipients:>11} {elapsed:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--slow", type=int, default=5, help="clients on a slow link")
+    parser.add_argument("--slow-delay", type=float, default=0.5, help="seconds per send for slow clients")
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--interval-ms", type=float, default=50)
+    asyncio.run(main(parser.parse_args()))
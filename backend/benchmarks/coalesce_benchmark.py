@@ -0,0 +1,94 @@
+"""WebSocket burst traffic with and without the coalescing window.
+
+Replays a shift-start rush (``--trucks`` trucks, each moved through
+several status changes in quick succession) through ConnectionManager and
+counts the frames and bytes one board receives. The simulated board
+applies every frame the way the frontend store does, and the script checks
+that it ends up with exactly the server's final rows.
+
+    python -m benchmarks.coalesce_benchmark --trucks 200 --window-ms 100
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from app.websocket import ConnectionManager
+from benchmarks.seed import generate_trucks
+
+STEPS = [
+    ("status_preparation", "Delay"), ("status_preparation", "Finished"),
+    ("status_loading", "Delay"), ("status_loading", "Finished"),
+]
+
+
+class Board:
+    def __init__(self, trucks):
+        self.trucks = {truck["id"]: dict(truck) for truck in trucks}
+        self.frames = 0
+        self.bytes = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, frame):
+        self.frames += 1
+        self.bytes += len(frame.encode())
+        message = json.loads(frame)
+        if message["type"] == "hello":
+            return
+        for event in message["events"] if message["type"] == "batch" else [message]:
+            data = event["data"]
+            if event["type"] == "truck_deleted":
+                self.trucks.pop(data["id"], None)
+            elif event["type"] == "truck_patched":
+                self.trucks[data["id"]].update(data)
+            else:
+                self.trucks[data["id"]] = data
+
+    async def close(self, code=1000):
+        pass
+
+
+async def run(window, trucks, args):
+    manager = ConnectionManager(queue_size=100000, coalesce_window=window)
+    board = Board(trucks)
+    await manager.connect(board)
+    rows = {truck["id"]: dict(truck) for truck in trucks}
+
+    rng = random.Random(3)
+    plan = [(truck_id, step) for truck_id in rows for step in STEPS]
+    # Interleave trucks, keeping each truck's own steps in order
+    rng.shuffle(plan)
+    plan.sort(key=lambda item: STEPS.index(item[1]))
+
+    for truck_id, (field, value) in plan:
+        previous = dict(rows[truck_id])
+        rows[truck_id] = {**previous, field: value, "updated_at": f"{time.time():.6f}"}
+        await manager.broadcast({"type": "status_updated", "data": dict(rows[truck_id])}, previous)
+        await asyncio.sleep(args.interval_ms / 1000)
+    manager.flush()
+    await asyncio.sleep(0.2)
+    # Stop the board's writer task before the loop closes
+    writer = manager.clients[board].writer
+    manager.disconnect(board)
+    await asyncio.gather(writer, return_exceptions=True)
+    return board, board.trucks == rows
+
+
+async def main(args):
+    trucks = list(generate_trucks(args.trucks))
+    print(f"trucks={args.trucks} events={args.trucks * len(STEPS)} interval={args.interval_ms}ms")
+    print(f"{'window ms':>10} {'frames':>8} {'KB':>9} {'correct':>8}")
+    for window_ms in (0, args.window_ms):
+        board, correct = await run(window_ms / 1000, trucks, args)
+        print(f"{window_ms:>10g} {board.frames:>8} {board.bytes / 1024:>9.1f} {str(correct):>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trucks", type=int, default=200)
+    parser.add_argument("--window-ms", type=float, default=100)
+    parser.add_argument("--interval-ms", type=float, default=2, help="gap between events in the burst")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,72 @@
+"""Bytes on the wire and client parse time for a /api/trucks pull.
+
+For ``--sizes`` trucks, encodes the page as JSON and as MessagePack
+columns, each sent as is, gzipped and brotli'd with the middleware's
+defaults, and reports body size, server-side encode + compress time and
+client-side decompress + parse time (rows back as dicts in both cases).
+
+    python -m benchmarks.compression_benchmark --sizes 1000,5000
+"""
+import argparse
+import json
+import zlib
+
+import brotli
+import msgpack
+from fastapi.responses import ORJSONResponse
+
+from app.columnar import ColumnarResponse
+from app.compression import _Encoder
+from app.database import TRUCK_COLUMNS
+from benchmarks.seed import generate_trucks
+from benchmarks.stats_benchmark import time_call
+
+
+def compress(coding, body, args):
+    if coding == "identity":
+        return body
+    return _Encoder(coding, args.gzip_level, args.brotli_quality).compress(body, last=True)
+
+
+def decompress(coding, body):
+    if coding == "gzip":
+        return zlib.decompress(body, 31)
+    if coding == "br":
+        return brotli.decompress(body)
+    return body
+
+
+def parse_json(body):
+    return json.loads(body)
+
+
+def parse_msgpack(body):
+    page = msgpack.unpackb(body)
+    return [dict(zip(page["columns"], values)) for values in zip(*page["data"])]
+
+
+def main(args):
+    formats = {
+        "json": (lambda rows: ORJSONResponse(rows).body, parse_json),
+        "msgpack": (lambda rows: ColumnarResponse(rows, TRUCK_COLUMNS).body, parse_msgpack),
+    }
+    print(f"{'trucks':>7} {'format':>8} {'coding':>9} {'bytes':>9} {'encode ms':>10} {'parse ms':>9}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        rows = list(generate_trucks(size))
+        for name, (encode, parse) in formats.items():
+            body = encode(rows)
+            assert parse(body) == rows, name
+            for coding in ("identity", "gzip", "br"):
+                wire = compress(coding, body, args)
+                encode_ms = time_call(lambda: compress(coding, encode(rows), args), args.repeat)
+                parse_ms = time_call(lambda: parse(decompress(coding, wire)), args.repeat)
+                print(f"{size:>7} {name:>8} {coding:>9} {len(wire):>9} {encode_ms:>10.2f} {parse_ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,5000")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--gzip-level", type=int, default=6)
+    parser.add_argument("--brotli-quality", type=int, default=4)
+    main(parser.parse_args())
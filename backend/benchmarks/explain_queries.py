@@ -0,0 +1,189 @@
+"""EXPLAIN ANALYZE every API query shape against a seeded local Postgres.
+
+Seeds the schema from ``database/schema.sql`` (never point this at
+production: it drops and recreates the tables), then runs each query the
+API sends through PostgREST, written as the SQL PostgREST generates, and
+reports the median execution time, the scans the plan chose and the
+buffers it touched. ``--compare`` runs every shape again under the index
+set schema.sql had before (terminal and status indexes beside the keyset
+index), inside a transaction that is rolled back. ``--plans`` prints each
+plan in full.
+
+    python -m benchmarks.explain_queries --dsn postgresql://localhost/trucks_bench --rows 1000000
+"""
+import argparse
+import statistics
+from datetime import date, timedelta
+
+import psycopg
+
+from benchmarks.seed import TRUCK_COLUMNS, reset_schema, seed_trucks
+
+COLUMNS = ", ".join(TRUCK_COLUMNS)
+NEWEST_FIRST = "ORDER BY created_at DESC, id DESC"
+ACTIVE = "(status_preparation <> 'Finished' OR status_loading <> 'Finished')"
+# schema.sql before the indexes were matched to the query shapes
+PREVIOUS_INDEXES = (
+    "CREATE INDEX idx_terminal ON trucks(terminal)",
+    "CREATE INDEX idx_status ON trucks(status_preparation, status_loading)",
+    "CREATE INDEX idx_created_at_id ON trucks(created_at DESC, id DESC)",
+)
+
+
+def query_shapes(conn):
+    """name -> (sql, params), one per query the API sends."""
+    today = date.today()
+    day_start, day_end = f"{today.isoformat()}T00:00:00", f"{today.isoformat()}T23:59:59"
+    week_ago = f"{(today - timedelta(days=6)).isoformat()}T00:00:00"
+    month_ago = f"{(today - timedelta(days=60)).isoformat()}T00:00:00"
+    # A cursor 50 pages deep, as X-Next-Cursor hands it back
+    created_at, truck_id = conn.execute(
+        f"SELECT created_at, id FROM trucks {NEWEST_FIRST} OFFSET 5000 LIMIT 1"
+    ).fetchone()
+    truck_no = conn.execute("SELECT truck_no FROM trucks LIMIT 1").fetchone()[0]
+    keyset = "created_at <= %(c)s AND (created_at < %(c)s OR (created_at = %(c)s AND id < %(i)s))"
+
+    def page(where="", limit=100):
+        where = f" WHERE {where}" if where else ""
+        return f"SELECT {COLUMNS} FROM trucks{where} {NEWEST_FIRST} LIMIT {limit}"
+
+    return {
+        # GET /api/trucks
+        "trucks": (page(), {}),
+        "trucks terminal": (page("terminal = %(t)s"), {"t": "A"}),
+        "trucks terminal today": (
+            page("terminal = %(t)s AND created_at >= %(f)s AND created_at <= %(u)s"),
+            {"t": "A", "f": day_start, "u": day_end},
+        ),
+        "trucks delayed": (page("status_loading = %(s)s"), {"s": "Delay"}),
+        "trucks finished": (page("status_loading = %(s)s"), {"s": "Finished"}),
+        "trucks dock": (page("dock_code = %(d)s"), {"d": "DOCK-A3"}),
+        "trucks active": (page(ACTIVE), {}),
+        "trucks active terminal": (page(f"terminal = %(t)s AND {ACTIVE}"), {"t": "A"}),
+        "trucks cursor": (page(keyset), {"c": created_at, "i": truck_id}),
+        "trucks terminal history": (
+            page("terminal = %(t)s AND created_at >= %(f)s AND created_at <= %(u)s"),
+            {"t": "A", "f": month_ago, "u": week_ago},
+        ),
+        "trucks offset": (page() + " OFFSET 5000", {}),
+        # GET /api/trucks/export, one keyset page
+        "export week": (page("created_at >= %(f)s", limit=1000), {"f": week_ago}),
+        "export terminal week": (
+            page("terminal = %(t)s AND created_at >= %(f)s", limit=1000), {"t": "A", "f": week_ago}
+        ),
+        # GET /api/stats
+        "stats today": ("SELECT * FROM truck_stats(NULL, %(f)s, %(u)s)", {"f": day_start, "u": day_end}),
+        "stats terminal week": ("SELECT * FROM truck_stats(%(t)s, %(f)s, NULL)", {"t": "A", "f": week_ago}),
+        "stats all": ("SELECT * FROM truck_stats()", {}),
+        # Background reconciles: stats cache, truck index, import templates
+        "truck states week": (
+            "SELECT id, terminal, status_preparation, status_loading, created_at FROM trucks "
+            "WHERE created_at >= %(f)s ORDER BY id LIMIT 1000",
+            {"f": week_ago},
+        ),
+        "truck reference": (
+            "SELECT * FROM truck_reference() ORDER BY terminal, dock_code, truck_route LIMIT 1000", {}
+        ),
+        # Single trucks and the import upsert
+        "truck by id": (f"SELECT {COLUMNS} FROM trucks WHERE id = %(i)s", {"i": truck_id}),
+        "upsert truck_no": (
+            "INSERT INTO trucks (terminal, truck_no, dock_code, truck_route) VALUES (%(t)s, %(n)s, %(d)s, %(r)s) "
+            "ON CONFLICT (truck_no) DO UPDATE SET dock_code = excluded.dock_code",
+            {"t": "A", "n": truck_no, "d": "DOCK-A1", "r": "Bangkok-Rayong"},
+        ),
+        "count": ("SELECT count(*) FROM trucks", {}),
+    }
+
+
+def scans(plan, found=None):
+    """The scan nodes of a JSON plan, e.g. "Index Only Scan idx_created_at_id"."""
+    found = [] if found is None else found
+    if "Scan" in plan["Node Type"]:
+        target = plan.get("Index Name") or plan.get("Relation Name") or plan.get("Function Name") or ""
+        found.append(f"{plan['Node Type']} {target}".strip())
+    for child in plan.get("Plans", ()):
+        scans(child, found)
+    return found
+
+
+def explain(cursor, sql, params, repeat, show_plan):
+    """(median ms, scans, shared buffers) of ``sql``."""
+    times = []
+    for _ in range(repeat):
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+        result = cursor.fetchone()[0][0]
+        times.append(result["Execution Time"])
+    plan = result["Plan"]
+    if show_plan:
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + sql, params)
+        print("\n".join(row[0] for row in cursor.fetchall()) + "\n")
+    buffers = plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0)
+    return statistics.median(times), ", ".join(dict.fromkeys(scans(plan))), buffers
+
+
+def run_shapes(conn, shapes, repeat, show_plan):
+    # Client-side binding: the plans see the literal values, like the
+    # custom plans PostgREST's parameterised queries get
+    cursor = psycopg.ClientCursor(conn)
+    results = {}
+    for name, (sql, params) in shapes.items():
+        # The upsert writes; every shape runs in a transaction that is undone
+        with conn.transaction(force_rollback=True):
+            results[name] = explain(cursor, sql, params, repeat, show_plan)
+    return results
+
+
+def use_previous_indexes(conn):
+    indexes = conn.execute(
+        "SELECT indexname FROM pg_indexes WHERE tablename = 'trucks' "
+        "AND indexname NOT IN ('trucks_pkey', 'trucks_truck_no_key')"
+    ).fetchall()
+    for (index,) in indexes:
+        conn.execute(f"DROP INDEX {index}")
+    for statement in PREVIOUS_INDEXES:
+        conn.execute(statement)
+    conn.execute("ANALYZE trucks")
+
+
+def main(args):
+    with psycopg.connect(args.dsn, autocommit=True) as conn:
+        seeded = 0
+        if args.reuse and conn.execute("SELECT to_regclass('trucks')").fetchone()[0]:
+            seeded = conn.execute("SELECT count(*) FROM trucks").fetchone()[0]
+        if seeded < args.rows:
+            reset_schema(conn)
+            seed_trucks(conn, args.rows)
+        # Sets the visibility map, so index-only scans don't visit the heap
+        conn.execute("VACUUM ANALYZE trucks")
+
+        shapes = query_shapes(conn)
+        current = run_shapes(conn, shapes, args.repeat, args.plans)
+        previous = None
+        if args.compare:
+            with conn.transaction(force_rollback=True):
+                use_previous_indexes(conn)
+                previous = run_shapes(conn, shapes, args.repeat, args.plans)
+
+    header = f"{'shape':<24} {'ms':>9} {'buffers':>8}"
+    if previous:
+        header += f" {'before ms':>10} {'buffers':>8}"
+    print(header + "  scans")
+    for name, (ms, plan_scans, buffers) in current.items():
+        line = f"{name:<24} {ms:>9.3f} {buffers:>8}"
+        if previous:
+            before_ms, before_scans, before_buffers = previous[name]
+            line += f" {before_ms:>10.3f} {before_buffers:>8}"
+        print(line + f"  {plan_scans}")
+        if previous and before_scans != plan_scans:
+            print(f"{'':<24} {'':>9} {'':>8} {'':>10} {'':>8}  before: {before_scans}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", required=True, help="local Postgres connection string")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--reuse", action="store_true", help="keep an already seeded table of at least --rows")
+    parser.add_argument("--compare", action="store_true", help="also run under the previous index set")
+    parser.add_argument("--plans", action="store_true", help="print every plan in full")
+    main(parser.parse_args())
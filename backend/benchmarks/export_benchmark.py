@@ -0,0 +1,98 @@
+"""Trucks export: keyset-paged streaming writer vs DataFrame + BytesIO.
+
+Exports a synthetic trucks table of each size through the in-memory
+PostgREST stand-in, each strategy in a fresh subprocess so the peak RSS
+added by the export itself (on top of the fake table) is measured alone.
+The stand-in has no indexes, so every keyset page is a full scan there;
+read the seconds column as an upper bound, the peak MB column as the result.
+
+    python -m benchmarks.export_benchmark --sizes 10000,50000,100000
+"""
+import argparse
+import asyncio
+import io
+import multiprocessing
+import resource
+import time
+
+from benchmarks.fake_postgrest import FakePostgrest
+from benchmarks.seed import generate_trucks
+
+
+def dataframe_export(trucks):
+    # The pre-streaming implementation
+    import pandas as pd
+
+    from app.excel_export import EXPORT_COLUMNS
+
+    df = pd.DataFrame(trucks).rename(columns=EXPORT_COLUMNS)
+    df = df[[col for col in EXPORT_COLUMNS.values() if col in df.columns]]
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df.to_excel(writer, sheet_name='Trucks', index=False)
+        worksheet = writer.sheets['Trucks']
+        for i, col in enumerate(df.columns):
+            worksheet.set_column(i, i, max(df[col].astype(str).map(len).max(), len(col)) + 2)
+    return len(output.getvalue())
+
+
+async def export(strategy, db):
+    from app.database import TruckFilters
+    from app.excel_export import XlsxExport, csv_header, csv_page
+
+    filters = TruckFilters()
+    if strategy == 'dataframe':
+        result = await db.execute(db.table('trucks').select('*'))
+        return dataframe_export(result.data)
+    size = 0
+    if strategy == 'csv':
+        size += len(csv_header().encode())
+        async for page in db.iter_trucks(filters):
+            size += len(csv_page(page).encode())
+        return size
+    workbook = XlsxExport()
+    async for page in db.iter_trucks(filters):
+        workbook.write_page(page)
+    workbook.close()
+    return sum(len(chunk) for chunk in workbook.stream())
+
+
+def measure(strategy, rows, queue):
+    import pandas  # noqa: F401  (imported up front so RSS deltas exclude it)
+
+    from app.database import Database
+
+    fake = FakePostgrest()
+    fake.tables['trucks'] = list(generate_trucks(rows))
+    db = Database('http://fake.local', 'benchmark-key', transport=fake)
+
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    size = asyncio.run(export(strategy, db))
+    elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss
+    queue.put((elapsed, peak_rss / 1024, size))
+
+
+def run(strategy, rows):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=measure, args=(strategy, rows, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main(args):
+    multiprocessing.set_start_method('spawn')
+    print(f"{'rows':>8} {'strategy':>10} {'seconds':>8} {'peak MB':>8} {'bytes':>10}")
+    for size in [int(size) for size in args.sizes.split(',')]:
+        for strategy in ('dataframe', 'xlsx', 'csv'):
+            elapsed, peak_mb, output_bytes = run(strategy, size)
+            print(f"{size:>8} {strategy:>10} {elapsed:>8.2f} {peak_mb:>8.1f} {output_bytes:>10}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10000,50000,100000')
+    main(parser.parse_args())
@@ -0,0 +1,269 @@
+"""In-memory stand-in for the Supabase PostgREST API.
+
+Implements the subset of PostgREST the backend uses (filters, ordering,
+ranges, exact counts, bulk insert/upsert, update, delete and the RPC
+functions from ``database/schema.sql``) as an httpx transport, with an
+optional per-request delay to model the network round trip and an optional
+``max_rows`` cap like PostgREST's. Pass it as a ``Database``'s
+``transport`` to benchmark handlers without a real Supabase project.
+"""
+import asyncio
+import json
+import re
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional
+from urllib.parse import parse_qsl
+
+import httpx
+
+from app.importer import FIELD_LIMITS
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+TIME_COLUMNS = ("preparation_start", "preparation_end", "loading_start", "loading_end")
+TIME_PATTERN = re.compile(r"^([01]?\d|2[0-3]):[0-5]\d(:[0-5]\d(\.\d+)?)?$")
+
+
+def _error(status, code, message):
+    return httpx.Response(status, json={"code": code, "message": message, "details": None, "hint": None})
+
+
+def _parse_value(value):
+    return value.strip('"')
+
+
+def _compare(row_value, op, value):
+    if op == "is":
+        return row_value is None if value == "null" else str(row_value).lower() == value
+    if op == "in":
+        return str(row_value) in [_parse_value(v) for v in value.strip("()").split(",")]
+    if row_value is None:
+        return False
+    row_value = str(row_value)
+    value = _parse_value(value)
+    return {
+        "eq": row_value == value,
+        "neq": row_value != value,
+        "gt": row_value > value,
+        "gte": row_value >= value,
+        "lt": row_value < value,
+        "lte": row_value <= value,
+    }[op]
+
+
+def _condition(column, expression):
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, value = expression.partition(".")
+    return lambda row: _compare(row.get(column), op, value) != negate
+
+
+def _split_logic(body):
+    parts, depth, current = [], 0, ""
+    for char in body:
+        if char == "," and depth == 0:
+            parts.append(current)
+            current = ""
+            continue
+        depth += char == "("
+        depth -= char == ")"
+        current += char
+    parts.append(current)
+    return parts
+
+
+def _logic(kind, body):
+    # or=(a.eq.1,and(b.gt.2,c.lt.3))
+    conditions = []
+    for part in _split_logic(body[1:-1]):
+        if part.startswith(("and(", "or(")):
+            inner_kind, _, inner = part.partition("(")
+            conditions.append(_logic(inner_kind, "(" + inner))
+        else:
+            column, _, expression = part.partition(".")
+            conditions.append(_condition(column, expression))
+    combine = any if kind == "or" else all
+    return lambda row: combine(condition(row) for condition in conditions)
+
+
+class FakePostgrest(httpx.AsyncBaseTransport):
+    def __init__(self, latency_ms: float = 0.0, max_rows: Optional[int] = None):
+        self.latency = latency_ms / 1000
+        self.max_rows = max_rows
+        self.tables = {"trucks": [], "users": []}
+        self.unique = {"trucks": "truck_no", "users": "username"}
+        self.requests = Counter()
+
+    async def handle_async_request(self, request):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        path = request.url.path.rsplit("/rest/v1/", 1)[-1]
+        params = parse_qsl(request.url.query.decode(), keep_blank_values=True)
+        await request.aread()
+        body = json.loads(request.content) if request.content else None
+        self.requests[(request.method, path)] += 1
+
+        if path.startswith("rpc/"):
+            return self._page(self.rpc(path[4:], body or {}), params)
+        table = self.tables.setdefault(path, [])
+        if request.method in ("GET", "HEAD"):
+            return self.select(table, params, request.headers)
+        if request.method == "POST":
+            return self.insert(path, table, body, dict(params), request.headers)
+        if request.method == "PATCH":
+            return self.update(table, body, params)
+        if request.method == "DELETE":
+            return self.delete(table, params)
+        return _error(405, "PGRST000", f"Unsupported method {request.method}")
+
+    # Query helpers
+    def _filter(self, table, params):
+        conditions = []
+        for key, value in params:
+            if key in RESERVED_PARAMS:
+                continue
+            if key in ("or", "and"):
+                conditions.append(_logic(key, value))
+            else:
+                conditions.append(_condition(key, value))
+        return [row for row in table if all(condition(row) for condition in conditions)]
+
+    @staticmethod
+    def _order(rows, order):
+        for part in reversed(order.split(",")):
+            column, *modifiers = part.split(".")
+            descending = "desc" in modifiers
+            present = [row for row in rows if row.get(column) is not None]
+            missing = [row for row in rows if row.get(column) is None]
+            present.sort(key=lambda row: str(row[column]), reverse=descending)
+            rows = present + missing if "nullsfirst" not in modifiers else missing + present
+        return rows
+
+    def _cap(self, start, stop):
+        if self.max_rows is None:
+            return stop
+        return start + self.max_rows if stop is None else min(stop, start + self.max_rows)
+
+    def _page(self, response, params):
+        """Order and slice a function's rows, as PostgREST does for set-returning RPCs."""
+        if response.status_code != 200:
+            return response
+        query = dict(params)
+        rows = response.json()
+        if "order" in query:
+            rows = self._order(rows, query["order"])
+        start = int(query.get("offset", 0))
+        stop = start + int(query["limit"]) if "limit" in query else None
+        return httpx.Response(200, json=rows[start:self._cap(start, stop)])
+
+    @staticmethod
+    def _project(rows, select):
+        if not select or select == "*":
+            return [dict(row) for row in rows]
+        columns = [column.strip() for column in select.split(",")]
+        return [{column: row.get(column) for column in columns} for row in rows]
+
+    def select(self, table, params, headers):
+        query = dict(params)
+        rows = self._filter(table, params)
+        total = len(rows)
+        if "order" in query:
+            rows = self._order(rows, query["order"])
+        start = int(query.get("offset", 0))
+        stop = start + int(query["limit"]) if "limit" in query else None
+        if "range" in headers:
+            first, _, last = headers["range"].partition("-")
+            start, stop = int(first), int(last) + 1
+        rows = rows[start:self._cap(start, stop)]
+
+        response_headers = {"content-range": f"{start}-{start + len(rows) - 1}/{total}"}
+        if query.get("select") == "count":
+            return httpx.Response(200, json=[{"count": total}], headers=response_headers)
+        return httpx.Response(200, json=self._project(rows, query.get("select")), headers=response_headers)
+
+    def _validate(self, row):
+        for column, limit in FIELD_LIMITS.items():
+            value = row.get(column)
+            if value is not None and len(str(value)) > limit:
+                return _error(400, "22001", f"value too long for type character varying({limit})")
+        for column in TIME_COLUMNS:
+            value = row.get(column)
+            if value is not None and not TIME_PATTERN.match(str(value)):
+                return _error(400, "22007", f'invalid input syntax for type time: "{value}"')
+        return None
+
+    def insert(self, name, table, body, query, headers):
+        rows = body if isinstance(body, list) else [body]
+        unique = self.unique.get(name)
+        merge = "resolution=merge-duplicates" in headers.get("prefer", "")
+        conflict = query.get("on_conflict") or unique
+        existing = {row.get(conflict): row for row in table} if conflict else {}
+
+        saved, seen = [], set()
+        for row in rows:
+            error = self._validate(row) if name == "trucks" else None
+            if error:
+                return error
+            key = row.get(conflict) if conflict else None
+            if key is not None and key in seen:
+                return _error(400, "21000", "ON CONFLICT DO UPDATE command cannot affect row a second time")
+            seen.add(key)
+            if key is not None and key in existing:
+                if not merge:
+                    return _error(409, "23505", f"duplicate key value violates unique constraint on {conflict}")
+                saved.append(existing[key])
+                continue
+            saved.append(None)
+
+        now = datetime.now(timezone.utc).isoformat()
+        for index, row in enumerate(rows):
+            if saved[index] is not None:
+                saved[index].update(row)
+                continue
+            new_row = {"id": str(uuid.uuid4()), "created_at": now, "updated_at": now}
+            if name == "trucks":
+                new_row.update({"status_preparation": "On Process", "status_loading": "On Process"})
+            new_row.update({key: value for key, value in row.items() if value is not None or key not in new_row})
+            table.append(new_row)
+            saved[index] = new_row
+        return httpx.Response(201, json=[dict(row) for row in saved])
+
+    def update(self, table, body, params):
+        rows = self._filter(table, params)
+        unique = next((column for name, column in self.unique.items() if self.tables[name] is table), None)
+        updated = {id(row) for row in rows}
+        if unique in body and any(row[unique] == body[unique] and id(row) not in updated for row in table):
+            return _error(409, "23505", f"duplicate key value violates unique constraint on {unique}")
+        for row in rows:
+            row.update(body)
+        return httpx.Response(200, json=[dict(row) for row in rows])
+
+    def delete(self, table, params):
+        rows = self._filter(table, params)
+        ids = {id(row) for row in rows}
+        table[:] = [row for row in table if id(row) not in ids]
+        return httpx.Response(200, json=rows)
+
+    def rpc(self, name, body):
+        if name == "truck_stats":
+            groups = Counter()
+            for row in self.tables["trucks"]:
+                if body.get("p_terminal") and row["terminal"] != body["p_terminal"]:
+                    continue
+                if body.get("p_date_from") and str(row["created_at"]) < body["p_date_from"]:
+                    continue
+                if body.get("p_date_to") and str(row["created_at"]) > body["p_date_to"]:
+                    continue
+                groups[(row["terminal"], row["status_preparation"], row["status_loading"])] += 1
+            return httpx.Response(200, json=[
+                {"terminal": terminal, "status_preparation": prep, "status_loading": load, "truck_count": count}
+                for (terminal, prep, load), count in groups.items()
+            ])
+        if name == "truck_reference":
+            rows = {(row["terminal"], row["dock_code"], row["truck_route"]) for row in self.tables["trucks"]}
+            return httpx.Response(200, json=[
+                {"terminal": terminal, "dock_code": dock, "truck_route": route} for terminal, dock, route in rows
+            ])
+        return _error(404, "PGRST202", f"Could not find the function public.{name}")
@@ -0,0 +1,88 @@
+"""Excel import confirm: bulk upsert pipeline vs the old per-row loop.
+
+Runs against the in-memory PostgREST stand-in with a simulated round trip.
+Half of the synthetic rows already exist (updates), the rest are new, and
+``--bad-rows`` rows carry an invalid time so the database rejects them.
+The per-row loop is timed on ``--baseline-rows`` rows and extrapolated.
+
+    python -m benchmarks.import_benchmark --rows 10000 --latency-ms 20
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.database import Database
+from app.importer import bulk_upsert_trucks
+from benchmarks.fake_postgrest import FakePostgrest
+from benchmarks.seed import generate_trucks
+
+IMPORT_FIELDS = [
+    "terminal", "truck_no", "dock_code", "truck_route",
+    "preparation_start", "preparation_end", "loading_start", "loading_end",
+    "status_preparation", "status_loading",
+]
+
+
+def make_rows(count, bad_rows):
+    rows = [{field: truck[field] for field in IMPORT_FIELDS} for truck in generate_trucks(count)]
+    for index in random.Random(7).sample(range(count), min(bad_rows, count)):
+        rows[index]["loading_start"] = "25:99"
+    return rows
+
+
+def make_database(existing, latency_ms):
+    fake = FakePostgrest(latency_ms=latency_ms)
+    fake.tables["trucks"] = [dict(truck) for truck in generate_trucks(existing)]
+    return fake, Database("http://fake.local", "benchmark-key", transport=fake)
+
+
+async def per_row_import(db, rows):
+    # The pre-bulk implementation: one lookup plus one write per row
+    imported, failed = 0, 0
+    for truck in rows:
+        try:
+            existing = await db.execute(db.table("trucks").select("id").eq("truck_no", truck["truck_no"]))
+            if existing.data:
+                query = db.table("trucks").update(truck).eq("truck_no", truck["truck_no"])
+            else:
+                query = db.table("trucks").insert(truck)
+            if (await db.execute(query)).data:
+                imported += 1
+        except Exception:
+            failed += 1
+    return imported, failed
+
+
+async def main(args):
+    rows = make_rows(args.rows, args.bad_rows)
+
+    fake, db = make_database(args.rows // 2, args.latency_ms)
+    start = time.perf_counter()
+    result = await bulk_upsert_trucks(db, rows, chunk_size=args.chunk_size, concurrency=args.concurrency)
+    bulk_seconds = time.perf_counter() - start
+    bulk_requests = sum(fake.requests.values())
+
+    baseline = rows[:args.baseline_rows]
+    fake, db = make_database(args.rows // 2, args.latency_ms)
+    start = time.perf_counter()
+    await per_row_import(db, baseline)
+    per_row_seconds = (time.perf_counter() - start) * len(rows) / len(baseline)
+    per_row_requests = sum(fake.requests.values()) * len(rows) // len(baseline)
+
+    print(f"rows={len(rows)} latency={args.latency_ms}ms chunk={args.chunk_size} concurrency={args.concurrency}")
+    print(f"{'strategy':>10} {'seconds':>9} {'requests':>9} {'imported':>9} {'failed':>7}")
+    print(f"{'bulk':>10} {bulk_seconds:>9.2f} {bulk_requests:>9} {result.imported:>9} {len(result.failed):>7}")
+    print(f"{'per-row*':>10} {per_row_seconds:>9.2f} {per_row_requests:>9} {'':>9} {'':>7}")
+    print(f"* extrapolated from {len(baseline)} rows")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--bad-rows", type=int, default=10)
+    parser.add_argument("--baseline-rows", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
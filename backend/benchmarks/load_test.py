@@ -0,0 +1,88 @@
+"""Concurrent-client load test for the Truck Management API.
+
+Logs in once, then for each concurrency level runs that many clients in
+parallel, each issuing ``--requests`` GETs against ``--path``. Reports
+throughput and p50/p99 latency per level; with a non-blocking data layer the
+p99 column should stay roughly flat as clients are added.
+
+    python -m benchmarks.load_test --base-url http://localhost:8000 \\
+        --username admin --password admin123 --levels 1,10,50,100
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def login(client, username, password):
+    response = await client.post(
+        "/api/auth/login", data={"username": username, "password": password}
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run_client(client, path, headers, requests, latencies, errors):
+    for _ in range(requests):
+        start = time.perf_counter()
+        try:
+            response = await client.get(path, headers=headers)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def run_level(client, path, headers, clients, requests):
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        run_client(client, path, headers, requests, latencies, errors)
+        for _ in range(clients)
+    ])
+    elapsed = time.perf_counter() - start
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": statistics.median(latencies),
+        "p99": percentile(latencies, 99),
+    }
+
+
+async def main(args):
+    levels = [int(level) for level in args.levels.split(",")]
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        token = await login(client, args.username, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        print(f"{'clients':>8} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+        for clients in levels:
+            result = await run_level(client, args.path, headers, clients, args.requests)
+            print(
+                f"{result['clients']:>8} {result['requests']:>9} {result['errors']:>7} "
+                f"{result['rps']:>9.1f} {result['p50']:>9.1f} {result['p99']:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--path", default="/api/trucks")
+    parser.add_argument("--levels", default="1,10,50,100")
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,122 @@
+"""/api/trucks latency during a burst of logins: bcrypt inline vs on its pool.
+
+Serves the app from a subprocess against the in-memory PostgREST stand-in,
+then fires ``--logins`` concurrent logins while a reader keeps polling
+``/api/trucks``. With bcrypt inline every check stalls the event loop, so
+reader latency grows with the burst; on the bounded pool it stays flat.
+
+    python -m benchmarks.login_benchmark --logins 50 --rounds 12
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import time
+
+import bcrypt
+import httpx
+
+from benchmarks.load_test import login, percentile
+
+PASSWORD = "admin123"
+
+
+def serve(mode, port, rounds, logins, ready):
+    # The burst is one user from one address, all verifying at once: lift the
+    # limits that would turn it away
+    for name in ("LOGIN_MAX_ATTEMPTS_PER_USER", "LOGIN_MAX_ATTEMPTS_PER_IP", "LOGIN_MAX_PENDING"):
+        os.environ[name] = str(logins + 1)
+    import uvicorn
+
+    import app.main as main
+    from app.database import Database
+    from benchmarks.fake_postgrest import FakePostgrest
+    from benchmarks.seed import generate_trucks
+
+    fake = FakePostgrest()
+    fake.tables["users"] = [{
+        "id": "00000000-0000-0000-0000-000000000001",
+        "username": "admin",
+        "role": "admin",
+        "password_hash": bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds)).decode(),
+    }]
+    fake.tables["trucks"] = list(generate_trucks(1000))
+    main.db = Database("http://fake.local", "benchmark-key", transport=fake)
+
+    if mode == "inline":
+        # The pre-offload implementation
+        async def verify_password(plain_password, hashed_password):
+            return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+        main.verify_password = verify_password
+
+    config = uvicorn.Config(main.app, port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    config.load()
+    ready.set()
+    server.run()
+
+
+async def poll(client, headers, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get("/api/trucks", headers=headers)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def measure(base_url, logins):
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        for _ in range(50):
+            try:
+                token = await login(client, "admin", PASSWORD)
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        idle = []
+        stop = asyncio.Event()
+        reader = asyncio.create_task(poll(client, headers, stop, idle))
+        await asyncio.sleep(2)
+        stop.set()
+        await reader
+
+        busy = []
+        stop = asyncio.Event()
+        reader = asyncio.create_task(poll(client, headers, stop, busy))
+        start = time.perf_counter()
+        await asyncio.gather(*[login(client, "admin", PASSWORD) for _ in range(logins)])
+        burst_seconds = time.perf_counter() - start
+        stop.set()
+        await reader
+        return idle, busy, burst_seconds
+
+
+def main(args):
+    multiprocessing.set_start_method("spawn")
+    print(f"logins={args.logins} bcrypt rounds={args.rounds}")
+    print(f"{'mode':>9} {'idle p50':>9} {'busy p50':>9} {'busy p99':>9} {'busy max':>9} {'burst s':>8}")
+    for offset, mode in enumerate(("inline", "executor")):
+        port = args.port + offset
+        ready = multiprocessing.Event()
+        server = multiprocessing.Process(target=serve, args=(mode, port, args.rounds, args.logins, ready), daemon=True)
+        server.start()
+        ready.wait()
+        try:
+            idle, busy, burst_seconds = asyncio.run(measure(f"http://127.0.0.1:{port}", args.logins))
+        finally:
+            server.terminate()
+            server.join()
+        print(
+            f"{mode:>9} {statistics.median(idle):>9.1f} {statistics.median(busy):>9.1f} "
+            f"{percentile(busy, 99):>9.1f} {max(busy):>9.1f} {burst_seconds:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor of the seeded hash")
+    parser.add_argument("--port", type=int, default=8765)
+    main(parser.parse_args())
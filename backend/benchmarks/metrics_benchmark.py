@@ -0,0 +1,81 @@
+"""Overhead of the /metrics instrumentation.
+
+Drives a minimal FastAPI app straight through ASGI, with and without
+MetricsMiddleware, and reports the added cost per request; then the cost of
+labelling and observing one database query, and of rendering a scrape.
+
+    python -m benchmarks.metrics_benchmark --requests 20000
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+from postgrest import AsyncPostgrestClient
+from prometheus_client import generate_latest
+
+from app.metrics import DB_SECONDS, MetricsMiddleware, query_labels
+from benchmarks.stats_benchmark import time_call
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/trucks/{truck_id}")
+    async def get_truck(truck_id: str):
+        return {"id": truck_id}
+
+    return app
+
+
+async def drive(app, count: int) -> float:
+    """Mean microseconds per request."""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    start = time.perf_counter()
+    for i in range(count):
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": f"/api/trucks/{i}", "raw_path": f"/api/trucks/{i}".encode(),
+            "query_string": b"", "root_path": "", "headers": [], "client": ("test", 1), "server": ("test", 80),
+        }
+        await app(scope, receive, send)
+    elapsed = time.perf_counter() - start
+    assert sent[0]["status"] == 200
+    return elapsed / count * 1e6
+
+
+def main(args):
+    plain = build_app()
+    instrumented = build_app()
+    instrumented.add_middleware(MetricsMiddleware)
+    # Warm both up (middleware stack, route table)
+    asyncio.run(drive(plain, 100))
+    asyncio.run(drive(instrumented, 100))
+    without = min(asyncio.run(drive(plain, args.requests)) for _ in range(3))
+    with_metrics = min(asyncio.run(drive(instrumented, args.requests)) for _ in range(3))
+    print(f"request without metrics {without:8.1f} us")
+    print(f"request with metrics    {with_metrics:8.1f} us  (+{with_metrics - without:.1f} us)")
+
+    query = AsyncPostgrestClient("http://bench").from_("trucks").select("*").eq("terminal", "A")
+
+    def observe():
+        for _ in range(1000):
+            DB_SECONDS.labels(*query_labels(query)).observe(0.01)
+
+    # ms per 1,000 observations is us per observation
+    print(f"db query observation    {time_call(observe, 20):8.2f} us")
+    print(f"scrape render           {time_call(generate_latest, 20) * 1000:8.1f} us "
+          f"({len(generate_latest())} bytes)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    main(parser.parse_args())
@@ -0,0 +1,54 @@
+"""Compare /api/trucks page cost by depth: offset vs (created_at, id) keyset.
+
+Seeds a local Postgres (never point this at production: it drops and
+recreates the schema) and times fetching one page at increasing depths with
+the SQL PostgREST generates for ``skip`` and for ``cursor`` requests. The
+keyset column should stay flat however deep the page is.
+
+    python -m benchmarks.pagination_benchmark --dsn postgresql://localhost/trucks_bench
+"""
+import argparse
+
+import psycopg
+
+from benchmarks.seed import reset_schema, seed_trucks
+from benchmarks.stats_benchmark import time_call
+
+OFFSET_SQL = "SELECT * FROM trucks ORDER BY created_at DESC, id DESC OFFSET %s LIMIT %s"
+KEYSET_SQL = (
+    "SELECT * FROM trucks WHERE created_at <= %(created_at)s "
+    "AND (created_at < %(created_at)s OR (created_at = %(created_at)s AND id < %(id)s)) "
+    "ORDER BY created_at DESC, id DESC LIMIT %(limit)s"
+)
+
+
+def main(args):
+    depths = [int(depth) for depth in args.depths.split(",")]
+
+    with psycopg.connect(args.dsn) as conn:
+        reset_schema(conn)
+        seed_trucks(conn, args.rows)
+
+        print(f"rows={args.rows} page={args.limit}")
+        print(f"{'depth':>10} {'offset ms':>10} {'keyset ms':>10}")
+        for depth in [depth for depth in depths if depth < args.rows]:
+            # The cursor a client would hold after paging down to ``depth``
+            created_at, truck_id = conn.execute(
+                "SELECT created_at, id FROM trucks ORDER BY created_at DESC, id DESC OFFSET %s LIMIT 1",
+                (max(depth - 1, 0),),
+            ).fetchone()
+            cursor = {"created_at": created_at, "id": truck_id, "limit": args.limit}
+
+            offset_ms = time_call(lambda: conn.execute(OFFSET_SQL, (depth, args.limit)).fetchall(), args.repeat)
+            keyset_ms = time_call(lambda: conn.execute(KEYSET_SQL, cursor).fetchall(), args.repeat)
+            print(f"{depth:>10} {offset_ms:>10.2f} {keyset_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", required=True, help="local Postgres connection string")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--depths", default="0,1000,10000,100000,500000")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
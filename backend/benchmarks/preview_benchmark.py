@@ -0,0 +1,131 @@
+"""Excel import preview: streaming column-wise parser vs read_excel + iterrows.
+
+Writes synthetic import workbooks of each size, then parses and validates
+each one in a fresh subprocess per strategy so peak RSS is measured
+independently. Also checks that both strategies report identical errors.
+
+    python -m benchmarks.preview_benchmark --sizes 1000,10000,50000
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.seed import generate_trucks
+
+HEADERS = {
+    'Terminal': 'terminal', 'Truck No': 'truck_no', 'Dock Code': 'dock_code', 'Route': 'truck_route',
+    'Prep Start': 'preparation_start', 'Prep End': 'preparation_end',
+    'Load Start': 'loading_start', 'Load End': 'loading_end',
+    'Status Prep': 'status_preparation', 'Status Load': 'status_loading',
+}
+
+
+def write_workbook(path, rows):
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+    worksheet = workbook.add_worksheet('Template')
+    time_format = workbook.add_format({'num_format': 'hh:mm'})
+    worksheet.write_row(0, 0, list(HEADERS))
+    for row_number, truck in enumerate(generate_trucks(rows), start=1):
+        for col, field in enumerate(HEADERS.values()):
+            value = truck[field]
+            if row_number % 97 == 0 and field == 'dock_code':
+                continue  # leave some required cells empty
+            if value is None:
+                continue
+            if field.endswith(('_start', '_end')) and row_number % 2:
+                hours, minutes = map(int, value.split(':'))
+                worksheet.write_datetime(row_number, col, datetime(1899, 12, 31, hours, minutes), time_format)
+            else:
+                worksheet.write(row_number, col, value)
+    workbook.close()
+
+
+def iterrows_preview(contents):
+    # The pre-streaming implementation
+    import pandas as pd
+
+    df = pd.read_excel(io.BytesIO(contents))
+    required_columns = dict(list(HEADERS.items())[:4])
+    optional_columns = dict(list(HEADERS.items())[4:])
+    trucks_preview, errors = [], []
+    for index, row in df.iterrows():
+        truck = {}
+        for excel_col, db_col in required_columns.items():
+            value = row.get(excel_col, '')
+            if pd.isna(value) or str(value).strip() == '':
+                errors.append(f"Row {index + 2}: {excel_col} is required")
+                continue
+            truck[db_col] = str(value).strip()
+        for excel_col, db_col in optional_columns.items():
+            if excel_col in df.columns:
+                value = row.get(excel_col)
+                if not pd.isna(value):
+                    if 'start' in db_col or 'end' in db_col:
+                        truck[db_col] = value.strftime('%H:%M') if isinstance(value, datetime) else str(value)
+                    else:
+                        truck[db_col] = str(value)
+                else:
+                    truck[db_col] = None
+        for status in ('status_preparation', 'status_loading'):
+            if truck.get(status) not in ['On Process', 'Delay', 'Finished']:
+                truck[status] = 'On Process'
+        trucks_preview.append(truck)
+    return trucks_preview, errors
+
+
+def streaming_preview(path):
+    from app.excel_import import read_workbook, validate_trucks
+
+    with open(path, 'rb') as fileobj:
+        return validate_trucks(read_workbook(fileobj))
+
+
+def measure(strategy, path, queue):
+    import pandas  # noqa: F401  (imported up front so RSS deltas exclude it)
+    import app.excel_import  # noqa: F401
+
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if strategy == 'iterrows':
+        with open(path, 'rb') as fileobj:
+            trucks, errors = iterrows_preview(fileobj.read())
+    else:
+        trucks, errors = streaming_preview(path)
+    elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss
+    queue.put((elapsed, peak_rss / 1024, len(trucks), errors))
+
+
+def run(strategy, path):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=measure, args=(strategy, path, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main(args):
+    multiprocessing.set_start_method('spawn')
+    print(f"{'rows':>8} {'strategy':>10} {'seconds':>8} {'peak MB':>8} {'errors':>7} {'same':>5}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in [int(size) for size in args.sizes.split(',')]:
+            path = os.path.join(directory, f'import_{size}.xlsx')
+            write_workbook(path, size)
+            results = {strategy: run(strategy, path) for strategy in ('iterrows', 'streaming')}
+            same = results['iterrows'][3] == results['streaming'][3]
+            for strategy, (elapsed, peak_mb, _, errors) in results.items():
+                print(f"{size:>8} {strategy:>10} {elapsed:>8.2f} {peak_mb:>8.1f} {len(errors):>7} {str(same):>5}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,50000')
+    main(parser.parse_args())
@@ -0,0 +1,89 @@
+"""Reconnect storm after a network blip: replay from the buffer vs refetch.
+
+Connects ``--clients`` boards, drops them all, broadcasts ``--missed``
+updates while they are away, then reconnects every board with the last
+``seq`` it saw. Reports how many boards could be caught up from the replay
+buffer and how many still need a snapshot (one ``/api/trucks`` query each),
+plus the bytes sent compared with refetching the list.
+
+    python -m benchmarks.reconnect_benchmark --clients 500 --missed 50
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app.websocket import ConnectionManager
+from benchmarks.seed import generate_trucks
+
+
+class Board:
+    def __init__(self):
+        self.last_seq = 0
+        self.epoch = None
+        self.bytes = 0
+        self.refetch = False
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, frame):
+        self.bytes += len(frame.encode())
+        message = json.loads(frame)
+        for event in message["events"] if message["type"] == "batch" else [message]:
+            if event["type"] == "hello":
+                self.epoch = self.epoch or event["epoch"]
+            elif event["type"] == "resync":
+                self.refetch = True
+            self.last_seq = max(self.last_seq, event.get("seq", 0))
+
+    async def close(self, code=1000):
+        pass
+
+
+async def storm(trucks, args, replay_size):
+    manager = ConnectionManager(queue_size=100000, replay_size=replay_size)
+    boards = [Board() for _ in range(args.clients)]
+    for board in boards:
+        await manager.connect(board)
+    await asyncio.sleep(0.1)
+    for board in boards:
+        manager.disconnect(board)
+
+    for truck in trucks[:args.missed]:
+        await manager.broadcast({"type": "truck_updated", "data": {**truck, "status_loading": "Finished"}})
+
+    resumed = [Board() for _ in boards]
+    start = time.perf_counter()
+    for old, board in zip(boards, resumed):
+        board.epoch = old.epoch
+        await manager.connect(board, since=old.last_seq, epoch=old.epoch)
+    elapsed = (time.perf_counter() - start) * 1000
+    await asyncio.sleep(0.2)
+    for client in list(manager.clients.values()):
+        client.writer.cancel()
+    return resumed, elapsed
+
+
+async def main(args):
+    trucks = list(generate_trucks(args.trucks))
+    snapshot = len(json.dumps(trucks).encode())
+    print(f"clients={args.clients} missed={args.missed} snapshot={snapshot / 1024:.0f} KB")
+    print(f"{'buffer':>7} {'refetch':>8} {'reconnect ms':>13} {'KB sent':>9} {'KB if refetched':>16}")
+    for replay_size in (0, args.replay_size):
+        boards, elapsed = await storm(trucks, args, replay_size)
+        refetch = sum(board.refetch for board in boards)
+        sent = sum(board.bytes for board in boards) + refetch * snapshot
+        print(
+            f"{replay_size:>7} {refetch:>8} {elapsed:>13.1f} {sent / 1024:>9.0f} "
+            f"{args.clients * snapshot / 1024:>16.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--missed", type=int, default=50)
+    parser.add_argument("--trucks", type=int, default=1000, help="rows in the snapshot a refetch downloads")
+    parser.add_argument("--replay-size", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,79 @@
+"""Synthetic truck datasets shared by the benchmark scripts.
+
+Rows look like real board traffic: trucks are spread over the last ``days``
+days, anything older than today is almost always finished, and today's trucks
+are a mix of all three statuses.
+"""
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+SCHEMA_PATH = Path(__file__).resolve().parents[2] / "database" / "schema.sql"
+
+TERMINALS = ["A", "B", "C", "D", "E"]
+STATUSES = ["On Process", "Delay", "Finished"]
+ROUTES = [
+    "Bangkok-Chonburi", "Bangkok-Rayong", "Bangkok-Pattaya",
+    "Bangkok-Ayutthaya", "Bangkok-Saraburi", "Bangkok-Nakhon Ratchasima",
+]
+TRUCK_COLUMNS = [
+    "id", "terminal", "truck_no", "dock_code", "truck_route",
+    "preparation_start", "preparation_end", "loading_start", "loading_end",
+    "status_preparation", "status_loading", "created_at", "updated_at",
+]
+
+
+def _hhmm(minutes):
+    minutes %= 24 * 60
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def generate_trucks(count, days=90, seed=42, now=None, start=0):
+    """Yield ``count`` truck dicts; ``start`` offsets the generated truck numbers."""
+    rng = random.Random(seed + start)
+    now = now or datetime.now(timezone.utc)
+    for i in range(start, start + count):
+        age = timedelta(seconds=rng.randrange(days * 24 * 3600))
+        created_at = now - age
+        terminal = rng.choice(TERMINALS)
+        if age > timedelta(days=1):
+            weights = (2, 3, 95)
+        else:
+            weights = (50, 15, 35)
+        status_preparation = rng.choices(STATUSES, weights)[0]
+        status_loading = "Finished" if status_preparation == "Finished" and age > timedelta(days=1) \
+            else rng.choices(STATUSES, weights)[0]
+        prep_start = rng.randrange(5 * 60, 20 * 60)
+        yield {
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "terminal": terminal,
+            "truck_no": f"TRK{i:07d}",
+            "dock_code": f"DOCK-{terminal}{rng.randint(1, 12)}",
+            "truck_route": rng.choice(ROUTES),
+            "preparation_start": _hhmm(prep_start),
+            "preparation_end": _hhmm(prep_start + 30) if status_preparation == "Finished" else None,
+            "loading_start": _hhmm(prep_start + 45),
+            "loading_end": _hhmm(prep_start + 105) if status_loading == "Finished" else None,
+            "status_preparation": status_preparation,
+            "status_loading": status_loading,
+            "created_at": created_at.isoformat(),
+            "updated_at": None,
+        }
+
+
+def reset_schema(conn):
+    """Drop and recreate the tables in ``database/schema.sql``."""
+    conn.execute("DROP TABLE IF EXISTS trucks, users CASCADE")
+    conn.execute(SCHEMA_PATH.read_text())
+    conn.commit()
+
+
+def seed_trucks(conn, count, start=0, **kwargs):
+    """COPY ``count`` generated trucks into an existing psycopg connection."""
+    with conn.cursor() as cur:
+        with cur.copy(f"COPY trucks ({', '.join(TRUCK_COLUMNS)}) FROM STDIN") as copy:
+            for truck in generate_trucks(count, start=start, **kwargs):
+                copy.write_row([truck[column] for column in TRUCK_COLUMNS])
+    conn.execute("ANALYZE trucks")
+    conn.commit()
@@ -0,0 +1,76 @@
+"""Cost of turning a page of trucks into a /api/trucks response body.
+
+Compares the old path (copy every row field by field, validate the list
+against ``response_model=List[Truck]``, encode with the standard JSON
+response) with the current one (hand the rows straight to ORJSONResponse),
+per 1,000 trucks.
+
+    python -m benchmarks.serialization_benchmark --sizes 100,1000,10000
+"""
+import argparse
+import asyncio
+import json
+from typing import List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.main import Truck
+from benchmarks.seed import generate_trucks
+from benchmarks.stats_benchmark import time_call
+
+FIELD = create_response_field(name="response", type_=List[Truck])
+
+
+def copy_rows(rows):
+    # What get_trucks did before, field by field
+    return [{
+        "id": truck["id"],
+        "terminal": truck["terminal"],
+        "truck_no": truck["truck_no"],
+        "dock_code": truck["dock_code"],
+        "truck_route": truck["truck_route"],
+        "preparation_start": truck["preparation_start"],
+        "preparation_end": truck["preparation_end"],
+        "loading_start": truck["loading_start"],
+        "loading_end": truck["loading_end"],
+        "status_preparation": truck["status_preparation"],
+        "status_loading": truck["status_loading"],
+        "created_at": truck["created_at"],
+        "updated_at": truck["updated_at"],
+    } for truck in rows]
+
+
+def validated_body(rows):
+    content = asyncio.run(serialize_response(field=FIELD, response_content=copy_rows(rows)))
+    return JSONResponse(content).body
+
+
+def stages(rows):
+    copied = copy_rows(rows)
+    validated = asyncio.run(serialize_response(field=FIELD, response_content=copied))
+    return {
+        "copy": lambda: copy_rows(rows),
+        "validate": lambda: asyncio.run(serialize_response(field=FIELD, response_content=copied)),
+        "json": lambda: JSONResponse(validated).body,
+        "old total": lambda: validated_body(rows),
+        "orjson": lambda: ORJSONResponse(rows).body,
+    }
+
+
+def main(args):
+    print(f"{'trucks':>7} {'stage':>10} {'ms':>9} {'ms/1k':>8}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        rows = list(generate_trucks(size))
+        assert json.loads(validated_body(rows)) == json.loads(ORJSONResponse(rows).body)
+        for name, fn in stages(rows).items():
+            elapsed = time_call(fn, args.repeat)
+            print(f"{size:>7} {name:>10} {elapsed:>9.2f} {elapsed * 1000 / size:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,294 @@
+"""SQLite-backed stand-in for the Supabase PostgREST API.
+
+Speaks the same subset of PostgREST as ``FakePostgrest`` but keeps the
+tables in SQLite, with the indexes ``database/schema.sql`` relies on, so
+filters, keyset pages and counts cost an index lookup rather than a scan of
+a Python list, and a 1M-row dataset fits in a file instead of the heap.
+Pass it to ``Database(..., transport=...)``; reopen a seeded file to reuse
+a dataset across runs.
+"""
+import asyncio
+import json
+import re
+import sqlite3
+import threading
+import uuid
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl
+
+import httpx
+
+from benchmarks.fake_postgrest import RESERVED_PARAMS, FakePostgrest, _error, _parse_value, _split_logic
+from benchmarks.seed import TRUCK_COLUMNS, generate_trucks
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trucks (
+    id TEXT PRIMARY KEY,
+    terminal TEXT NOT NULL,
+    truck_no TEXT NOT NULL UNIQUE,
+    dock_code TEXT NOT NULL,
+    truck_route TEXT NOT NULL,
+    preparation_start TEXT,
+    preparation_end TEXT,
+    loading_start TEXT,
+    loading_end TEXT,
+    status_preparation TEXT DEFAULT 'On Process',
+    status_loading TEXT DEFAULT 'On Process',
+    created_at TEXT NOT NULL,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_created_at_id ON trucks(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_terminal_created_at_id ON trucks(terminal, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_dock_code_created_at_id ON trucks(dock_code, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_active_created_at_id ON trucks(created_at DESC, id DESC)
+    WHERE status_preparation <> 'Finished' OR status_loading <> 'Finished';
+CREATE INDEX IF NOT EXISTS idx_active_terminal_created_at_id ON trucks(terminal, created_at DESC, id DESC)
+    WHERE status_preparation <> 'Finished' OR status_loading <> 'Finished';
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE,
+    password_hash TEXT NOT NULL,
+    role TEXT NOT NULL DEFAULT 'viewer',
+    created_at TEXT
+);
+"""
+IDENTIFIER = re.compile(r"^[a-z_][a-z0-9_]*$")
+OPERATORS = {"eq": "=", "neq": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+DEFAULTS = {
+    "trucks": {"status_preparation": "On Process", "status_loading": "On Process"},
+    "users": {"role": "viewer"},
+}
+
+
+def _column(name):
+    name = name.strip()
+    if not IDENTIFIER.match(name):
+        raise ValueError(f"Unsupported column {name!r}")
+    return name
+
+
+def _condition(column, expression):
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, value = expression.partition(".")
+    column = _column(column)
+    if op == "is":
+        sql, args = (f"{column} IS NULL", []) if value == "null" else (f"lower({column}) = ?", [value])
+    elif op == "in":
+        values = [_parse_value(v) for v in value.strip("()").split(",")]
+        sql, args = f"{column} IN ({', '.join('?' * len(values))})", values
+    elif op in OPERATORS:
+        sql, args = f"{column} {OPERATORS[op]} ?", [_parse_value(value)]
+    else:
+        raise ValueError(f"Unsupported operator {op!r}")
+    return (f"NOT ({sql})" if negate else sql), args
+
+
+def _logic(kind, body):
+    parts, args = [], []
+    for part in _split_logic(body[1:-1]):
+        if part.startswith(("and(", "or(")):
+            inner_kind, _, inner = part.partition("(")
+            sql, inner_args = _logic(inner_kind, "(" + inner)
+        else:
+            column, _, expression = part.partition(".")
+            sql, inner_args = _condition(column, expression)
+        parts.append(f"({sql})")
+        args.extend(inner_args)
+    return f" {kind.upper()} ".join(parts), args
+
+
+def _where(params):
+    clauses, args = [], []
+    for key, value in params:
+        if key in RESERVED_PARAMS:
+            continue
+        sql, condition_args = _logic(key, value) if key in ("or", "and") else _condition(key, value)
+        clauses.append(f"({sql})")
+        args.extend(condition_args)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), args
+
+
+def _order(order):
+    terms = []
+    for part in order.split(","):
+        column, *modifiers = part.split(".")
+        term = f"{_column(column)} {'DESC' if 'desc' in modifiers else 'ASC'}"
+        if "nullsfirst" in modifiers:
+            term += " NULLS FIRST"
+        elif "nullslast" in modifiers:
+            term += " NULLS LAST"
+        terms.append(term)
+    return " ORDER BY " + ", ".join(terms)
+
+
+class SqlitePostgrest(FakePostgrest):
+    def __init__(self, path: str = ":memory:", latency_ms: float = 0.0):
+        super().__init__(latency_ms)
+        self.path = path
+        self._local = threading.local()
+        # An in-memory database exists once, so every thread shares it in turn
+        self._shared = self._connect() if path == ":memory:" else None
+        self._lock = threading.Lock() if self._shared else nullcontext()
+        self.conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = OFF")
+        return conn
+
+    @property
+    def conn(self):
+        # One connection per thread: WAL lets queries from the threads run in parallel
+        if self._shared is not None:
+            return self._shared
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def seed_trucks(self, count, batch_size=10000, **kwargs):
+        """Insert ``count`` generated trucks, in batches to bound memory."""
+        sql = f"INSERT INTO trucks ({', '.join(TRUCK_COLUMNS)}) VALUES ({', '.join('?' * len(TRUCK_COLUMNS))})"
+        batch = []
+        self.conn.execute("BEGIN")
+        for truck in generate_trucks(count, **kwargs):
+            batch.append([truck[column] for column in TRUCK_COLUMNS])
+            if len(batch) == batch_size:
+                self.conn.executemany(sql, batch)
+                batch = []
+        self.conn.executemany(sql, batch)
+        self.conn.execute("COMMIT")
+        self.conn.execute("ANALYZE")
+
+    def count(self, table):
+        return self.conn.execute(f"SELECT COUNT(*) FROM {_column(table)}").fetchone()[0]
+
+    def _rows(self, sql, args=()):
+        return [dict(row) for row in self.conn.execute(sql, args)]
+
+    async def handle_async_request(self, request):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        path = request.url.path.rsplit("/rest/v1/", 1)[-1]
+        params = parse_qsl(request.url.query.decode(), keep_blank_values=True)
+        await request.aread()
+        body = json.loads(request.content) if request.content else None
+        self.requests[(request.method, path)] += 1
+        # Off the event loop, as a query over the network would be
+        return await asyncio.to_thread(self._handle, request.method, path, params, request.headers, body)
+
+    def _handle(self, method, path, params, headers, body):
+        try:
+            with self._lock:
+                if path.startswith("rpc/"):
+                    return self._page(self.rpc(path[4:], body or {}), params)
+                table = _column(path)
+                if method in ("GET", "HEAD"):
+                    return self.select(table, params, headers)
+                if method == "POST":
+                    return self.insert(table, None, body, dict(params), headers)
+                if method == "PATCH":
+                    return self.update(table, body, params)
+                if method == "DELETE":
+                    return self.delete(table, params)
+        except ValueError as e:
+            return _error(400, "PGRST100", str(e))
+        return _error(405, "PGRST000", f"Unsupported method {method}")
+
+    def select(self, table, params, headers):
+        query = dict(params)
+        where, args = _where(params)
+        select = query.get("select") or "*"
+        start = int(query.get("offset", 0))
+        limit = int(query["limit"]) if "limit" in query else -1
+        if "range" in headers:
+            first, _, last = headers["range"].partition("-")
+            start, limit = int(first), int(last) - int(first) + 1
+
+        total = "*"
+        if "count=exact" in headers.get("prefer", "") or select == "count":
+            total = self.conn.execute(f"SELECT COUNT(*) FROM {table}{where}", args).fetchone()[0]
+        if select == "count":
+            return httpx.Response(200, json=[{"count": total}], headers={"content-range": f"0-0/{total}"})
+
+        columns = "*" if select == "*" else ", ".join(_column(column) for column in select.split(","))
+        sql = f"SELECT {columns} FROM {table}{where}"
+        if "order" in query:
+            sql += _order(query["order"])
+        rows = self._rows(sql + " LIMIT ? OFFSET ?", [*args, limit, start])
+        return httpx.Response(
+            200, json=rows, headers={"content-range": f"{start}-{start + len(rows) - 1}/{total}"}
+        )
+
+    def insert(self, name, table, body, query, headers):
+        rows = body if isinstance(body, list) else [body]
+        merge = "resolution=merge-duplicates" in headers.get("prefer", "")
+        conflict = _column(query.get("on_conflict") or self.unique.get(name, "id"))
+        keys = [row.get(conflict) for row in rows if row.get(conflict) is not None]
+        if len(keys) != len(set(keys)):
+            return _error(400, "21000", "ON CONFLICT DO UPDATE command cannot affect row a second time")
+
+        now = datetime.now(timezone.utc).isoformat()
+        saved = []
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for row in rows:
+                error = self._validate(row) if name == "trucks" else None
+                if error:
+                    self.conn.execute("ROLLBACK")
+                    return error
+                new_row = {"id": str(uuid.uuid4()), "created_at": now, "updated_at": now, **DEFAULTS.get(name, {})}
+                new_row.update({key: value for key, value in row.items() if value is not None or key not in new_row})
+                columns = [_column(column) for column in new_row]
+                sql = f"INSERT INTO {name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+                if merge:
+                    # Like PostgREST, only the columns sent are overwritten
+                    updates = [column for column in map(_column, row) if column != conflict]
+                    sql += f" ON CONFLICT({conflict}) DO UPDATE SET " + (
+                        ", ".join(f"{column} = excluded.{column}" for column in updates) or f"{conflict} = {conflict}"
+                    )
+                saved.extend(self._rows(sql + " RETURNING *", list(new_row.values())))
+        except sqlite3.IntegrityError as e:
+            self.conn.execute("ROLLBACK")
+            if str(e).startswith("NOT NULL"):
+                return _error(400, "23502", f"null value violates not-null constraint: {e}")
+            return _error(409, "23505", f"duplicate key value violates unique constraint: {e}")
+        self.conn.execute("COMMIT")
+        return httpx.Response(201, json=saved)
+
+    def update(self, table, body, params):
+        where, args = _where(params)
+        columns = [_column(column) for column in body]
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        try:
+            rows = self._rows(f"UPDATE {table} SET {assignments}{where} RETURNING *", [*body.values(), *args])
+        except sqlite3.IntegrityError as e:
+            return _error(409, "23505", f"duplicate key value violates unique constraint: {e}")
+        return httpx.Response(200, json=rows)
+
+    def delete(self, table, params):
+        where, args = _where(params)
+        return httpx.Response(200, json=self._rows(f"DELETE FROM {table}{where} RETURNING *", args))
+
+    def rpc(self, name, body):
+        if name == "truck_reference":
+            return httpx.Response(200, json=self._rows("SELECT DISTINCT terminal, dock_code, truck_route FROM trucks"))
+        if name != "truck_stats":
+            return _error(404, "PGRST202", f"Could not find the function public.{name}")
+        clauses, args = [], []
+        for column, op, key in (("terminal", "=", "p_terminal"), ("created_at", ">=", "p_date_from"),
+                                ("created_at", "<=", "p_date_to")):
+            if body.get(key):
+                clauses.append(f"{column} {op} ?")
+                args.append(body[key])
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        return httpx.Response(200, json=self._rows(
+            "SELECT terminal, status_preparation, status_loading, COUNT(*) AS truck_count "
+            f"FROM trucks{where} GROUP BY terminal, status_preparation, status_loading",
+            args,
+        ))
@@ -0,0 +1,74 @@
+"""Worker cold start: import time, startup time and baseline RSS.
+
+Each sample is a fresh interpreter that imports ``app.main``, runs the
+lifespan's startup work (the database is not contacted before it returns)
+and reports the time and resident memory after each step. It then loads the
+spreadsheet stack the way the first Excel request does, to show what that
+request pays. ``eager`` imports pandas, openpyxl and xlsxwriter before the
+app, as the module used to at load time, for comparison.
+
+    python -m benchmarks.startup_benchmark --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = r"""
+import asyncio, json, os, sys, time
+
+def rss_mb():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+
+result = {}
+start = time.perf_counter()
+if sys.argv[1] == "eager":
+    import openpyxl, pandas, xlsxwriter
+import app.main as main
+result["import_ms"] = (time.perf_counter() - start) * 1000
+result["import_mb"] = rss_mb()
+
+async def startup():
+    start = time.perf_counter()
+    await main.start_background_tasks()
+    result["startup_ms"] = (time.perf_counter() - start) * 1000
+
+asyncio.run(startup())
+result["ready_mb"] = rss_mb()
+start = time.perf_counter()
+import app.excel_import, xlsxwriter
+result["spreadsheet_ms"] = (time.perf_counter() - start) * 1000
+result["spreadsheet_mb"] = rss_mb()
+print(json.dumps(result))
+os._exit(0)
+"""
+
+COLUMNS = ("import_ms", "startup_ms", "import_mb", "ready_mb", "spreadsheet_ms", "spreadsheet_mb")
+
+
+def sample(mode):
+    env = {**os.environ, "SUPABASE_URL": "http://127.0.0.1:9", "SUPABASE_KEY": "benchmark-key"}
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, mode], capture_output=True, text=True, env=env, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(args):
+    print(f"{'mode':>6} " + " ".join(f"{column:>15}" for column in COLUMNS))
+    for mode in ("lazy", "eager"):
+        samples = [sample(mode) for _ in range(args.repeat)]
+        medians = {column: statistics.median(s[column] for s in samples) for column in COLUMNS}
+        print(f"{mode:>6} " + " ".join(f"{medians[column]:>15.1f}" for column in COLUMNS))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
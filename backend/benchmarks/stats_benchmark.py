@@ -0,0 +1,81 @@
+"""Compare /api/stats strategies as the trucks table grows.
+
+Seeds a local Postgres (never point this at production: it drops and
+recreates the schema) and, at each table size, times:
+
+* rows   - the old approach: pull terminal/status columns, count in Python
+* rpc    - the ``truck_stats`` grouped aggregate from ``database/schema.sql``
+
+for a "today" dashboard query and an unfiltered one.
+
+    python -m benchmarks.stats_benchmark --dsn postgresql://localhost/trucks_bench
+"""
+import argparse
+import statistics
+import time
+from datetime import date
+
+import psycopg
+
+from benchmarks.seed import reset_schema, seed_trucks
+
+
+def fold_rows(rows):
+    preparation_stats = {"On Process": 0, "Delay": 0, "Finished": 0}
+    loading_stats = {"On Process": 0, "Delay": 0, "Finished": 0}
+    terminal_stats = {}
+    for terminal, status_preparation, status_loading in rows:
+        if status_preparation in preparation_stats:
+            preparation_stats[status_preparation] += 1
+        if status_loading in loading_stats:
+            loading_stats[status_loading] += 1
+        terminal_stats[terminal] = terminal_stats.get(terminal, 0) + 1
+    return len(rows), preparation_stats, loading_stats, terminal_stats
+
+
+def time_call(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main(args):
+    sizes = [int(size) for size in args.sizes.split(",")]
+    today = f"{date.today().isoformat()}T00:00:00"
+    scenarios = {"today": today, "all": None}
+
+    with psycopg.connect(args.dsn) as conn:
+        reset_schema(conn)
+        seeded = 0
+
+        print(f"{'rows':>10} {'scenario':>9} {'rows ms':>9} {'rpc ms':>9}")
+        for size in sizes:
+            seed_trucks(conn, size - seeded, start=seeded)
+            seeded = size
+
+            for name, date_from in scenarios.items():
+                def pull_rows():
+                    rows = conn.execute(
+                        "SELECT terminal, status_preparation, status_loading FROM trucks "
+                        "WHERE (%(date_from)s::timestamptz IS NULL OR created_at >= %(date_from)s)",
+                        {"date_from": date_from},
+                    ).fetchall()
+                    fold_rows(rows)
+
+                def call_rpc():
+                    conn.execute("SELECT * FROM truck_stats(NULL, %s, NULL)", (date_from,)).fetchall()
+
+                rows_ms = time_call(pull_rows, args.repeat)
+                rpc_ms = time_call(call_rpc, args.repeat)
+                print(f"{size:>10} {name:>9} {rows_ms:>9.2f} {rpc_ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", required=True, help="local Postgres connection string")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
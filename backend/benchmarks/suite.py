@@ -0,0 +1,339 @@
+"""Reproducible end-to-end benchmark suite, no Supabase project needed.
+
+For each dataset size, a child process seeds a PostgREST stand-in (SQLite by
+default, or the in-memory fake), hands it to the app as the ``Database``
+transport and serves the app with uvicorn on a local port. The parent then
+drives each scenario at each concurrency level over real HTTP and
+WebSocket connections and reports throughput and p50/p99 latency:
+
+    trucks          GET /api/trucks, today's board (in-memory index)
+    trucks_filtered GET /api/trucks?terminal=A&status_loading=Delay
+    trucks_history  GET /api/trucks for a day a month back (database path)
+    stats           GET /api/stats
+    export          CSV export of the last 7 days, body read to the end
+    import          preview upload + confirm, polled until the job finishes
+    websocket       status updates fanned out to N sockets; latency is
+                    update sent -> frame received, per delivery
+
+``--save`` writes the results as JSON; ``--baseline`` compares against a
+saved run and exits 1 if any p99 rose, or throughput fell, by more than
+``--tolerance``. SQLite datasets are cached in ``--data-dir`` per size and
+day, since the board only shows today's trucks.
+
+    python -m benchmarks.suite --sizes 1000,100000,1000000 --levels 1,10,50
+    python -m benchmarks.suite --sizes 100000 --save before.json
+    python -m benchmarks.suite --sizes 100000 --baseline before.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import httpx
+import websockets
+
+from benchmarks.load_test import login, percentile
+
+SCENARIOS = ("trucks", "trucks_filtered", "trucks_history", "stats", "export", "import", "websocket")
+USERNAME, PASSWORD = "admin", "admin123"
+
+
+# Server side (child process)
+
+def open_backend(args, size):
+    import bcrypt
+
+    from benchmarks.fake_postgrest import FakePostgrest
+    from benchmarks.seed import generate_trucks
+    from benchmarks.sqlite_postgrest import SqlitePostgrest
+
+    admin = {
+        "id": "00000000-0000-4000-8000-000000000001",
+        "username": USERNAME,
+        # Few rounds: the suite measures the API, not bcrypt
+        "password_hash": bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds=4)).decode(),
+        "role": "admin",
+    }
+    now = datetime.now(timezone.utc).replace(hour=23, minute=59, second=59)
+    if args.backend == "fake":
+        backend = FakePostgrest(latency_ms=args.latency_ms)
+        backend.tables["trucks"] = list(generate_trucks(size, now=now))
+        backend.tables["users"] = [admin]
+        return backend
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    path = os.path.join(args.data_dir, f"trucks-{size}-{date.today().isoformat()}.sqlite3")
+    if not os.path.exists(path):
+        # Seeded under another name so an interrupted run leaves nothing half-built
+        partial = SqlitePostgrest(path + ".partial")
+        partial.seed_trucks(size, now=now)
+        partial.conn.close()
+        os.replace(path + ".partial", path)
+    backend = SqlitePostgrest(path, latency_ms=args.latency_ms)
+    backend.conn.execute(
+        "INSERT OR REPLACE INTO users (id, username, password_hash, role) VALUES (?, ?, ?, ?)",
+        tuple(admin.values()),
+    )
+    return backend
+
+
+def serve(args, size, ready):
+    import uvicorn
+
+    from app import main
+    from app.database import Database
+
+    start = time.perf_counter()
+    backend = open_backend(args, size)
+    seeded = time.perf_counter() - start
+    # Injected before startup, so the background tasks get it too
+    main.db = Database("http://bench.local", "benchmark-key", transport=backend)
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=0, log_level="warning"))
+
+    async def run():
+        task = asyncio.create_task(server.serve())
+        while not server.started:
+            if task.done():
+                return await task
+            await asyncio.sleep(0.05)
+        ready.put((server.servers[0].sockets[0].getsockname()[1], seeded))
+        await task
+
+    asyncio.run(run())
+
+
+# Client side (parent process)
+
+async def measure(clients, operations, operation):
+    """Run ``clients`` workers doing ``operations`` calls each; one sample per call."""
+    latencies, errors = [], []
+
+    async def worker():
+        for _ in range(operations):
+            start = time.perf_counter()
+            try:
+                await operation()
+            except Exception as e:
+                errors.append(type(e).__name__)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    return summarize(clients, latencies, len(errors), time.perf_counter() - start)
+
+
+def summarize(clients, latencies, errors, elapsed):
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p99": percentile(latencies, 99) if latencies else 0.0,
+    }
+
+
+def import_workbook(rows):
+    from benchmarks.preview_benchmark import write_workbook
+
+    output = io.BytesIO()
+    write_workbook(output, rows)
+    return output.getvalue()
+
+
+class Driver:
+    def __init__(self, client, base_url, headers, args):
+        self.client = client
+        self.base_url = base_url
+        self.headers = headers
+        self.args = args
+        self.workbook = None
+
+    async def get(self, path, **params):
+        response = await self.client.get(path, params=params, headers=self.headers)
+        response.raise_for_status()
+        return response
+
+    async def run(self, scenario, clients):
+        args = self.args
+        today = date.today()
+        if scenario == "trucks":
+            return await measure(clients, args.requests, lambda: self.get("/api/trucks", limit=100))
+        if scenario == "trucks_filtered":
+            return await measure(clients, args.requests, lambda: self.get(
+                "/api/trucks", terminal="A", status_loading="Delay", limit=100))
+        if scenario == "trucks_history":
+            day = (today - timedelta(days=30)).isoformat()
+            return await measure(clients, args.requests, lambda: self.get(
+                "/api/trucks", date_from=day, date_to=day, limit=100))
+        if scenario == "stats":
+            return await measure(clients, args.requests, lambda: self.get("/api/stats"))
+        if scenario == "export":
+            return await measure(clients, args.heavy_requests, lambda: self.export(today))
+        if scenario == "import":
+            if self.workbook is None:
+                self.workbook = import_workbook(args.import_rows)
+            return await measure(clients, args.heavy_requests, lambda: self.import_once())
+        if scenario == "websocket":
+            return await self.fan_out(clients)
+        raise ValueError(f"Unknown scenario {scenario!r}")
+
+    async def export(self, today):
+        params = {"format": "csv", "date_from": (today - timedelta(days=7)).isoformat()}
+        async with self.client.stream("GET", "/api/trucks/export", params=params, headers=self.headers) as response:
+            response.raise_for_status()
+            async for _ in response.aiter_bytes():
+                pass
+
+    async def import_once(self):
+        files = {"file": ("bench.xlsx", self.workbook, "application/octet-stream")}
+        response = await self.client.post("/api/trucks/import/preview", files=files, headers=self.headers)
+        response.raise_for_status()
+        response = await self.client.post(
+            "/api/trucks/import/confirm", json={"session_id": response.json()["session_id"]}, headers=self.headers
+        )
+        response.raise_for_status()
+        job = response.json()
+        while job["status"] not in ("succeeded", "failed"):
+            await asyncio.sleep(0.05)
+            job = (await self.get(f"/api/jobs/{job['id']}")).json()
+        if job["status"] == "failed":
+            raise RuntimeError(job["error"])
+
+    async def fan_out(self, clients):
+        updates = self.args.requests
+        trucks = (await self.get("/api/trucks", limit=updates)).json()
+        sent, latencies = {}, []
+        url = self.base_url.replace("http", "ws", 1) + "/ws"
+        sockets = [await websockets.connect(url, max_queue=None) for _ in range(clients)]
+
+        async def listen(socket):
+            async for frame in socket:
+                message = json.loads(frame)
+                for event in message.get("events", [message]):
+                    truck_id = (event.get("data") or {}).get("id")
+                    if event.get("type") in ("status_updated", "truck_patched") and truck_id in sent:
+                        latencies.append((time.perf_counter() - sent[truck_id]) * 1000)
+
+        listeners = [asyncio.create_task(listen(socket)) for socket in sockets]
+        expected = len(trucks) * clients
+        start = time.perf_counter()
+        try:
+            for truck in trucks:
+                status = "Delay" if truck["status_loading"] != "Delay" else "On Process"
+                sent[truck["id"]] = time.perf_counter()
+                response = await self.client.patch(
+                    f"/api/trucks/{truck['id']}/status",
+                    params={"status_type": "loading", "status": status},
+                    headers=self.headers,
+                )
+                response.raise_for_status()
+            deadline = time.perf_counter() + 10
+            while len(latencies) < expected and time.perf_counter() < deadline:
+                await asyncio.sleep(0.01)
+        finally:
+            for listener in listeners:
+                listener.cancel()
+            await asyncio.gather(*(socket.close() for socket in sockets), return_exceptions=True)
+        return summarize(clients, latencies, expected - len(latencies), time.perf_counter() - start)
+
+
+async def drive(args, port, size):
+    base_url = f"http://127.0.0.1:{port}"
+    levels = [int(level) for level in args.levels.split(",")]
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    results = []
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        headers = {"Authorization": f"Bearer {await login(client, USERNAME, PASSWORD)}"}
+        driver = Driver(client, base_url, headers, args)
+        for scenario in args.scenarios.split(","):
+            for clients in levels:
+                result = {"size": size, "scenario": scenario, **await driver.run(scenario, clients)}
+                results.append(result)
+                print(
+                    f"{size:>8} {scenario:>16} {result['clients']:>8} {result['requests']:>9} "
+                    f"{result['errors']:>7} {result['rps']:>9.1f} {result['p50']:>9.1f} {result['p99']:>9.1f}",
+                    flush=True,
+                )
+    return results
+
+
+def run_size(args, size):
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(args, size, ready), daemon=True)
+    server.start()
+    try:
+        port, seeded = ready.get(timeout=args.seed_timeout)
+        print(f"# {size} trucks ({args.backend}) ready in {seeded:.1f} s", flush=True)
+        return asyncio.run(drive(args, port, size))
+    finally:
+        server.terminate()
+        server.join()
+
+
+def regressions(results, baseline, tolerance):
+    previous = {(row["size"], row["scenario"], row["clients"]): row for row in baseline}
+    found = []
+    for row in results:
+        before = previous.get((row["size"], row["scenario"], row["clients"]))
+        if before is None:
+            continue
+        if row["p99"] > before["p99"] * (1 + tolerance):
+            found.append(f"{row['size']} {row['scenario']} x{row['clients']}: "
+                         f"p99 {before['p99']:.1f} -> {row['p99']:.1f} ms")
+        if row["rps"] < before["rps"] * (1 - tolerance):
+            found.append(f"{row['size']} {row['scenario']} x{row['clients']}: "
+                         f"req/s {before['rps']:.1f} -> {row['rps']:.1f}")
+        if row["errors"] > before["errors"]:
+            found.append(f"{row['size']} {row['scenario']} x{row['clients']}: "
+                         f"errors {before['errors']} -> {row['errors']}")
+    return found
+
+
+def main(args):
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    multiprocessing.set_start_method("spawn")
+    print(f"{'trucks':>8} {'scenario':>16} {'clients':>8} {'requests':>9} {'errors':>7} "
+          f"{'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    results = []
+    for size in (int(size) for size in args.sizes.split(",")):
+        results.extend(run_size(args, size))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=("sqlite", "fake"), default="sqlite")
+    parser.add_argument("--sizes", default="1000,100000")
+    parser.add_argument("--levels", default="1,10,50")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--heavy-requests", type=int, default=2, help="exports/imports per client")
+    parser.add_argument("--import-rows", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated database round trip")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "truck-benchmarks"))
+    parser.add_argument("--seed-timeout", type=float, default=1800)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare with results saved by --save")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    main(parser.parse_args())
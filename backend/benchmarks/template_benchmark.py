@@ -0,0 +1,86 @@
+"""Import template: rebuilt per request versus cached bytes.
+
+``pandas`` is the workbook the endpoint used to build on every request
+(DataFrame through ``pd.ExcelWriter``), ``xlsxwriter`` the same workbook
+written directly, as the cache builds it once, and ``variant`` a terminal's
+pre-filled template. ``served`` is a cached GET through the app, and
+``not modified`` one answered 304 from the ETag.
+
+    python -m benchmarks.template_benchmark --repeat 50
+"""
+import argparse
+import asyncio
+import io
+import warnings
+
+import httpx
+
+from app.import_template import SAMPLE_ROWS, TEMPLATE_COLUMNS, build_template
+from benchmarks.stats_benchmark import time_call
+
+
+def build_with_pandas() -> bytes:
+    import pandas as pd
+
+    df = pd.DataFrame(list(SAMPLE_ROWS), columns=TEMPLATE_COLUMNS)
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df.to_excel(writer, sheet_name='Template', index=False)
+        workbook = writer.book
+        worksheet = writer.sheets['Template']
+        header_format = workbook.add_format({
+            'bold': True, 'bg_color': '#2196F3', 'font_color': 'white', 'border': 1, 'align': 'center'
+        })
+        instructions = workbook.add_worksheet('Instructions')
+        instructions.write('A1', 'Import Instructions:', workbook.add_format({'bold': True, 'size': 14}))
+        for row, line in enumerate(('Fill in', 'Required', 'Optional', 'Statuses', 'Times', 'Upload'), start=3):
+            instructions.write(f'A{row}', line)
+        for col_num, value in enumerate(df.columns.values):
+            worksheet.write(0, col_num, value, header_format)
+        worksheet.set_column('A:C', 12)
+        worksheet.set_column('D:D', 20)
+        worksheet.set_column('E:J', 12)
+    return output.getvalue()
+
+
+async def time_requests(app, repeat, headers=None) -> float:
+    """Mean ms per GET /api/trucks/template."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/api/trucks/template", headers=headers)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(repeat):
+            response = await client.get("/api/trucks/template", headers=headers)
+        elapsed = loop.time() - start
+    assert response.status_code == (304 if headers else 200)
+    return elapsed / repeat * 1000
+
+
+async def serve(repeat):
+    import app.main as main_module
+
+    etag = (await main_module.template_cache.get()).etag
+    served = await time_requests(main_module.app, repeat)
+    not_modified = await time_requests(main_module.app, repeat, {"If-None-Match": etag})
+    print(f"served           {served:8.2f} ms")
+    print(f"not modified     {not_modified:8.2f} ms")
+
+
+def main(args):
+    warnings.filterwarnings("ignore")
+    docks = [f"DOCK-A{i}" for i in range(args.docks)]
+    routes = [f"Route-{i}" for i in range(args.docks)]
+    print(f"pandas build     {time_call(build_with_pandas, args.repeat):8.2f} ms")
+    print(f"xlsxwriter build {time_call(build_template, args.repeat):8.2f} ms")
+    print(f"variant build    {time_call(lambda: build_template('A', docks, routes), args.repeat):8.2f} ms "
+          f"({args.docks} docks and routes)")
+
+    asyncio.run(serve(args.repeat * 10))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--docks", type=int, default=50)
+    main(parser.parse_args())
@@ -0,0 +1,83 @@
+"""/api/trucks queries against the in-memory truck index.
+
+Loads ``--sizes`` trucks created today into a TruckIndex, timing the
+warm-up without any database round trips, then reports the median lookup
+time of the board's common queries, and heap per truck as a __slots__
+record compared with the dict rows PostgREST returns.
+
+    python -m benchmarks.truck_index_benchmark --sizes 1000,10000,50000
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from app.database import TruckFilters
+from app.truck_index import TruckIndex, TruckRecord
+from benchmarks.seed import generate_trucks
+from benchmarks.stats_benchmark import time_call
+
+
+class PagedRows:
+    # Stands in for Database.iter_trucks, so warm-up times the index alone
+    def __init__(self, trucks):
+        self.trucks = sorted(trucks, key=lambda truck: (truck["created_at"], truck["id"]), reverse=True)
+
+    async def iter_trucks(self, filters, page_size):
+        for start in range(0, len(self.trucks), page_size):
+            yield self.trucks[start:start + page_size]
+
+
+def heap_per_row(build, count):
+    tracemalloc.start()
+    rows = build()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del rows
+    return used / count
+
+
+async def run(size, args):
+    # Spread over the whole of today (UTC)
+    now = datetime.now(timezone.utc).replace(hour=23, minute=59, second=59)
+    trucks = list(generate_trucks(size, days=1, now=now))
+
+    index = TruckIndex(days=1)
+    start = time.perf_counter()
+    await index.reconcile(PagedRows(trucks))
+    warm_up = (time.perf_counter() - start) * 1000
+
+    today = now.date().isoformat()
+    queries = {
+        "board": (TruckFilters(), 0, 100),
+        "terminal": (TruckFilters(terminal="A"), 0, 100),
+        "delayed": (TruckFilters(status_loading="Delay"), 0, 100),
+        "term+delay": (TruckFilters(terminal="A", status_loading="Delay", date_from=today), 0, 100),
+        "dock": (TruckFilters(dock_code="DOCK-A3", date_from=today), 0, 100),
+        "page 5": (TruckFilters(date_from=today), 400, 100),
+    }
+    timings = {}
+    for name, (filters, skip, limit) in queries.items():
+        assert index.lookup(filters, skip, limit) is not None, name
+        timings[name] = time_call(lambda: index.lookup(filters, skip, limit), args.repeat) * 1000
+
+    dict_bytes = heap_per_row(lambda: [dict(truck) for truck in trucks], size)
+    record_bytes = heap_per_row(lambda: [TruckRecord(truck) for truck in trucks], size)
+    return len(index), warm_up, timings, dict_bytes, record_bytes
+
+
+async def main(args):
+    for size in (int(size) for size in args.sizes.split(",")):
+        count, warm_up, timings, dict_bytes, record_bytes = await run(size, args)
+        print(f"\ntrucks today={count} warm-up={warm_up:.0f} ms "
+              f"heap/truck: dict={dict_bytes:.0f} B record={record_bytes:.0f} B")
+        for name, micros in timings.items():
+            print(f"  {name:>12} {micros:>9.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    parser.add_argument("--repeat", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,42 @@
+import bcrypt
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.database import Database
+from benchmarks.fake_postgrest import FakePostgrest
+
+
+@pytest.fixture
+def fake():
+    return FakePostgrest()
+
+
+@pytest.fixture
+def db(fake):
+    return Database("http://test", "test-key", transport=fake)
+
+
+@pytest.fixture(scope="session")
+def api_fake():
+    return FakePostgrest()
+
+
+@pytest.fixture(scope="session")
+def api(api_fake):
+    """The app, started once: its shutdown closes executors for good."""
+    api_fake.tables["users"] = [{
+        "id": "u1", "username": "admin", "role": "admin",
+        "password_hash": bcrypt.hashpw(b"admin123", bcrypt.gensalt(4)).decode(),
+    }]
+    main.db = Database("http://test", "test-key", transport=api_fake)
+    with TestClient(main.app) as client:
+        token = client.post("/api/auth/login", data={"username": "admin", "password": "admin123"}).json()
+        client.headers["Authorization"] = f"Bearer {token['access_token']}"
+        yield client
+
+
+@pytest.fixture
+def client(api, api_fake):
+    api_fake.tables["trucks"] = []
+    return api
@@ -0,0 +1,27 @@
+import pytest
+
+from app.database import decode_cursor, encode_cursor
+
+TRUCK_ID = "0b5c5f9e-8d7a-4c1e-9a3b-2f1d6e7c8a90"
+
+
+@pytest.mark.parametrize("created_at", [
+    "2024-05-01T10:00:00+00:00",
+    "2024-05-01T10:00:00.1+00:00",
+    "2024-05-01T10:00:00.12345+00:00",
+    "2024-05-01T10:00:00.123456Z",
+    "2024-05-01 10:00:00.5+07",
+])
+def test_round_trips_postgrest_timestamps(created_at):
+    assert decode_cursor(encode_cursor((created_at, TRUCK_ID))) == (created_at, TRUCK_ID)
+
+
+@pytest.mark.parametrize("cursor", [
+    ('2024-05-01T10:00:00"),or=(id.gt.0', TRUCK_ID),
+    ("yesterday", TRUCK_ID),
+    ("2024-05-01T10:00:00+00:00", "not-a-uuid"),
+    (1714557600, TRUCK_ID),
+])
+def test_rejects_malformed_cursors(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(cursor))
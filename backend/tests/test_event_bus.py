@@ -0,0 +1,39 @@
+import asyncio
+import json
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from app.event_bus import NOTIFY_PAYLOAD_LIMIT, PostgresEventBus, SharedEventBus
+
+
+class Connection:
+    closed = False
+
+    def __init__(self):
+        self.notified = []
+
+    async def execute(self, sql, params):
+        self.notified.append(json.loads(params[1]))
+
+
+def test_shared_bus_is_abstract():
+    with pytest.raises(TypeError):
+        SharedEventBus()
+
+
+def test_oversized_notify_is_replaced_by_a_logged_resync(caplog):
+    bus = PostgresEventBus("postgresql://test")
+    connection = Connection()
+
+    async def connect(dsn, autocommit):
+        return connection
+
+    bus._psycopg = SimpleNamespace(AsyncConnection=SimpleNamespace(connect=connect))
+    event = {"message": {"type": "trucks_imported", "data": {"note": "x" * NOTIFY_PAYLOAD_LIMIT}}}
+    with caplog.at_level(logging.WARNING, logger="app.event_bus"):
+        asyncio.run(bus._send(json.dumps({"origin": bus.origin, "id": "1", "event": event})))
+
+    assert connection.notified[0]["event"] == {"message": {"type": "resync"}}
+    assert "trucks_imported event" in caplog.text
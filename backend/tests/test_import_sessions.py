@@ -0,0 +1,27 @@
+import asyncio
+
+import pytest
+
+from app.import_sessions import ImportSessionStore, create_session_store
+
+
+def test_base_store_is_abstract():
+    with pytest.raises(TypeError):
+        ImportSessionStore()
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_sessions_round_trip(backend, tmp_path):
+    store = create_session_store(backend, str(tmp_path / "sessions.sqlite3"))
+    trucks = [{"truck_no": "TRK001", "terminal": "A"}]
+
+    async def run():
+        session_id = await store.put("u1", trucks)
+        session = await store.get(session_id)
+        await store.discard(session_id)
+        return session, await store.get(session_id), await store.usage()
+
+    session, discarded, usage = asyncio.run(run())
+    assert (session.user_id, session.trucks) == ("u1", trucks)
+    assert discarded is None
+    assert usage == (0, 0)
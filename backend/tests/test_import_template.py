@@ -0,0 +1,33 @@
+import asyncio
+
+from app.database import Database
+from app.import_template import TemplateCache
+from benchmarks.fake_postgrest import FakePostgrest
+from benchmarks.seed import generate_trucks
+
+
+def test_reference_reads_every_page_past_the_row_cap():
+    fake = FakePostgrest(max_rows=50)
+    fake.tables["trucks"] = list(generate_trucks(500))
+    db = Database("http://test", "test-key", transport=fake)
+    expected = {(t["terminal"], t["dock_code"], t["truck_route"]) for t in fake.tables["trucks"]}
+
+    rows = asyncio.run(db.truck_reference(page_size=40))
+    assert len(expected) > 50
+    assert len(rows) == len(expected)
+    assert {(r["terminal"], r["dock_code"], r["truck_route"]) for r in rows} == expected
+
+
+def test_a_terminal_dropped_before_its_build_starts():
+    async def run():
+        cache = TemplateCache()
+        cache._reference = {"A": ({"DOCK-A1"}, {"Bangkok-Rayong"})}
+        pending = asyncio.ensure_future(cache.get("A"))
+        # get() has queued the build; a refresh that lands first drops A
+        await asyncio.sleep(0)
+        cache._reference = {}
+        return await pending, await cache.get("A")
+
+    template, after_refresh = asyncio.run(run())
+    assert template.content.startswith(b"PK")
+    assert after_refresh is None
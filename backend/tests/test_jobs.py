@@ -0,0 +1,54 @@
+import asyncio
+import gc
+import weakref
+
+import app.main as main
+from app.jobs import JobRunner
+
+
+class Trucks(list):
+    """A job input that can be watched for release."""
+
+
+def test_job_events_carry_the_summary_and_the_input_is_released():
+    events = []
+
+    async def publish(job):
+        events.append(job.as_dict(summary=True))
+
+    async def submit(runner):
+        trucks = Trucks({"truck_no": f"TRK{i}"} for i in range(500))
+
+        async def work(job):
+            return {"imported": 0, "failed": len(trucks), "failed_details": [{"row": t} for t in trucks]}
+
+        return await runner.submit("import", "u1", work), weakref.ref(trucks)
+
+    async def run():
+        runner = JobRunner(workers=1)
+        runner.start(publish)
+        job, trucks = await submit(runner)
+        while job.status != "succeeded":
+            await asyncio.sleep(0)
+        # The worker is idle but still running: the finished job's input is gone
+        gc.collect()
+        released = trucks() is None
+        await runner.close()
+        return job, released
+
+    job, released = asyncio.run(run())
+    assert released
+    assert len(job.result["failed_details"]) == 500
+    assert events[-1]["status"] == "succeeded"
+    assert events[-1]["result"] == {"imported": 0, "failed": 500, "partial": True}
+
+
+def test_a_mirrored_job_result_is_marked_partial(client):
+    job = main.Job(id="remote-job", kind="import", user_id="u1", status="succeeded")
+    job.result = {"imported": 1, "failed": 1, "failed_details": [{"row": 3, "error": "bad"}]}
+    asyncio.run(main.handle_event(
+        {"message": {"type": "job_updated", "data": job.as_dict(summary=True)}}, remote=True
+    ))
+
+    result = client.get("/api/jobs/remote-job").json()["result"]
+    assert result == {"imported": 1, "failed": 1, "partial": True}
@@ -0,0 +1,71 @@
+import asyncio
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import app.main as main
+from app import login_guard
+from app.login_guard import LoginRateLimiter, PasswordVerifier
+
+
+def test_ip_limit_keys_on_the_forwarded_client(client, monkeypatch):
+    monkeypatch.setattr(main, "TRUSTED_PROXY_HOPS", 1)
+    monkeypatch.setattr(main, "ip_limiter", LoginRateLimiter(max_attempts=2, window=60))
+
+    def login(user, forwarded_for):
+        return client.post(
+            "/api/auth/login", data={"username": user, "password": "wrong"},
+            headers={"X-Forwarded-For": forwarded_for},
+        ).status_code
+
+    assert login("a", "203.0.113.1") == 401
+    assert login("b", "203.0.113.1") == 401
+    assert login("c", "203.0.113.1") == 429
+    # Only the entry the proxy appended counts; a client can't prepend its way out
+    assert login("d", "198.51.100.7, 203.0.113.1") == 429
+    # Another caller behind the same proxy keeps its own bucket
+    assert login("e", "203.0.113.2") == 401
+
+
+def test_concurrent_burst_counts_attempts_in_flight(client, monkeypatch):
+    monkeypatch.setattr(main, "username_limiter", LoginRateLimiter(max_attempts=5, window=60))
+    monkeypatch.setattr(main, "ip_limiter", LoginRateLimiter(max_attempts=50, window=60))
+    checks = []
+
+    async def verify_password(plain_password, hashed_password):
+        checks.append(plain_password)
+        await asyncio.sleep(0.2)
+        return False
+
+    monkeypatch.setattr(main, "verify_password", verify_password)
+
+    def login(_):
+        return client.post("/api/auth/login", data={"username": "admin", "password": "wrong"}).status_code
+
+    with ThreadPoolExecutor(max_workers=40) as pool:
+        statuses = Counter(pool.map(login, range(40)))
+
+    assert statuses == {401: 5, 429: 35}
+    assert len(checks) == 5
+
+
+def test_saturated_verifier_fails_fast(client, monkeypatch):
+    verifier = PasswordVerifier(workers=1, max_pending=2)
+    monkeypatch.setattr(main, "password_verifier", verifier)
+    monkeypatch.setattr(main, "username_limiter", LoginRateLimiter(max_attempts=50, window=60))
+    monkeypatch.setattr(main, "ip_limiter", LoginRateLimiter(max_attempts=50, window=60))
+    monkeypatch.setattr(login_guard.bcrypt, "checkpw", lambda password, hashed: time.sleep(0.3) or False)
+
+    def login(_):
+        return client.post("/api/auth/login", data={"username": "admin", "password": "wrong"}).status_code
+
+    try:
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            statuses = Counter(pool.map(login, range(6)))
+    finally:
+        verifier.close()
+
+    assert statuses == {401: 2, 503: 4}
+    # Turned-away attempts don't count against the user
+    assert main.username_limiter.retry_after("admin") == 0
+    assert len(main.username_limiter._failures["admin"]) == 2
@@ -0,0 +1,23 @@
+import app.main as main
+from app.metrics import query_labels
+
+
+def test_rpc_calls_are_labelled_rpc(db):
+    assert query_labels(db.client.rpc("truck_stats", {})) == ("rpc/truck_stats", "rpc")
+    assert query_labels(db.client.table("trucks").insert({})) == ("trucks", "insert")
+
+
+def test_metrics_is_not_public_by_default(client, monkeypatch):
+    monkeypatch.setattr(main, "METRICS_TOKEN", None)
+    monkeypatch.setattr(main, "METRICS_PUBLIC", False)
+    assert client.get("/metrics").status_code == 404
+
+    monkeypatch.setattr(main, "METRICS_PUBLIC", True)
+    assert client.get("/metrics").status_code == 200
+
+
+def test_metrics_token(client, monkeypatch):
+    monkeypatch.setattr(main, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
@@ -0,0 +1,65 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.database import TruckFilters
+from app.stats_cache import StatsCache, summarize_groups
+from benchmarks.seed import generate_trucks
+
+
+def test_reconcile_loads_every_page(fake, db):
+    # More than one 1000-row page inside the window
+    fake.tables["trucks"] = list(generate_trucks(2500, days=1))
+    cache = StatsCache(days=7)
+
+    async def run():
+        await cache.reconcile(db)
+        # The cache keys days in UTC
+        filters = TruckFilters(date_from=datetime.now(timezone.utc).date().isoformat())
+        groups = await db.truck_status_counts(filters)
+        return cache.lookup(filters), summarize_groups(
+            (g["terminal"], g["status_preparation"], g["status_loading"], g["truck_count"]) for g in groups
+        )
+
+    cached, expected = asyncio.run(run())
+    assert len(cache._trucks) == 2500
+    assert cached == expected
+
+
+def test_unfiltered_stats_include_history(fake, db):
+    fake.tables["trucks"] = list(generate_trucks(1500, days=30))
+    cache = StatsCache(days=7)
+
+    async def run():
+        await cache.reconcile(db)
+        groups = await db.truck_status_counts(TruckFilters())
+        return summarize_groups(
+            (g["terminal"], g["status_preparation"], g["status_loading"], g["truck_count"]) for g in groups
+        )
+
+    expected = asyncio.run(run())
+    assert cache.lookup(TruckFilters()) == expected
+    assert cache.lookup(TruckFilters(terminal="A"))["total_trucks"] == expected["terminal_stats"]["A"]
+
+
+def test_change_outside_window_wakes_reconcile(fake, db):
+    fake.tables["trucks"] = list(generate_trucks(100, days=1))
+    cache = StatsCache(days=7)
+    asyncio.run(cache.reconcile(db))
+    cache.apply({"id": "old", "terminal": "A", "status_preparation": "Finished",
+                 "status_loading": "Finished", "created_at": "2000-01-01T00:00:00+00:00"})
+    assert cache._wake.is_set()
+
+
+def test_history_ends_where_the_window_starts(fake, db):
+    cache = StatsCache(days=7)
+    window_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=6)
+    truck = next(generate_trucks(1, days=1))
+    # The last second before the window, fractional like Postgres returns it
+    for offset in (timedelta(seconds=-1), timedelta(seconds=-0.5), timedelta(0)):
+        fake.tables["trucks"].append({
+            **truck, "id": f"t{offset.total_seconds()}", "truck_no": f"T{offset.total_seconds()}",
+            "created_at": (window_start + offset).isoformat(),
+        })
+
+    asyncio.run(cache.reconcile(db))
+    assert cache.lookup(TruckFilters())["total_trucks"] == 3
@@ -0,0 +1,87 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import app.main as main
+from app.database import Database, TruckFilters, cursor_of
+from app.truck_index import TruckIndex
+from benchmarks.sqlite_postgrest import SqlitePostgrest
+
+
+@pytest.mark.parametrize("limit", [0, -1, 1001])
+def test_list_rejects_out_of_range_limit(client, limit):
+    assert client.get("/api/trucks", params={"limit": limit}).status_code == 422
+
+
+def test_duplicate_truck_no_is_a_conflict(client):
+    truck = {"terminal": "A", "truck_no": "TRK-DUP", "dock_code": "DOCK-A1", "truck_route": "Bangkok-Rayong"}
+    assert client.post("/api/trucks", json=truck).status_code == 200
+    response = client.post("/api/trucks", json=truck)
+    assert response.status_code == 409
+    assert "TRK-DUP" in response.json()["detail"]
+
+    other = client.post("/api/trucks", json={**truck, "truck_no": "TRK-OTHER"}).json()
+    response = client.put(f"/api/trucks/{other['id']}", json={"truck_no": "TRK-DUP"})
+    assert response.status_code == 409
+
+
+def test_etags_revalidate(client):
+    etag = client.get("/api/trucks").headers["ETag"]
+    assert client.get("/api/trucks", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_no_etags_without_shared_caches(client, monkeypatch):
+    # Several workers on the local bus: another worker's write would leave this tag current
+    etag = client.get("/api/trucks").headers["ETag"]
+    monkeypatch.setattr(main, "LOCAL_CACHES", False)
+    response = client.get("/api/trucks", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+
+
+def test_truck_index_matches_the_database():
+    sql = SqlitePostgrest()
+    sql.seed_trucks(1500, days=4)
+    # NULL statuses, as TruckUpdate can set them, next to every other status
+    sql.conn.execute("UPDATE trucks SET status_preparation = NULL WHERE rowid % 7 = 0")
+    sql.conn.execute("UPDATE trucks SET status_loading = NULL WHERE rowid % 11 = 0")
+    sql.conn.execute("UPDATE trucks SET status_loading = 'Finished' WHERE rowid % 14 = 0")
+    db = Database("http://test", "test-key", transport=sql)
+    today = datetime.utcnow().date()
+    yesterday, last_week = (today - timedelta(days=1)).isoformat(), (today - timedelta(days=7)).isoformat()
+    today = today.isoformat()
+    cases = [
+        (TruckFilters(), 0, 100),
+        (TruckFilters(terminal="A"), 0, 50),
+        (TruckFilters(terminal="B", date_from=today, date_to=today), 0, 100),
+        (TruckFilters(dock_code="DOCK-C3", date_from=yesterday), 0, 100),
+        (TruckFilters(status_loading="Delay", date_from=yesterday), 5, 20),
+        (TruckFilters(status_preparation="Finished", date_from=today), 0, 1000),
+        (TruckFilters(active=True, date_from=yesterday), 0, 1000),
+        (TruckFilters(active=True, terminal="D", date_from=today, date_to=today), 3, 10),
+        (TruckFilters(active=True), 0, 100),
+        (TruckFilters(date_from=yesterday, date_to=yesterday), 10, 100),
+        (TruckFilters(date_from=last_week, date_to=yesterday), 0, 50),
+        (TruckFilters(date_from=last_week), 0, 1000),
+    ]
+
+    async def run():
+        index = TruckIndex(days=2)
+        await index.reconcile(db)
+        pairs = []
+        for filters, skip, limit in cases:
+            expected = await db.list_trucks(filters, skip, limit)
+            pairs.append((index.lookup(filters, skip, limit), expected))
+            if len(expected) > 2:
+                # The next page, continuing after a cursor
+                after = cursor_of(expected[len(expected) // 2])
+                pairs.append((index.lookup(filters, 0, limit, after), await db.list_trucks(filters, 0, limit, after)))
+        return pairs
+
+    pairs = asyncio.run(run())
+    answered = [(page, expected) for page, expected in pairs if page is not None]
+    # Only the date range reaching past the window needs the database
+    assert len(pairs) - len(answered) <= 2
+    for page, expected in answered:
+        assert page == expected
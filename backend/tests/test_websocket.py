@@ -0,0 +1,135 @@
+import asyncio
+import json
+
+from app.websocket import ConnectionManager, Subscription
+from benchmarks.seed import generate_trucks
+
+
+class Recorder:
+    def __init__(self):
+        self.messages = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, frame):
+        message = json.loads(frame)
+        self.messages.extend(message["events"] if message["type"] == "batch" else [message])
+
+    async def close(self, code=1000):
+        pass
+
+
+def test_patch_keeps_fields_cleared_to_none():
+    truck = next(generate_trucks(1, days=1))
+    truck["preparation_end"] = "08:30"
+    # What stats_cache.state() passes along: no time fields at all
+    previous = {key: truck[key] for key in ("id", "terminal", "status_preparation", "status_loading")}
+    updated = {**truck, "preparation_end": None}
+
+    async def run():
+        manager = ConnectionManager(coalesce_window=0.01)
+        board = Recorder()
+        await manager.connect(board)
+        await manager.broadcast({"type": "truck_updated", "data": updated}, previous)
+        await asyncio.sleep(0.05)
+        manager.disconnect(board)
+        return board.messages
+
+    patch = next(message for message in asyncio.run(run()) if message["type"] == "truck_patched")
+    assert "preparation_end" in patch["data"] and patch["data"]["preparation_end"] is None
+
+
+def test_job_updates_reach_only_sockets_subscribed_to_the_job():
+    update = {"type": "job_updated", "data": {"id": "job-1", "status": "running", "done": 10, "total": 100}}
+
+    async def run():
+        manager = ConnectionManager()
+        board, watcher, other = Recorder(), Recorder(), Recorder()
+        await manager.connect(board)
+        await manager.connect(watcher, Subscription(job=frozenset({"job-1"})))
+        await manager.connect(other, Subscription(job=frozenset({"job-2"})))
+        await manager.broadcast(update)
+        # A watcher that reconnects has the update replayed
+        late = Recorder()
+        await manager.connect(late, Subscription(job=frozenset({"job-1"})), since=0, epoch=manager.epoch)
+        await asyncio.sleep(0.01)
+        for socket in (board, watcher, other, late):
+            manager.disconnect(socket)
+        return [[m["type"] for m in socket.messages] for socket in (board, watcher, other, late)]
+
+    board, watcher, other, late = asyncio.run(run())
+    assert board == other == ["hello"]
+    assert watcher == late == ["hello", "job_updated"]
+
+
+def replay_after(since, epoch=None):
+    """Frame types and seqs a client reconnecting with ``since`` gets after five events."""
+
+    async def run():
+        manager = ConnectionManager(replay_size=3)
+        for truck in generate_trucks(5, days=1):
+            await manager.broadcast({"type": "truck_created", "data": truck})
+        client = Recorder()
+        await manager.connect(client, since=since, epoch=manager.epoch if epoch is None else epoch)
+        await asyncio.sleep(0.01)
+        manager.disconnect(client)
+        return [(m["type"], m.get("seq")) for m in client.messages[1:]]
+
+    return asyncio.run(run())
+
+
+def test_replay_fills_a_gap_inside_the_ring():
+    assert replay_after(3) == [("truck_created", 4), ("truck_created", 5)]
+    # The oldest event kept is exactly the next one the client needs
+    assert [seq for _, seq in replay_after(2)] == [3, 4, 5]
+    # Up to date: nothing to send
+    assert replay_after(5) == []
+
+
+def test_replay_resyncs_a_gap_outside_the_ring():
+    # The ring holds 3..5, so a client that saw only 1 missed 2 for good
+    assert replay_after(1) == [("resync", 5)]
+
+
+def test_replay_resyncs_another_epoch():
+    assert replay_after(4, epoch="another-run") == [("resync", 5)]
+
+
+def test_a_truck_leaving_a_terminal_reaches_its_old_subscribers():
+    truck = next(generate_trucks(1, days=1))
+    previous, moved = {**truck, "terminal": "A"}, {**truck, "terminal": "B"}
+
+    async def run():
+        manager = ConnectionManager()
+        boards = {terminal: Recorder() for terminal in "ABC"}
+        for terminal, board in boards.items():
+            await manager.connect(board, Subscription(terminal=frozenset({terminal})))
+        await manager.broadcast({"type": "truck_updated", "data": moved}, previous)
+        await asyncio.sleep(0.01)
+        for board in boards.values():
+            manager.disconnect(board)
+        return {terminal: [m["type"] for m in board.messages[1:]] for terminal, board in boards.items()}
+
+    # A drops the truck from its board, B adds it, C never hears of it
+    assert asyncio.run(run()) == {"A": ["truck_updated"], "B": ["truck_updated"], "C": []}
+
+
+def test_create_then_update_coalesces_into_one_full_frame():
+    truck = next(generate_trucks(1, days=1))
+    updated = {**truck, "status_loading": "Delay"}
+
+    async def run():
+        manager = ConnectionManager(coalesce_window=0.01)
+        board = Recorder()
+        await manager.connect(board)
+        await manager.broadcast({"type": "truck_created", "data": truck})
+        await manager.broadcast({"type": "truck_updated", "data": updated}, truck)
+        await asyncio.sleep(0.05)
+        manager.disconnect(board)
+        return board.messages[1:]
+
+    # The board never had the truck, so no patch: one create with the latest row
+    (frame,) = asyncio.run(run())
+    assert frame["type"] == "truck_created"
+    assert frame["data"] == updated
@@ -12,7 +12,16 @@ CREATE TABLE trucks (
     status_preparation VARCHAR(20) DEFAULT 'On Process',
     status_loading VARCHAR(20) DEFAULT 'On Process',
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    -- Excel import upserts on truck_no (ON CONFLICT), and POST /api/trucks
+    -- answers 409 for a truck_no that exists. Existing databases must drop
+    -- duplicates first (this keeps the most recently changed row of each):
+    -- DELETE FROM trucks t USING trucks newer
+    --  WHERE newer.truck_no = t.truck_no
+    --    AND (COALESCE(newer.updated_at, newer.created_at), newer.id)
+    --      > (COALESCE(t.updated_at, t.created_at), t.id);
+    -- ALTER TABLE trucks ADD CONSTRAINT trucks_truck_no_key UNIQUE (truck_no);
+    CONSTRAINT trucks_truck_no_key UNIQUE (truck_no)
 );
 
 -- Create users table
@@ -24,10 +33,61 @@ CREATE TABLE users (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
--- Create index for performance
-CREATE INDEX idx_truck_no ON trucks(truck_no);
-CREATE INDEX idx_terminal ON trucks(terminal);
-CREATE INDEX idx_status ON trucks(status_preparation, status_loading);
+-- Indexes, one per query shape. Every /api/trucks page and export is
+-- ordered by the (created_at, id) keyset and optionally filtered by
+-- terminal, dock, status and a created_at range; explain_queries.py in
+-- backend/benchmarks shows the plan each shape gets. Existing databases:
+-- create these CONCURRENTLY, then DROP INDEX idx_terminal, idx_status;
+--
+-- Unfiltered pages and date ranges; the included columns let /api/stats
+-- and the stats cache reconcile count from the index alone
+CREATE INDEX idx_created_at_id ON trucks(created_at DESC, id DESC)
+    INCLUDE (terminal, status_preparation, status_loading);
+-- One terminal's pages and stats (the TV board, per-terminal exports)
+CREATE INDEX idx_terminal_created_at_id ON trucks(terminal, created_at DESC, id DESC)
+    INCLUDE (status_preparation, status_loading);
+CREATE INDEX idx_dock_code_created_at_id ON trucks(dock_code, created_at DESC, id DESC);
+-- Trucks still on the board (?active=true, or a status filter other than
+-- Finished): a small, mostly recent slice of the table
+CREATE INDEX idx_active_created_at_id ON trucks(created_at DESC, id DESC)
+    WHERE status_preparation <> 'Finished' OR status_loading <> 'Finished';
+CREATE INDEX idx_active_terminal_created_at_id ON trucks(terminal, created_at DESC, id DESC)
+    WHERE status_preparation <> 'Finished' OR status_loading <> 'Finished';
+
+-- Grouped status counts for /api/stats (one row per terminal/status combination)
+CREATE OR REPLACE FUNCTION truck_stats(
+    p_terminal VARCHAR DEFAULT NULL,
+    p_date_from TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_date_to TIMESTAMP WITH TIME ZONE DEFAULT NULL
+)
+RETURNS TABLE (
+    terminal VARCHAR,
+    status_preparation VARCHAR,
+    status_loading VARCHAR,
+    truck_count BIGINT
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT t.terminal, t.status_preparation, t.status_loading, COUNT(*) AS truck_count
+    FROM trucks t
+    WHERE (p_terminal IS NULL OR t.terminal = p_terminal)
+      AND (p_date_from IS NULL OR t.created_at >= p_date_from)
+      AND (p_date_to IS NULL OR t.created_at <= p_date_to)
+    GROUP BY t.terminal, t.status_preparation, t.status_loading;
+$$;
+
+-- Dock codes and routes in use per terminal, for the pre-filled import templates
+CREATE OR REPLACE FUNCTION truck_reference()
+RETURNS TABLE (
+    terminal VARCHAR,
+    dock_code VARCHAR,
+    truck_route VARCHAR
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT DISTINCT t.terminal, t.dock_code, t.truck_route
+    FROM trucks t;
+$$;
 
 -- Insert default admin user (password: admin123)
 INSERT INTO users (username, password_hash, role) 
@@ -13,7 +13,13 @@ export const useTruckStore = defineStore('trucks', {
     },
     loading: false,
     error: null,
+    nextCursor: null,
+    lastFilters: {},
     websocket: null,
+    reconnectTimer: null,
+    wsSubscription: null,
+    wsEpoch: null,
+    lastSeq: null,
     dateFilter: {
       fromDate: null,
       toDate: null
@@ -39,9 +45,27 @@ export const useTruckStore = defineStore('trucks', {
         const params = new URLSearchParams(allFilters)
         const response = await axios.get(`/api/trucks?${params}`)
         this.trucks = response.data || []
+        this.lastFilters = allFilters
+        this.nextCursor = response.headers['x-next-cursor'] || null
       } catch (error) {
         this.error = error.message
         this.trucks = []
+        this.nextCursor = null
+      } finally {
+        this.loading = false
+      }
+    },
+
+    async fetchMoreTrucks() {
+      if (!this.nextCursor) return
+      this.loading = true
+      try {
+        const params = new URLSearchParams({ ...this.lastFilters, cursor: this.nextCursor })
+        const response = await axios.get(`/api/trucks?${params}`)
+        this.trucks = [...this.trucks, ...(response.data || [])]
+        this.nextCursor = response.headers['x-next-cursor'] || null
+      } catch (error) {
+        this.error = error.message
       } finally {
         this.loading = false
       }
@@ -124,44 +148,135 @@ export const useTruckStore = defineStore('trucks', {
       }
     },
 
-    connectWebSocket() {
+    // subscription narrows the pushed events, e.g. { terminal: 'A' } or
+    // { status: ['Delay'], event: ['status_updated'] }; null receives everything
+    connectWebSocket(subscription = this.wsSubscription) {
       const wsProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:'
-      this.websocket = new WebSocket(`${wsProtocol}//${window.location.host}/ws`)
+      this.wsSubscription = subscription
+      const params = new URLSearchParams()
+      Object.entries(this.wsSubscription || {}).forEach(([key, value]) => {
+        [].concat(value).forEach(item => params.append(key, item))
+      })
+      if (this.lastSeq !== null) {
+        // Reconnecting: the server replays only what we missed
+        params.append('since', this.lastSeq)
+        params.append('epoch', this.wsEpoch)
+      }
+      this.websocket = new WebSocket(`${wsProtocol}//${window.location.host}/ws?${params}`)
 
       this.websocket.onmessage = async (event) => {
         const message = JSON.parse(event.data)
+        // Coalesced updates and replays arrive as one batch frame; refresh stats once for all of them
+        const messages = message.type === 'batch' ? message.events : [message]
+        const changes = messages.map(item => {
+          if (item.seq > this.lastSeq) this.lastSeq = item.seq
+          return this.applyEvent(item)
+        })
 
-        switch (message.type) {
-          case 'truck_created':
-            if (this.isWithinDateFilter(message.data.created_at)) {
-              this.trucks.push(message.data)
-              await this.fetchStats() // Refresh stats on truck creation
-            }
-            break
-          case 'truck_updated':
-          case 'status_updated':
-            const index = this.trucks.findIndex(t => t.id === message.data.id)
-            if (index !== -1) {
-              this.trucks[index] = message.data
-              await this.fetchStats() // Refresh stats on update
-            }
-            break
-          case 'truck_deleted':
-            this.trucks = this.trucks.filter(t => t.id !== message.data.id)
-            await this.fetchStats() // Refresh stats on deletion
-            break
+        if (changes.includes('refetch')) {
+          await this.fetchTrucks(this.lastFilters)
+          await this.fetchStats()
+        } else if (changes.includes('stats')) {
+          await this.fetchStats()
         }
       }
 
       this.websocket.onerror = (error) => {
         console.error('WebSocket error:', error)
       }
+
+      this.websocket.onclose = (event) => {
+        // Unexpected close (network blip or dropped by the server): reconnect
+        if (this.websocket === event.target) {
+          this.reconnectTimer = setTimeout(() => this.connectWebSocket(), 3000)
+        }
+      }
+    },
+
+    // Applies one pushed event to the list; returns 'stats' when stats need a
+    // refresh, 'refetch' when the whole list does, or null
+    applyEvent(message) {
+      switch (message.type) {
+        case 'hello':
+          // A different epoch is another server process: its numbering is new
+          if (message.epoch !== this.wsEpoch) {
+            this.wsEpoch = message.epoch
+            this.lastSeq = message.last_seq
+          }
+          return null
+        case 'truck_created': {
+          if (!this.isWithinDateFilter(message.data.created_at)) return null
+          // A replay may repeat a create we already applied
+          const index = this.trucks.findIndex(t => t.id === message.data.id)
+          if (index !== -1) {
+            this.trucks[index] = message.data
+          } else {
+            this.trucks.push(message.data)
+          }
+          return 'stats'
+        }
+        case 'truck_patched': {
+          // Only the changed fields; sent for trucks we already have
+          const index = this.trucks.findIndex(t => t.id === message.data.id)
+          if (index === -1) return null
+          const truck = { ...this.trucks[index], ...message.data }
+          if (this.matchesSubscription(truck)) {
+            this.trucks[index] = truck
+          } else {
+            this.trucks.splice(index, 1)
+          }
+          return 'stats'
+        }
+        case 'truck_updated':
+        case 'status_updated': {
+          const index = this.trucks.findIndex(t => t.id === message.data.id)
+          if (index !== -1) {
+            if (this.matchesSubscription(message.data)) {
+              this.trucks[index] = message.data
+            } else {
+              // Routed here because the truck left our subscription
+              this.trucks.splice(index, 1)
+            }
+            return 'stats'
+          }
+          if (this.wsSubscription && this.matchesSubscription(message.data)) {
+            // Routed here because the truck entered our subscription
+            this.trucks.push(message.data)
+            return 'stats'
+          }
+          return null
+        }
+        case 'truck_deleted':
+          this.trucks = this.trucks.filter(t => t.id !== message.data.id)
+          return 'stats'
+        case 'trucks_imported': // Bulk import sends one summary instead of a frame per row
+        case 'resync': // Server collapsed a backlog, or can't replay what we missed
+          return 'refetch'
+        default:
+          return null
+      }
+    },
+
+    matchesSubscription(truck) {
+      const filters = this.wsSubscription || {}
+      const allowed = (value) => (value === undefined ? null : [].concat(value))
+      const terminals = allowed(filters.terminal)
+      const docks = allowed(filters.dock_code)
+      const statuses = allowed(filters.status)
+      return (!terminals || terminals.includes(truck.terminal)) &&
+        (!docks || docks.includes(truck.dock_code)) &&
+        (!statuses || statuses.includes(truck.status_preparation) || statuses.includes(truck.status_loading))
     },
 
     disconnectWebSocket() {
+      clearTimeout(this.reconnectTimer)
+      this.wsSubscription = null
+      this.wsEpoch = null
+      this.lastSeq = null
       if (this.websocket) {
-        this.websocket.close()
+        const websocket = this.websocket
         this.websocket = null
+        websocket.close()
       }
     },
 